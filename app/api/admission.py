@@ -0,0 +1,142 @@
+# app/api/admission.py
+"""
+Admission control для API: ограничение числа одновременно обрабатываемых запросов
+по классам эндпоинтов и короткая очередь ожидания. Запросы сверх очереди сразу получают
+429, не дождавшиеся слота за queue_timeout — 503; оба ответа с Retry-After.
+Дешевые чтения (status/results) ограничиваются отдельно и не ждут за дорогими ответами.
+Создание сессий (write) и полная выгрузка (export) — тоже отдельные классы: выгрузка длится
+долго и не должна занимать слоты чтений на все время стриминга.
+"""
+import asyncio
+import json
+import time
+from typing import Callable
+
+from app.core import timing
+
+# Пути, которые никогда не ограничиваются
+_UNLIMITED_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+
+def classify_request(method: str, path: str) -> str | None:
+    """
+    Класс эндпоинта: answer — LLM-пайплайн, write — создание сессий, export — полная выгрузка,
+    read — остальные чтения, None — без ограничений
+    """
+    if path.startswith(_UNLIMITED_PATHS):
+        return None
+    if method == "POST" and (path.endswith("/answer") or "/answers" in path):
+        return "answer"
+    if method == "POST" and path.startswith("/sessions/start"):
+        return "write"
+    if method in ("GET", "HEAD") and (path == "/export" or path.startswith("/export/")):
+        return "export"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return None
+
+
+class AdmissionLimiter:
+    """Семафор на limit запросов плюс очередь до queue_size ожидающих"""
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float, retry_after: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._sem: asyncio.Semaphore | None = None
+        self._loop = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Семафор привязан к event loop; пересоздаем, если loop сменился (тесты, перезапуск)
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._loop is not loop:
+            self._sem = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        return self._sem
+
+    async def acquire(self) -> int | None:
+        """None — запрос допущен, иначе HTTP-статус отказа"""
+        sem = self._semaphore()
+        if sem.locked():
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                return 429
+            self.waiting += 1
+            try:
+                # Не wait_for: на 3.11 он может вернуть таймаут, когда слот уже выдан, и слот утекает.
+                # asyncio.timeout отменяет само ожидание, а отмененный acquire возвращает слот
+                async with asyncio.timeout(self.queue_timeout):
+                    await sem.acquire()
+            except TimeoutError:
+                self.timed_out += 1
+                return 503
+            finally:
+                self.waiting -= 1
+        else:
+            await sem.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore().release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: слот занимается на все время запроса, включая стриминг ответа"""
+
+    def __init__(self, app, limiters: dict[str, AdmissionLimiter], classify: Callable = classify_request):
+        self.app = app
+        self.limiters = limiters
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limiter = self.limiters.get(self.classify(scope["method"], scope["path"]))
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = await limiter.acquire()
+        timing.record("queue", time.perf_counter() - started)
+        if status is not None:
+            return await self._reject(send, status, limiter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    @staticmethod
+    async def _reject(send, status: int, limiter: AdmissionLimiter) -> None:
+        detail = "Too many requests" if status == 429 else "Server busy, try again later"
+        body = json.dumps({"detail": detail, "class": limiter.name}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(limiter.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,45 @@
+# app/api/caching.py
+"""
+ETag и Cache-Control для чтений сессии. ETag строится из счетчика версий сессии,
+который растет при каждом ответе, поэтому проверка If-None-Match не трогает запись.
+Разные выборки полей (?fields=) одной версии — разные представления, и ETag у них разный.
+"""
+import hashlib
+
+from fastapi import Request, Response
+from app.core.config import settings
+
+
+def session_etag(session_id: str, version: int, fields: tuple[str, ...] = ()) -> str:
+    """ETag версии сессии; fields — выборка после parse_fields (порядок полей = порядок ключей в ответе)"""
+    if not fields:
+        return f'"{session_id}.{version}"'
+    selection = ",".join(dict.fromkeys(fields))
+    return f'"{session_id}.{version}.{hashlib.sha1(selection.encode()).hexdigest()[:8]}"'
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    # private: записи сессий — данные сделок, их нельзя класть в общий кэш (nginx, CDN) и отдавать
+    # другим пользователям. Кэширует только клиент: короткий max-age + must-revalidate, после
+    # истечения — If-None-Match и дешевый 304 от API
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.api_read_max_age}, must-revalidate",
+    }
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """304 без тела, если у клиента актуальная версия"""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
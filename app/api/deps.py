@@ -0,0 +1,46 @@
+# app/api/deps.py
+"""
+Сервис создается один раз на процесс и лениво: в lifespan приложения или при первом
+запросе, а не при импорте модулей. Так импорт app.api.main не требует GIGACHAT_AUTH_KEY
+и не читает хранилище, а все роутеры работают с одним и тем же набором сессий.
+Сессии из хранилища загружаются в фоне; пока загрузка идет, эндпоинты с сервисом отвечают
+503 с Retry-After, а /health — not ready.
+"""
+import threading
+from typing import Annotated
+
+from fastapi import Depends, HTTPException
+
+from app.core.config import settings
+from app.services.bant_agent import BantAgentService, default_storage
+
+_service: BantAgentService | None = None
+_lock = threading.Lock()
+
+
+def get_service() -> BantAgentService:
+    global _service
+    if _service is None:
+        with _lock:
+            if _service is None:
+                service = BantAgentService(storage=default_storage(), load=False)
+                service.load_in_background()
+                _service = service
+    return _service
+
+
+def peek_service() -> BantAgentService | None:
+    """Сервис, если уже создан (для метрик: скрейп не должен его создавать)"""
+    return _service
+
+
+async def provide_service() -> BantAgentService:
+    # async-зависимость резолвится в event loop, без лишнего прыжка в threadpool
+    svc = get_service()
+    if not svc.ready.is_set():
+        detail = f"Session store failed to load: {svc.load_error}" if svc.load_error else "Session store is loading"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(settings.api_retry_after)})
+    return svc
+
+
+ServiceDep = Annotated[BantAgentService, Depends(provide_service)]
@@ -1,9 +1,118 @@
 # app/api/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routers import sessions, results
+from anyio import to_thread
+from app.api.routers import sessions, results, jobs, dashboard, analytics, deals, export
+from app.api.deps import get_service, peek_service
+from app.api.admission import AdmissionLimiter, AdmissionMiddleware
+from app.api.profiling import SamplingProfiler
+from app.api.server_timing import ServerTimingMiddleware, TimedJSONResponse
+from app.core.config import settings
+from app.core.metrics import METRICS
 
-app = FastAPI(title="BANT Survey Prototype", version="1.0.0")
+# Лимиты одновременных запросов по классам эндпоинтов
+limiters = {
+    "answer": AdmissionLimiter(
+        "answer",
+        limit=settings.api_answer_concurrency,
+        queue_size=settings.api_answer_queue,
+        queue_timeout=settings.api_queue_timeout,
+        retry_after=settings.api_retry_after,
+    ),
+    "read": AdmissionLimiter(
+        "read",
+        limit=settings.api_read_concurrency,
+        queue_size=settings.api_read_queue,
+        queue_timeout=settings.api_queue_timeout,
+        retry_after=1,
+    ),
+    "write": AdmissionLimiter(
+        "write",
+        limit=settings.api_write_concurrency,
+        queue_size=settings.api_write_queue,
+        queue_timeout=settings.api_queue_timeout,
+        retry_after=settings.api_retry_after,
+    ),
+    "export": AdmissionLimiter(
+        "export",
+        limit=settings.api_export_concurrency,
+        queue_size=settings.api_export_queue,
+        queue_timeout=settings.api_queue_timeout,
+        retry_after=settings.api_retry_after,
+    ),
+}
+
+def _service_gauge(fn):
+    """Gauge по сервису; до создания сервиса сэмплов нет (скрейп его не создает)"""
+    def samples():
+        svc = peek_service()
+        return fn(svc) if svc is not None else []
+    return samples
+
+def _followup_cache_stats(svc) -> dict:
+    cache = svc.flow.followup_cache
+    return cache.stats() if cache is not None else {"hit_rate": 0.0, "size": 0}
+
+# Gauge-метрики на момент скрейпа /metrics
+METRICS.add_gauge("bant_active_sessions", "Сессии в памяти сервиса",
+                  _service_gauge(lambda svc: [({}, len(svc.sessions))]))
+METRICS.add_gauge("bant_cache_hit_ratio", "Доля попаданий кэша followup-вопросов",
+                  _service_gauge(lambda svc: [({"cache": "followups"}, _followup_cache_stats(svc)["hit_rate"])]))
+METRICS.add_gauge("bant_cache_size", "Размер кэшей",
+                  _service_gauge(lambda svc: [({"cache": "followups"}, _followup_cache_stats(svc)["size"]),
+                                              ({"cache": "idempotency"}, svc.idempotency.stats()["stored"])]))
+METRICS.add_gauge("bant_admission_in_flight", "Запросы в обработке по классам",
+                  lambda: [({"class": name}, lim.in_flight) for name, lim in limiters.items()])
+METRICS.add_gauge("bant_admission_waiting", "Запросы в очереди admission control по классам",
+                  lambda: [({"class": name}, lim.waiting) for name, lim in limiters.items()])
+METRICS.add_gauge("bant_admission_rejected", "Отказы 429/503 по классам с запуска",
+                  lambda: [({"class": name}, lim.rejected + lim.timed_out) for name, lim in limiters.items()])
+METRICS.add_gauge("bant_jobs_queued", "Асинхронные задачи в очереди",
+                  _service_gauge(lambda svc: [({}, svc.jobs.stats()["queued"])]))
+METRICS.add_gauge("bant_jobs_oldest_queued_age_seconds", "Возраст старейшей задачи в очереди",
+                  _service_gauge(lambda svc: [({}, svc.jobs.stats()["oldest_queued_age_sec"])]))
+
+profiler = SamplingProfiler(
+    settings.profile_dir,
+    sample_rate=settings.profile_sample_rate,
+    slow_ms=settings.profile_slow_ms,
+    interval_ms=settings.profile_interval_ms,
+    allow_header=settings.profile_allow_header,
+    max_files=settings.profile_max_files,
+    max_concurrent=settings.profile_max_concurrent,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync-роуты работают в общем threadpool; его должно хватать на все классы одновременно,
+    # иначе долгие answer-запросы займут все потоки и чтения будут ждать
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(
+        limiter.total_tokens,
+        sum(lim.limit for lim in limiters.values()) + 8,
+    )
+    # Сервис создается до приема запросов, но не при импорте; сессии из хранилища загружаются
+    # и индексы собираются в фоне (до конца /health — 503), токен и соединения GigaChat тоже
+    # прогреваются в фоне — старт процесса не ждет ни того, ни другого
+    svc = await to_thread.run_sync(get_service)
+    if settings.llm_warmup:
+        svc.prewarm(background=True)
+    yield
+    # Тренды аналитики и журнал хранилища сбрасываются на диск при остановке
+    await to_thread.run_sync(svc.close)
+
+app = FastAPI(
+    title="BANT Survey Prototype",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
+)
+
+# Admission control: быстрый 429/503 вместо бесконечной очереди при всплеске.
+# Регистрируется до CORS (add_middleware оборачивает снаружи), чтобы отказы тоже получали CORS-заголовки
+app.add_middleware(AdmissionMiddleware, limiters=limiters)
 
 # CORS middleware для работы с фронтендом
 app.add_middleware(
@@ -14,15 +123,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing и профилировщик — внешним слоем, чтобы учитывать и ожидание в admission control
+app.add_middleware(ServerTimingMiddleware, profiler=profiler, enabled=settings.api_server_timing)
+
 # Подключение роутеров
 app.include_router(sessions.router)
 app.include_router(results.router)
+app.include_router(jobs.router)
+app.include_router(dashboard.router)
+app.include_router(analytics.router)
+app.include_router(deals.router)
+app.include_router(export.router)
 
 @app.get("/health")
 def health_check():
-    """Проверка здоровья сервиса"""
+    """Проверка здоровья сервиса: 503, пока сессии не загружены из хранилища"""
+    svc = get_service()
+    if not svc.ready.is_set():
+        status = "failed" if svc.load_error else "loading"
+        return JSONResponse(status_code=503, content={"status": status, "service": "BANT Survey API",
+                                                      "sessions_loaded": len(svc.sessions), "error": svc.load_error})
     return {"status": "healthy", "service": "BANT Survey API"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Метрики в формате Prometheus"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/admission")
+def admission_stats():
+    """Текущая загрузка и отказы по классам эндпоинтов"""
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+@app.get("/profiler")
+def profiler_stats():
+    """Настройки и счетчики семплирующего профилировщика"""
+    return profiler.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,151 @@
+# app/api/profiling.py
+"""
+Семплирующий профилировщик медленных запросов.
+Пока запрос выполняется, отдельный поток раз в interval_ms снимает стеки потоков, в которых
+работал код запроса (их отмечают таймеры METRICS), и копит их в collapsed-формате
+(flamegraph.pl / speedscope). Если запрос оказался медленнее slow_ms или профиль запрошен
+заголовком X-Profile, файл <ts>_<session>_<ms>ms.folded пишется в directory.
+Включается долей запросов (sample_rate) или заголовком; одновременно профилируется
+не больше max_concurrent запросов, число файлов ограничено max_files.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.core.timing import RequestTimings
+
+_SESSION_RE = re.compile(r"/(?:sessions|results)/([\w\-]+)(?:/|$)")
+
+
+def session_from_path(path: str) -> str:
+    match = _SESSION_RE.search(path)
+    if match is None or match.group(1) in ("start", "answers"):
+        return "-"
+    return match.group(1)
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class ProfileSession(threading.Thread):
+    def __init__(self, profiler: "SamplingProfiler", timings: RequestTimings, forced: bool):
+        super().__init__(name="bant-profiler", daemon=True)
+        self.profiler = profiler
+        self.timings = timings
+        self.forced = forced
+        self.samples: Counter = Counter()
+        self.label = "-"
+        self.latency = 0.0
+        self._done = threading.Event()
+        # Поток event loop'а, запустивший сессию, в основном ждет в select — не семплируем
+        self._loop_thread = threading.get_ident()
+
+    def run(self) -> None:
+        interval = self.profiler.interval_ms / 1000
+        try:
+            while not self._done.wait(interval):
+                frames = sys._current_frames()
+                for tid in self.timings.thread_ids():
+                    if tid == self._loop_thread:
+                        continue
+                    frame = frames.get(tid)
+                    if frame is not None:
+                        self.samples[_collapse(frame)] += 1
+            if self.forced or self.latency * 1000 >= self.profiler.slow_ms:
+                self.profiler.write(self)
+        except OSError:
+            pass  # недоступный каталог профилей не должен влиять на запросы
+        finally:
+            self.profiler.release()
+
+    def finish(self, label: str, latency: float) -> None:
+        """Останавливает семплирование; запись файла — в потоке профилировщика, не в event loop"""
+        self.label = label
+        self.latency = latency
+        self._done.set()
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        slow_ms: float = 1000,
+        interval_ms: float = 5.0,
+        allow_header: bool = False,
+        max_files: int = 200,
+        max_concurrent: int = 1,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval_ms = max(0.5, interval_ms)
+        self.allow_header = allow_header
+        self.max_files = max(1, max_files)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self.started = 0
+        self.written = 0
+        self.skipped_busy = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.allow_header
+
+    def start(self, timings: RequestTimings, header_requested: bool) -> ProfileSession | None:
+        forced = header_requested and self.allow_header
+        if not forced and not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return None
+        if not self._slots.acquire(blocking=False):
+            self.skipped_busy += 1
+            return None
+        self.started += 1
+        session = ProfileSession(self, timings, forced)
+        session.start()
+        return session
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def write(self, session: ProfileSession) -> str | None:
+        if not session.samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        self._prune()
+        name = f"{int(time.time() * 1000)}_{session.label}_{int(session.latency * 1000)}ms.folded"
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in session.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        return path
+
+    def _prune(self) -> None:
+        """Удаляет самые старые профили, чтобы после записи их было не больше max_files"""
+        files = sorted(
+            (os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(".folded")),
+            key=os.path.getmtime,
+        )
+        for path in files[: max(0, len(files) - self.max_files + 1)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "started": self.started,
+            "written": self.written,
+            "skipped_busy": self.skipped_busy,
+        }
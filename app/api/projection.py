@@ -0,0 +1,48 @@
+# app/api/projection.py
+"""
+Выборка полей ответа (?fields=a,b,record.budget). Значения строятся лениво: поле, которое
+клиент не запросил, не сериализуется вовсе (record.model_dump(), score с обоснованиями).
+"""
+from typing import Any, Callable
+
+from fastapi import HTTPException
+
+
+def parse_fields(fields: str | None, default: tuple[str, ...], allowed: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    None/пусто — набор по умолчанию, "*" — все поля.
+    Неизвестное поле — 400, чтобы опечатка не превращалась молча в пустой ответ.
+    """
+    if not fields:
+        return default
+    if fields.strip() == "*":
+        return allowed
+    selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in selected if f.split(".", 1)[0] not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}",
+        )
+    return selected
+
+
+def project(builders: dict[str, Callable[[], Any]], fields: tuple[str, ...]) -> dict:
+    """
+    Собирает ответ из запрошенных полей. "record.budget" — только подключ словаря;
+    несколько подключей одного поля объединяются, builder вызывается один раз.
+    """
+    result: dict[str, Any] = {}
+    cache: dict[str, Any] = {}
+    for field in fields:
+        top, _, sub = field.partition(".")
+        if top not in cache:
+            cache[top] = builders[top]()
+        value = cache[top]
+        if not sub:
+            result[top] = value
+        elif isinstance(value, dict) and sub in value:
+            target = result.setdefault(top, {})
+            if isinstance(target, dict):
+                target[sub] = value[sub]
+    return result
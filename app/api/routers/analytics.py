@@ -0,0 +1,10 @@
+# app/api/routers/analytics.py
+from fastapi import APIRouter, Query
+from app.api.deps import ServiceDep
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("")
+def get_analytics(svc: ServiceDep, days: int | None = Query(None, ge=0, le=3660)):
+    """Стадии, средние оценки и заполненность по всем сделкам, тренды по дням (последние days)"""
+    return svc.analytics.snapshot(days=days)
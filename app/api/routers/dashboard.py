@@ -0,0 +1,28 @@
+# app/api/routers/dashboard.py
+from typing import Literal
+from fastapi import APIRouter, Query, Request, Response
+from app.api.deps import ServiceDep
+from app.api.caching import cache_headers, not_modified
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+@router.get("")
+def get_dashboard(
+    request: Request,
+    response: Response,
+    svc: ServiceDep,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    stage: Literal["unscored", "unqualified", "qualified", "ready"] | None = None,
+    filled: Literal["none", "partial", "full"] | None = None,
+    deal: str | None = Query(None, description="подстрока deal_id"),
+):
+    """Страница компактных строк по всем сессиям (новые изменения первыми) и счетчики по stage/filled"""
+    # ETag по ревизии индекса: пока сессии не менялись, повторный запрос страницы — 304
+    etag = f'"dashboard.{svc.dashboard.revision}"'
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    page = svc.dashboard.page(offset=offset, limit=limit, stage=stage, filled=filled, deal=deal)
+    response.headers.update(cache_headers(f'"dashboard.{page["revision"]}"'))
+    return page
@@ -0,0 +1,13 @@
+# app/api/routers/deals.py
+from fastapi import APIRouter, HTTPException
+from app.api.deps import ServiceDep
+
+router = APIRouter(prefix="/deals", tags=["deals"])
+
+@router.get("/{deal_id}")
+def get_deal(deal_id: str, svc: ServiceDep):
+    """Сводная запись сделки: свежие значения слотов по всем ее сессиям, источник каждого поля и список сессий"""
+    try:
+        return svc.get_deal(deal_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
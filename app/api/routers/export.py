@@ -0,0 +1,46 @@
+# app/api/routers/export.py
+import os
+import tempfile
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from app.api.deps import ServiceDep
+from app.services.export import CONTENT_TYPES, ParquetUnavailable, csv_chunks, iter_rows, ndjson_chunks, parse_timestamp, write_parquet
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+@router.get("")
+def export_all(
+    svc: ServiceDep,
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    updated_since: str | None = Query(None, description="ISO-время: только записи, измененные не раньше"),
+    chunk_rows: int = Query(500, ge=1, le=10000),
+):
+    """Потоковая выгрузка всех записей плоскими строками (NDJSON/CSV; Parquet — при наличии pyarrow)"""
+    try:
+        since: datetime | None = parse_timestamp(updated_since) if updated_since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Bad updated_since: {updated_since!r}")
+    rows = iter_rows(svc.iter_session_data(), since)
+    filename = f"bant_export.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    if format == "parquet":
+        # Parquet пишет метаданные в конец файла — собираем во временный файл, отдаем с диска
+        fd, path = tempfile.mkstemp(suffix=".parquet")
+        os.close(fd)
+        try:
+            write_parquet(rows, path, chunk_rows=max(chunk_rows, 1000))
+        except Exception as e:
+            # Файл удаляется при любой ошибке записи; 501 — только при отсутствии pyarrow, прочее — 500
+            os.remove(path)
+            if isinstance(e, ParquetUnavailable):
+                raise HTTPException(status_code=501, detail=str(e))
+            raise
+        return FileResponse(path, media_type=CONTENT_TYPES["parquet"], headers=headers,
+                            background=BackgroundTask(os.remove, path))
+    
+    chunks = csv_chunks(rows, chunk_rows) if format == "csv" else ndjson_chunks(rows, chunk_rows)
+    return StreamingResponse(chunks, media_type=CONTENT_TYPES[format], headers=headers)
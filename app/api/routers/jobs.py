@@ -0,0 +1,18 @@
+# app/api/routers/jobs.py
+from fastapi import APIRouter, HTTPException
+from app.api.deps import ServiceDep
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("")
+def jobs_stats(svc: ServiceDep):
+    """Глубина и возраст очереди асинхронных задач"""
+    return svc.jobs.stats()
+
+@router.get("/{job_id}")
+def get_job(job_id: str, svc: ServiceDep):
+    """Статус задачи; после завершения — result или error"""
+    job = svc.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
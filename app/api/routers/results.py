@@ -1,40 +1,55 @@
 # app/api/routers/results.py
-from fastapi import APIRouter, HTTPException
-from app.services.bant_agent import BantAgentService
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.api.deps import ServiceDep
+from app.api.caching import session_etag, cache_headers, not_modified
+from app.api.projection import parse_fields, project
 
 router = APIRouter(prefix="/results", tags=["results"])
 
-# Инициализация сервиса
-svc = BantAgentService()
+# Допускают выборку слотов записи: ?fields=filled,record.budget
+RESULT_FIELDS = ("session_id", "deal_id", "record", "filled", "current_slot")
+EXPORT_FIELDS = ("session_id", "deal_id", "export_data", "export_timestamp")
 
 @router.get("/{session_id}")
-def get_result(session_id: str):
+def get_result(session_id: str, request: Request, response: Response, svc: ServiceDep, fields: str | None = None):
     """Получить результат опроса"""
+    selected = parse_fields(fields, RESULT_FIELDS, RESULT_FIELDS)
     try:
+        etag = session_etag(session_id, svc.get_version(session_id), selected)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
         st = svc.get_session(session_id)
-        return {
-            "session_id": st.session_id,
-            "deal_id": st.deal_id,
-            "record": st.record.model_dump(),
-            "filled": st.record.filled,
-            "current_slot": st.current_slot
-        }
+        response.headers.update(cache_headers(etag))
+        return project({
+            "session_id": lambda: st.session_id,
+            "deal_id": lambda: st.deal_id,
+            "record": lambda: st.record.model_dump(),
+            "filled": lambda: st.record.filled,
+            "current_slot": lambda: st.current_slot,
+        }, selected)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{session_id}/export")
-def export_result(session_id: str):
+def export_result(session_id: str, request: Request, response: Response, svc: ServiceDep, fields: str | None = None):
     """Экспортировать результат в JSON"""
+    selected = parse_fields(fields, EXPORT_FIELDS, EXPORT_FIELDS)
     try:
+        etag = session_etag(session_id, svc.get_version(session_id), selected)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
         st = svc.get_session(session_id)
-        return {
-            "session_id": st.session_id,
-            "deal_id": st.deal_id,
-            "export_data": st.record.model_dump(),
-            "export_timestamp": st.record.updated_at.isoformat()
-        }
+        response.headers.update(cache_headers(etag))
+        return project({
+            "session_id": lambda: st.session_id,
+            "deal_id": lambda: st.deal_id,
+            "export_data": lambda: st.record.model_dump(),
+            "export_timestamp": lambda: st.record.updated_at.isoformat(),
+        }, selected)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
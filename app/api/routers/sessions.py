@@ -1,66 +1,186 @@
 # app/api/routers/sessions.py
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.services.bant_agent import BantAgentService
+import json
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from app.api.deps import ServiceDep
+from app.services.idempotency import IdempotencyConflict
+from app.services.jobs import JobQueueFull
+from app.api.caching import session_etag, cache_headers, not_modified
+from app.api.projection import parse_fields, project
+from app.core.config import settings
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
-# Инициализация сервиса
-svc = BantAgentService()
-
 class StartReq(BaseModel):
     deal_id: str
 
 class AnswerReq(BaseModel):
     text: str
 
+class BulkStartReq(BaseModel):
+    deal_ids: list[str] = Field(min_length=1)
+    prewarm: bool = True
+
+class BatchAnswerItem(BaseModel):
+    session_id: str
+    text: str
+
+class BatchAnswerReq(BaseModel):
+    items: list[BatchAnswerItem] = Field(min_length=1)
+
+# Поля ответа на answer; по умолчанию без полной записи и скоринга с обоснованиями —
+# только изменившиеся слоты. Полный ответ: ?fields=*
+ANSWER_FIELDS = ("session_id", "version", "current_slot", "next_question", "filled", "changed",
+                 "followups", "record", "score")
+ANSWER_DEFAULT_FIELDS = ("session_id", "version", "current_slot", "next_question", "filled", "changed",
+                         "followups")
+STATUS_FIELDS = ("session_id", "deal_id", "current_slot", "filled", "required_slots", "score", "version")
+
+def _answer_response(st, next_q, followups, changed, fields=ANSWER_DEFAULT_FIELDS) -> dict:
+    return project({
+        "session_id": lambda: st.session_id,
+        "version": lambda: st.version,
+        "current_slot": lambda: st.current_slot,
+        "next_question": lambda: next_q,
+        "filled": lambda: st.record.filled,
+        "changed": lambda: changed,
+        "followups": lambda: followups,
+        "record": lambda: st.record.model_dump(),
+        "score": lambda: st.record.score.model_dump() if st.record.score else None,
+    }, fields)
+
+def _batch_item_result(idx: int, item: BatchAnswerItem, outcome, fields=ANSWER_DEFAULT_FIELDS) -> dict:
+    if isinstance(outcome, Exception):
+        status = 404 if isinstance(outcome, ValueError) else 500
+        return {"index": idx, "session_id": item.session_id, "ok": False, "status": status, "error": str(outcome)}
+    return {"index": idx, "session_id": item.session_id, "ok": True, "status": 200,
+            "result": _answer_response(*outcome, fields=fields)}
+
 @router.post("/start")
-def start_session(req: StartReq):
+def start_session(req: StartReq, svc: ServiceDep):
     """Начать новую сессию опроса"""
     try:
         st = svc.start(req.deal_id)
-        from app.core.prompts import QUESTIONS
-        question_text = QUESTIONS.get(st.current_slot, f"Вопрос по {st.current_slot}") if st.current_slot else "Все поля заполнены!"
         return {
             "session_id": st.session_id,
             "deal_id": st.deal_id,
             "current_slot": st.current_slot,
-            "question": f"Начнём с {st.current_slot.upper()}: {question_text}" if st.current_slot else "Все поля заполнены!"
+            "question": svc.first_question(st)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/{session_id}/answer")
-def answer_question(session_id: str, req: AnswerReq):
-    """Ответить на вопрос"""
+@router.post("/start:bulk")
+def start_sessions_bulk(req: BulkStartReq, svc: ServiceDep):
+    """Начать сессии для многих сделок одним запросом"""
+    if len(req.deal_ids) > settings.api_bulk_start_max_items:
+        raise HTTPException(status_code=413, detail=f"Too many deal_ids, max {settings.api_bulk_start_max_items}")
     try:
-        st, next_q, followups = svc.answer(session_id, req.text)
+        states = svc.start_many(req.deal_ids)
+        if req.prewarm:
+            svc.prewarm(background=True)
         return {
-            "session_id": st.session_id,
-            "current_slot": st.current_slot,
-            "next_question": next_q,
-            "record": st.record.model_dump(),
-            "filled": st.record.filled,
-            "score": st.record.score.model_dump() if st.record.score else None,
-            "followups": followups
+            "sessions": [
+                {
+                    "session_id": st.session_id,
+                    "deal_id": st.deal_id,
+                    "current_slot": st.current_slot,
+                    "question": svc.first_question(st)
+                }
+                for st in states
+            ],
+            "prewarm": req.prewarm
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/answers:batch")
+def answer_batch(req: BatchAnswerReq, svc: ServiceDep, stream: bool = False, fields: str | None = None):
+    """Ответы для многих сессий за один запрос; stream=true — NDJSON по мере готовности"""
+    selected = parse_fields(fields, ANSWER_DEFAULT_FIELDS, ANSWER_FIELDS)
+    if len(req.items) > settings.api_batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Too many items, max {settings.api_batch_max_items}")
+    outcomes = svc.answer_many([(item.session_id, item.text) for item in req.items])
+
+    if stream:
+        def lines():
+            for idx, outcome in outcomes:
+                row = _batch_item_result(idx, req.items[idx], outcome, selected)
+                yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results: list[dict | None] = [None] * len(req.items)
+    for idx, outcome in outcomes:
+        results[idx] = _batch_item_result(idx, req.items[idx], outcome, selected)
+    failed = sum(1 for r in results if not r["ok"])
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+@router.post("/{session_id}/answer")
+def answer_question(
+    session_id: str,
+    req: AnswerReq,
+    response: Response,
+    svc: ServiceDep,
+    mode: str = Query(default="sync", pattern="^(sync|async)$"),
+    fields: str | None = None,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Ответить на вопрос; mode=async — сразу 202 с id задачи, результат через /jobs/{id}.
+    fields — поля ответа через запятую (по умолчанию без record и score, "*" — все).
+    """
+    selected = parse_fields(fields, ANSWER_DEFAULT_FIELDS, ANSWER_FIELDS)
+    if not idempotency_key:
+        compute = lambda: _answer_response(*svc.answer(session_id, req.text), fields=selected)
+    else:
+        # Повтор с тем же ключом не запускает пайплайн: ждет оригинал или получает сохраненный ответ
+        def compute():
+            body, replayed = svc.idempotency.run(
+                f"{session_id}:{idempotency_key}",
+                svc.idempotency.fingerprint(session_id, req.text, ",".join(selected)),
+                lambda: _answer_response(*svc.answer(session_id, req.text), fields=selected),
+            )
+            if replayed:
+                response.headers["Idempotency-Replayed"] = "true"
+            return body
+    try:
+        if mode == "async":
+            svc.get_version(session_id)  # 404 сразу, а не в задаче
+            job = svc.jobs.submit(session_id, compute)
+            response.status_code = 202
+            response.headers["Location"] = f"/jobs/{job.job_id}"
+            return {"job_id": job.job_id, "session_id": session_id, "status": job.status,
+                    "status_url": f"/jobs/{job.job_id}"}
+        return compute()
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Job queue is full", headers={"Retry-After": str(settings.api_retry_after)})
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request body")
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{session_id}/status")
-def get_status(session_id: str):
+def get_status(session_id: str, request: Request, response: Response, svc: ServiceDep, fields: str | None = None):
     """Получить статус сессии"""
+    selected = parse_fields(fields, STATUS_FIELDS, STATUS_FIELDS)
     try:
+        etag = session_etag(session_id, svc.get_version(session_id), selected)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
         st = svc.get_session(session_id)
-        return {
-            "session_id": st.session_id,
-            "deal_id": st.deal_id,
-            "current_slot": st.current_slot,
-            "filled": st.record.filled,
-            "required_slots": st.required_slots,
-            "score": st.record.score.model_dump() if st.record.score else None
-        }
+        response.headers.update(cache_headers(etag))
+        return project({
+            "session_id": lambda: st.session_id,
+            "deal_id": lambda: st.deal_id,
+            "current_slot": lambda: st.current_slot,
+            "filled": lambda: st.record.filled,
+            "required_slots": lambda: st.required_slots,
+            "score": lambda: st.record.score.model_dump() if st.record.score else None,
+            "version": lambda: st.version,
+        }, selected)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,59 @@
+# app/api/server_timing.py
+"""
+Заголовок Server-Timing с разбивкой времени запроса по стадиям (извлечение, скоринг,
+followups, хранилище, сериализация) и запуск семплирующего профилировщика.
+"""
+import time
+
+from fastapi.responses import JSONResponse
+
+from app.core import timing
+from app.core.metrics import METRICS
+from app.api.profiling import SamplingProfiler, session_from_path
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse, время рендера которого попадает в стадию serialize"""
+
+    def render(self, content) -> bytes:
+        with METRICS.timed("serialize"):
+            return super().render(content)
+
+
+def format_server_timing(items: list[tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in items)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: коллектор стадий на запрос, Server-Timing в ответе, профилировщик"""
+
+    def __init__(self, app, profiler: SamplingProfiler | None = None, enabled: bool = True):
+        self.app = app
+        self.profiler = profiler
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.enabled or (self.profiler and self.profiler.enabled)):
+            return await self.app(scope, receive, send)
+
+        timings, token = timing.begin()
+        started = time.perf_counter()
+        session = None
+        if self.profiler is not None and self.profiler.enabled:
+            header_requested = any(k == b"x-profile" and v not in (b"", b"0") for k, v in scope["headers"])
+            session = self.profiler.start(timings, header_requested)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and self.enabled:
+                items = timings.items() + [("request", time.perf_counter() - started)]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(items).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            timing.end(token)
+            if session is not None:
+                session.finish(session_from_path(scope["path"]), time.perf_counter() - started)
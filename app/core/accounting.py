@@ -0,0 +1,111 @@
+# app/core/accounting.py
+"""
+Учет размеров промптов и ответов LLM по типам вызовов.
+Токены берутся из поля usage ответа GigaChat, если клиент его отдает (last_usage),
+иначе оцениваются по длине текста.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+# Грубая оценка для русского текста: ~3 символа на токен
+CHARS_PER_TOKEN = 3.0
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def messages_chars(messages: list[dict]) -> int:
+    return sum(len(m.get("content") or "") for m in messages)
+
+
+class PromptAccounting:
+    """Агрегаты по типам вызовов плюс ограниченный журнал последних вызовов"""
+
+    def __init__(self, recent_size: int = 256):
+        self._lock = threading.Lock()
+        self._totals: dict[str, dict[str, float]] = {}
+        self._recent: deque = deque(maxlen=recent_size)
+
+    def record(
+        self,
+        kind: str,
+        prompt_chars: int,
+        completion_chars: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+        seconds: float,
+        estimated: bool,
+    ) -> None:
+        call = {
+            "kind": kind,
+            "prompt_chars": prompt_chars,
+            "completion_chars": completion_chars,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "seconds": seconds,
+            "estimated": estimated,
+        }
+        with self._lock:
+            totals = self._kind_totals(kind)
+            totals["calls"] += 1
+            for key in ("prompt_chars", "completion_chars", "prompt_tokens", "completion_tokens", "seconds"):
+                totals[key] += call[key]
+            self._recent.append(call)
+
+    def _kind_totals(self, kind: str) -> dict[str, float]:
+        return self._totals.setdefault(kind, {
+            "calls": 0, "errors": 0, "prompt_chars": 0, "completion_chars": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0,
+        })
+
+    def record_error(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            totals = self._kind_totals(kind)
+            totals["errors"] += 1
+            totals["seconds"] += seconds
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {kind: dict(totals) for kind, totals in self._totals.items()}
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            return list(self._recent)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._recent.clear()
+
+
+# Глобальный учет процесса
+ACCOUNTING = PromptAccounting()
+
+
+def accounted_chat(llm, kind: str, messages: list[dict], **kwargs) -> str:
+    """Вызывает llm.chat и записывает размеры промпта/ответа под типом kind"""
+    started = time.perf_counter()
+    try:
+        response = llm.chat(messages, **kwargs)
+    except Exception:
+        ACCOUNTING.record_error(kind, time.perf_counter() - started)
+        raise
+    seconds = time.perf_counter() - started
+
+    prompt_chars = messages_chars(messages)
+    completion_chars = len(response or "")
+    usage = getattr(llm, "last_usage", None)
+    if isinstance(usage, dict) and "prompt_tokens" in usage:
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        estimated = False
+    else:
+        prompt_tokens = estimate_tokens("".join(m.get("content") or "" for m in messages))
+        completion_tokens = estimate_tokens(response or "")
+        estimated = True
+
+    ACCOUNTING.record(kind, prompt_chars, completion_chars, prompt_tokens, completion_tokens, seconds, estimated)
+    return response
@@ -0,0 +1,119 @@
+# app/core/cassette.py
+"""
+Кассета LLM-трафика: запись реальных ответов GigaChat и их детерминированное воспроизведение.
+
+Запись — JSONL (или .jsonl.gz), одна строка на вызов: отпечаток запроса, ответ, usage и
+латентность. При воспроизведении ответы для одного отпечатка отдаются в порядке записи
+(повторные одинаковые запросы получают следующий записанный ответ, после последнего —
+снова последний). Латентность воспроизводится ("real") или обнуляется ("zero").
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from app.core.stats import STATS
+
+MODES = ("record", "replay")
+LATENCY_MODES = ("zero", "real")
+
+
+class CassetteMiss(LookupError):
+    """В кассете нет ответа на такой запрос"""
+
+
+def fingerprint(payload: dict) -> str:
+    """Отпечаток запроса chat/completions: все, что влияет на ответ модели"""
+    key = {
+        "model": payload.get("model"),
+        "messages": [(m.get("role"), m.get("content")) for m in payload.get("messages") or []],
+        "temperature": payload.get("temperature"),
+        "max_tokens": payload.get("max_tokens"),
+        "response_format": payload.get("response_format"),
+    }
+    raw = json.dumps(key, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", latency: str = "zero"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode!r} (expected one of {MODES})")
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"Unknown cassette latency: {latency!r} (expected one of {LATENCY_MODES})")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict]] = defaultdict(list)
+        self._cursor: dict[str, int] = defaultdict(int)
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with _open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["fp"]].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def play(self, payload: dict) -> dict:
+        """Следующая запись для запроса; с latency="real" выдерживает записанную задержку"""
+        fp = fingerprint(payload)
+        with self._lock:
+            entries = self._entries.get(fp)
+            if not entries:
+                STATS.incr("cassette_misses")
+                raise CassetteMiss(f"No cassette entry for request {fp}")
+            idx = min(self._cursor[fp], len(entries) - 1)
+            self._cursor[fp] += 1
+        STATS.incr("cassette_hits")
+        entry = entries[idx]
+        if self.latency == "real" and entry.get("latency"):
+            time.sleep(entry["latency"])
+        return entry
+
+    def record(self, payload: dict, content: str, usage: dict | None, latency: float) -> None:
+        """Дописывает вызов в файл (append: несколько прогонов копятся в одной кассете)"""
+        entry = {"fp": fingerprint(payload), "content": content, "usage": usage, "latency": round(latency, 4)}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with _open(self.path, "a") as f:
+                f.write(line)
+            self._entries[entry["fp"]].append(entry)
+        STATS.incr("cassette_recorded")
+
+    @classmethod
+    def from_env(cls) -> "Cassette | None":
+        """GIGACHAT_CASSETTE=<path> [GIGACHAT_CASSETTE_MODE=record|replay] [GIGACHAT_CASSETTE_LATENCY=zero|real]"""
+        path = os.getenv("GIGACHAT_CASSETTE")
+        if not path:
+            return None
+        return cls(
+            path,
+            mode=os.getenv("GIGACHAT_CASSETTE_MODE", "replay").strip().lower(),
+            latency=os.getenv("GIGACHAT_CASSETTE_LATENCY", "zero").strip().lower(),
+        )
@@ -0,0 +1,89 @@
+# app/core/chunking.py
+"""
+Нарезка длинных транскриптов на куски и свертка частичных BANT-payload'ов.
+Куски режутся по репликам спикеров, абзацам и предложениям; свертка детерминирована:
+скаляры — побеждает значение из более позднего куска, списки — объединение без дублей.
+"""
+import re
+from typing import Iterable, Iterator
+
+# "Менеджер: ...", "Иван Петров: ...", "[00:12:31] Клиент: ..."
+_SPEAKER_RE = re.compile(r"^\s*(?:\[[\d:.]+\]\s*)?[^\W\d][\w .\-]{0,40}:\s", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def _units(text: str) -> Iterator[str]:
+    """Смысловые единицы: реплики спикеров или абзацы; внутри — предложения"""
+    block: list[str] = []
+    for line in text.splitlines():
+        starts_turn = bool(_SPEAKER_RE.match(line))
+        if (starts_turn or not line.strip()) and block:
+            yield "\n".join(block)
+            block = []
+        if line.strip():
+            block.append(line)
+    if block:
+        yield "\n".join(block)
+
+
+def _split_long(unit: str, max_chars: int) -> Iterator[str]:
+    """Режет слишком длинную единицу по предложениям, а их — по пробелам"""
+    for sentence in _SENTENCE_RE.split(unit):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            yield sentence[:cut]
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            yield sentence
+
+
+def split_transcript(text: str, max_chars: int = 4000) -> Iterator[str]:
+    """Жадно упаковывает реплики/предложения в куски не длиннее max_chars"""
+    buf: list[str] = []
+    size = 0
+    for unit in _units(text):
+        pieces = [unit] if len(unit) <= max_chars else _split_long(unit, max_chars)
+        for piece in pieces:
+            if buf and size + len(piece) + 1 > max_chars:
+                yield "\n".join(buf)
+                buf, size = [], 0
+            buf.append(piece)
+            size += len(piece) + 1
+    if buf:
+        yield "\n".join(buf)
+
+
+def _empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def reduce_payloads(payloads: Iterable[dict]) -> dict:
+    """
+    Сворачивает payload'ы кусков в порядке их следования в транскрипте:
+      - скаляры: последнее непустое значение
+      - списки: объединение с сохранением порядка, дубли по casefold отбрасываются
+    Явный пустой список ("проблем нет") сохраняется, только если непустых значений не было.
+    """
+    result: dict[str, dict] = {}
+    seen: dict[tuple[str, str], set] = {}
+    for payload in payloads:
+        for slot, block in payload.items():
+            if not isinstance(block, dict):
+                continue
+            target = result.setdefault(slot, {})
+            for field, value in block.items():
+                if isinstance(value, list):
+                    current = target.get(field)
+                    if not isinstance(current, list):
+                        current = target[field] = []
+                    keys = seen.setdefault((slot, field), set())
+                    for item in value:
+                        key = str(item).strip().casefold()
+                        if key and key not in keys:
+                            keys.add(key)
+                            current.append(item)
+                elif not _empty(value):
+                    target[field] = value
+    return result
@@ -10,20 +10,76 @@ class Settings(BaseSettings):
     gigachat_verify_ssl: bool = False
     gigachat_auth_url: str = "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
     gigachat_api_url: str = "https://gigachat.devices.sberbank.ru/api/v1"
+    gigachat_cassette: str = ""  # путь к кассете LLM-трафика (пусто — выкл.)
+    gigachat_cassette_mode: str = "replay"  # record | replay
+    gigachat_cassette_latency: str = "zero"  # zero | real — задержка при replay
     
     # API Configuration
     api_base: str = "http://localhost:8000"
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    api_read_max_age: int = 1  # Cache-Control max-age для status/results, сек
+    # Процессы в production-режиме run_api.py (0 — по числу ядер). Сессии хранятся в памяти
+    # процесса, поэтому больше одного воркера — только с привязкой клиента к воркеру
+    api_workers: int = 1
+    api_import_budget_ms: float = 500  # бюджет на импорт app.api.main при старте
+    
+    # Admission control: одновременные запросы и очередь ожидания по классам эндпоинтов
+    api_answer_concurrency: int = 16
+    api_answer_queue: int = 16
+    api_read_concurrency: int = 32
+    api_read_queue: int = 64
+    api_write_concurrency: int = 8  # /sessions/start и start:bulk
+    api_write_queue: int = 32
+    api_export_concurrency: int = 2  # GET /export: стрим держит слот до конца выгрузки
+    api_export_queue: int = 2
+    api_queue_timeout: float = 2.0  # сколько запрос может ждать слот, сек
+    api_retry_after: int = 5  # Retry-After для отказов answer-класса, сек
+    
+    # Пакетные ответы
+    api_batch_concurrency: int = 8  # одновременных ответов из batch-запросов на весь сервис
+    api_batch_max_items: int = 100
+    api_bulk_start_max_items: int = 5000
+    
+    # Idempotency-Key для ответов
+    idempotency_ttl_sec: int = 3600
+    idempotency_max_keys: int = 10000
+    
+    # Асинхронные задачи (POST .../answer?mode=async)
+    jobs_workers: int = 8
+    jobs_max_queued: int = 1000  # сверх этого — 429
+    jobs_max_retained: int = 10000  # сколько завершенных задач хранится для опроса
+    jobs_webhook_url: str = ""  # куда POST'ить завершенные задачи (пусто — выкл.)
+    jobs_webhook_timeout: float = 5.0
+    
+    # Server-Timing и семплирующий профилировщик медленных запросов
+    api_server_timing: bool = True
+    profile_sample_rate: float = 0.0  # доля профилируемых запросов (0 — только по заголовку)
+    profile_allow_header: bool = False  # разрешить профилирование заголовком X-Profile: 1
+    profile_slow_ms: int = 1000  # профиль сохраняется, если запрос дольше
+    profile_interval_ms: float = 5.0
+    profile_dir: str = "data/profiles"
+    profile_max_files: int = 200
+    profile_max_concurrent: int = 1
     
     # Storage Configuration
     storage_type: str = "json"
     storage_path: str = "data/sessions.json"
+    storage_compact_bytes: int = 32 * 1024 * 1024  # журнал больше — фоновое слияние в снимок
+    analytics_max_days: int = 400  # дневных корзин трендов в аналитике (sidecar рядом с хранилищем)
+    analytics_flush_sec: float = 30.0  # как часто тренды пишутся в sidecar (и при остановке; 0 — только при остановке)
     
     # LLM Configuration
     llm_temperature: float = 0.2
     llm_timeout: int = 60
     llm_max_retries: int = 3
+    llm_compact_prompts: bool = True  # схема только текущего слота, если ответ не многотемный
+    llm_fanout: bool = False  # параллельное извлечение по слотам для длинных ответов
+    llm_fanout_min_chars: int = 600
+    llm_max_concurrency: int = 4  # максимум одновременных LLM-вызовов из одного flow
+    llm_chunk_chars: int = 4000  # длинные транскрипты режутся на куски такого размера (0 — выкл.)
+    llm_warmup: bool = True  # фоновый прогрев токена и соединений при старте API
+    followup_cache_size: int = 1024  # кэш followup-вопросов по шаблону пробелов (0 — выкл.)
     
     class Config:
         env_file = ".env"
@@ -1,14 +1,108 @@
 # app/core/flow.py
 from app.core.prompts import QUESTIONS, FOLLOWUP_HINT, SCORING_PROMPT, FOLLOWUP_GEN_PROMPT
 from app.core.schema import SessionState, BantRecord, BantScore
-from app.core.validator import build_parse_messages, parse_bant_json_text, parse_bant_with_llm, validate_record, refine_with_errors
+from app.core.validator import build_parse_messages, parse_bant_json_text, parse_bant_with_llm, validate_record, refine_with_errors, coerce_bant_payload
 from app.core.llm import GigaChatClient
+from app.core.stats import STATS
+from app.core.metrics import METRICS
+from app.core.timing import submit_in_context
+from app.core.accounting import accounted_chat
+from app.core.chunking import split_transcript, reduce_payloads
+from app.core.followup_cache import FollowupCache
 from pydantic import ValidationError
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import json
+import threading
+
+# Поля записи, которые не идут в промпты скоринга и followup'ов: на оценку не влияют, а от прогона
+# к прогону различаются (время изменения, id сделки) — иначе одинаковые по сути запросы дают разные
+# отпечатки и кассета (app/core/cassette.py) промахивается при воспроизведении
+PROMPT_EXCLUDE = {"score", "updated_at", "deal_id"}
+
+def merge_slot_values(merged: dict, data: dict, slots) -> dict:
+    """Мерж слотов записи: непустые значения из data перекрывают merged, пустые не затирают известные"""
+    for k in slots:
+        if k in data and isinstance(data[k], dict):
+            merged.setdefault(k, {}).update({
+                kk: vv for kk, vv in data[k].items()
+                if vv not in ("", [], {}) and vv is not None
+            })
+    return merged
 
 class BantFlow:
-    def __init__(self, llm: GigaChatClient):
+    SLOTS = ["budget", "authority", "need", "timing"]
+
+    def __init__(
+        self,
+        llm: GigaChatClient,
+        compact_prompts: bool = True,
+        fanout: bool = False,
+        fanout_min_chars: int = 600,
+        max_concurrency: int = 4,
+        chunk_chars: int = 4000,
+        followup_cache: FollowupCache | None = None,
+        concurrent_requests: int = 1,
+    ):
         self.llm = llm
+        # Компактный промпт текущего слота вместо полной схемы (с эскалацией на многотемных ответах)
+        self.compact_prompts = compact_prompts
+        # Для длинных ответов — параллельное извлечение по слотам вместо одного большого вызова
+        self.fanout = fanout
+        self.fanout_min_chars = fanout_min_chars
+        self.max_concurrency = max(1, max_concurrency)
+        # Сколько process_answer может идти одновременно (API, batch, задачи): общий пул рассчитан
+        # на всех сразу, чтобы fan-out одного запроса не стоял в очереди за чужими вызовами
+        self.concurrent_requests = max(1, concurrent_requests)
+        # Ответы длиннее chunk_chars режутся на куски, извлекаются параллельно и сворачиваются
+        self.chunk_chars = chunk_chars
+        # Кэш followup-вопросов по шаблону пробелов (None — всегда спрашивать LLM)
+        self.followup_cache = followup_cache
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Общий пул для параллельных LLM-вызовов: max_concurrency × concurrent_requests потоков
+        (создаются по мере надобности). Лимит одного запроса — max_concurrency — держит вызывающий.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency * self.concurrent_requests, thread_name_prefix="bant-llm"
+                    )
+        return self._executor
+
+    @staticmethod
+    def _submit_limited(pool: ThreadPoolExecutor, limit: threading.Semaphore, fn, *args):
+        """Отправка в общий пул под семафором запроса: слот освобождается по завершении вызова"""
+        limit.acquire()
+        fut = submit_in_context(pool, fn, *args)
+        fut.add_done_callback(lambda _: limit.release())
+        return fut
+
+    def _extract_fanout(self, answer_text: str) -> dict:
+        """Четыре компактных вызова по слотам параллельно; из каждого берется только свой слот"""
+        STATS.incr("fanout_extractions")
+        pool = self._get_executor()
+        limit = threading.Semaphore(self.max_concurrency)
+        futures = {
+            slot: self._submit_limited(pool, limit, parse_bant_with_llm, self.llm, answer_text, slot, False)
+            for slot in self.SLOTS
+        }
+        data, errors = {}, []
+        for slot, fut in futures.items():
+            try:
+                part = fut.result()
+            except Exception as e:
+                STATS.incr("fanout_slot_errors")
+                errors.append(f"{slot}: {e}")
+                continue
+            if isinstance(part, dict) and isinstance(part.get(slot), dict):
+                data[slot] = part[slot]
+        if errors and not data:
+            raise ValueError("; ".join(errors))
+        return data
 
     def next_slot(self, state: SessionState) -> str | None:
         for s in state.required_slots:
@@ -42,21 +136,23 @@ class BantFlow:
     def calculate_score(self, record: BantRecord) -> BantScore:
         """Рассчитывает скоринг BANT с помощью LLM"""
         try:
-            # Подготавливаем данные для скоринга (без поля score)
-            record_data = record.model_dump(exclude={'score'})
+            # Подготавливаем данные для скоринга (только слоты и filled)
+            record_data = record.model_dump(exclude=PROMPT_EXCLUDE)
             
             messages = [
                 {"role": "system", "content": SCORING_PROMPT},
                 {"role": "user", "content": json.dumps(record_data, ensure_ascii=False, default=str)}
             ]
             
-            response = self.llm.chat(messages, json_mode=True)
+            response = accounted_chat(self.llm, "scoring", messages, json_mode=True)
             score_data = json.loads(response)
             return BantScore(**score_data)
             
         except (json.JSONDecodeError, ValidationError) as e:
             # Fallback на эвристический скоринг
-            return self._heuristic_score(record)
+            STATS.incr("heuristic_score_fallbacks")
+            with METRICS.timed("heuristic_score"):
+                return self._heuristic_score(record)
 
     def _heuristic_score(self, record: BantRecord) -> BantScore:
         """Эвристический скоринг как fallback"""
@@ -143,8 +239,12 @@ class BantFlow:
 
     def generate_followups(self, record: BantRecord, score: BantScore) -> list[str]:
         """Генерирует уточняющие вопросы на основе скоринга"""
+        if self.followup_cache is not None:
+            cached = self.followup_cache.get(record)
+            if cached is not None:
+                return cached
         try:
-            record_data = record.model_dump(exclude={'score'})
+            record_data = record.model_dump(exclude=PROMPT_EXCLUDE)
             score_data = score.model_dump()
             
             messages = [
@@ -152,7 +252,7 @@ class BantFlow:
                 {"role": "user", "content": f"BantRecord: {json.dumps(record_data, ensure_ascii=False, default=str)}\nBantScore: {json.dumps(score_data, ensure_ascii=False)}"}
             ]
             
-            response = self.llm.chat(messages, json_mode=True)
+            response = accounted_chat(self.llm, "followups", messages, json_mode=True)
             followup_data = json.loads(response)
             
             # Собираем все followup вопросы в один список
@@ -161,12 +261,14 @@ class BantFlow:
                 if isinstance(slot_followups, list):
                     all_followups.extend(slot_followups)
             
-            # Возвращаем максимум 2 вопроса
+            # Возвращаем максимум 2 вопроса; в кэш не кладем — они про ответы этой сделки
             return all_followups[:2]
             
         except (json.JSONDecodeError, ValidationError, KeyError):
             # Fallback на эвристические вопросы
-            return self._heuristic_followups(score, record)
+            STATS.incr("heuristic_followup_fallbacks")
+            with METRICS.timed("heuristic_followups"):
+                return self._heuristic_followups(score, record)
 
     def _heuristic_followups(self, score: BantScore, record: BantRecord) -> list[str]:
         """Эвристическая генерация followup вопросов с проверкой на повторные вопросы"""
@@ -190,49 +292,97 @@ class BantFlow:
         
         return followups[:2]
 
+    def _extract_chunked(self, answer_text: str) -> dict:
+        """
+        Map-reduce для длинных транскриптов: куски извлекаются параллельно (в работе не больше
+        max_concurrency на запрос), payload'ы сворачиваются в порядке кусков через reduce_payloads.
+        """
+        STATS.incr("chunked_extractions")
+        pool = self._get_executor()
+        window = self.max_concurrency
+        results: list[dict | None] = []
+        pending: dict = {}
+        errors = []
+
+        def collect(done) -> None:
+            for fut in done:
+                idx = pending.pop(fut)
+                try:
+                    results[idx] = coerce_bant_payload(fut.result())
+                except Exception as e:
+                    STATS.incr("chunk_errors")
+                    errors.append(f"chunk {idx}: {e}")
+
+        for idx, chunk in enumerate(split_transcript(answer_text, self.chunk_chars)):
+            results.append(None)
+            pending[submit_in_context(pool, parse_bant_with_llm, self.llm, chunk)] = idx
+            if len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(list(pending))
+
+        STATS.incr("chunks_extracted", len(results))
+        payloads = [r for r in results if r is not None]
+        if not payloads:
+            raise ValueError("; ".join(errors) or "Empty transcript")
+        return reduce_payloads(payloads)
+
+    def _merge_payload(self, state: SessionState, data: dict) -> None:
+        """Мержит извлеченные данные в запись: пустые значения не затирают уже известные"""
+        data = coerce_bant_payload(data)
+        merged = merge_slot_values(state.record.model_dump(), data, self.SLOTS)
+        new_rec = BantRecord(**{**merged, "deal_id": state.deal_id})
+        new_rec.filled = validate_record(new_rec)
+        state.record = new_rec
+
     def process_answer(self, state: SessionState, answer_text: str) -> tuple[SessionState, str | None, list[str]]:
+        with METRICS.timed("total"):
+            return self._process_answer(state, answer_text)
+
+    def _process_answer(self, state: SessionState, answer_text: str) -> tuple[SessionState, str | None, list[str]]:
+        STATS.incr("answers_processed")
         # 1) извлечь JSON с использованием json_mode
         try:
-            data = parse_bant_with_llm(self.llm, answer_text)
-            merged = state.record.model_dump()
-            for k in ["budget", "authority", "need", "timing"]:
-                if k in data and isinstance(data[k], dict):
-                    merged[k].update({
-                        kk: vv for kk, vv in data[k].items() 
-                        if vv not in ("", [], {}) and vv is not None
-                    })
-            new_rec = BantRecord(**{**merged, "deal_id": state.deal_id})
-            new_rec.filled = validate_record(new_rec)
-            state.record = new_rec
+            with METRICS.timed("llm_parse"):
+                if self.chunk_chars and len(answer_text) > self.chunk_chars:
+                    data = self._extract_chunked(answer_text)
+                elif self.fanout and len(answer_text) >= self.fanout_min_chars:
+                    data = self._extract_fanout(answer_text)
+                else:
+                    slot = state.current_slot if self.compact_prompts else None
+                    data = parse_bant_with_llm(self.llm, answer_text, slot)
+            with METRICS.timed("merge"):
+                self._merge_payload(state, data)
         except (ValueError, ValidationError) as e:
             # Fallback на старый метод с ретраем
-            msgs = build_parse_messages(answer_text)
-            text = self.llm.chat(msgs)
-            
-            for _ in range(2):  # одна попытка доисправления
-                try:
-                    data = parse_bant_json_text(text)
-                    merged = state.record.model_dump()
-                    for k in ["budget", "authority", "need", "timing"]:
-                        if k in data and isinstance(data[k], dict):
-                            merged[k].update({
-                                kk: vv for kk, vv in data[k].items() 
-                                if vv not in ("", [], {}) and vv is not None
-                            })
-                    new_rec = BantRecord(**{**merged, "deal_id": state.deal_id})
-                    new_rec.filled = validate_record(new_rec)
-                    state.record = new_rec
-                    break
-                except (ValueError, ValidationError) as e:
-                    msgs = refine_with_errors(msgs, str(e))
-                    text = self.llm.chat(msgs)
+            STATS.incr("parse_fallbacks")
+            with METRICS.timed("fallback"):
+                msgs = build_parse_messages(answer_text)
+                text = accounted_chat(self.llm, "extract_fallback", msgs)
+                
+                attempts = 2  # одна попытка доисправления
+                for attempt in range(attempts):
+                    try:
+                        data = parse_bant_json_text(text)
+                        self._merge_payload(state, data)
+                        break
+                    except (ValueError, ValidationError) as e:
+                        if attempt == attempts - 1:
+                            STATS.incr("parse_failures")
+                            break  # ответ на последний refine все равно не был бы разобран
+                        STATS.incr("refine_calls")
+                        with METRICS.timed("refine"):
+                            msgs = refine_with_errors(msgs, str(e))
+                            text = accounted_chat(self.llm, "refine", msgs)
         
         # 2) Рассчитать скоринг
-        score = self.calculate_score(state.record)
+        with METRICS.timed("scoring"):
+            score = self.calculate_score(state.record)
         state.record.score = score
         
         # 3) Сгенерировать followup вопросы
-        followups = self.generate_followups(state.record, score)
+        with METRICS.timed("followups"):
+            followups = self.generate_followups(state.record, score)
         
         # 4) Определить следующий вопрос
         if followups:
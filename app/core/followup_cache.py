@@ -0,0 +1,110 @@
+# app/core/followup_cache.py
+"""
+Кэш уточняющих вопросов по шаблону пробелов в записи.
+Ключ — только набор незаполненных полей по каждому слоту, значения — только общие
+(эвристические) вопросы, которые зависят от пробелов, а не от содержания сделки. Вопросы LLM
+ссылаются на ответы конкретного клиента и в кэш не попадают: на другой сделке они неуместны.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+
+from app.core.schema import BantRecord
+
+SLOTS = ["budget", "authority", "need", "timing"]
+
+# Ключевое поле слота — то же, по которому BantFlow.next_slot считает слот заполненным
+_KEY_FIELDS = {
+    "budget": {"have_budget": True},
+    "authority": {"decision_maker": "Генеральный директор"},
+    "need": {"pain_points": ["Ручной учет", "Потеря заявок"]},
+    "timing": {"timeframe": "this_quarter"},
+}
+_FULL_FIELDS = {
+    "budget": {"have_budget": True, "amount_min": 500000, "amount_max": 700000, "currency": "RUB", "comment": "-"},
+    "authority": {"decision_maker": "Генеральный директор", "stakeholders": ["Финансовый директор"],
+                  "decision_process": "-", "risks": ["-"]},
+    "need": {"pain_points": ["Ручной учет", "Потеря заявок"], "current_solution": "Excel",
+             "success_criteria": ["Отчеты", "Скорость"], "priority": "high"},
+    "timing": {"timeframe": "this_quarter", "deadline": "2030-01-01", "next_step": "-"},
+}
+
+
+def _missing(value) -> bool:
+    return value is None or value == "" or value == []
+
+
+def missing_signature(record: BantRecord) -> tuple:
+    """Для каждого слота — кортеж незаполненных полей"""
+    return tuple(
+        tuple(field for field, value in getattr(record, slot).model_dump().items() if _missing(value))
+        for slot in SLOTS
+    )
+
+
+class FollowupCache:
+    """LRU-кэш followup-вопросов с метриками попаданий и вытеснений"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(1, max_size)
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(record: BantRecord) -> tuple:
+        return missing_signature(record)
+
+    def get(self, record: BantRecord) -> list[str] | None:
+        key = self.key(record)
+        with self._lock:
+            followups = self._items.get(key)
+            if followups is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return list(followups)
+
+    def put(self, record: BantRecord, followups: list[str]) -> None:
+        self._put(self.key(record), followups)
+
+    def _put(self, key: tuple, followups: list[str]) -> None:
+        with self._lock:
+            self._items[key] = tuple(followups)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def seed_heuristic(self, flow) -> int:
+        """
+        Предзаполняет кэш эвристическими вопросами BantFlow для типовых состояний:
+        каждый слот пуст, заполнен только ключевым полем или заполнен целиком (3^4 шаблона).
+        Эвристические вопросы задаются только по незаполненным полям, поэтому для записи с тем же
+        шаблоном пробелов они те же, каким бы ни был ее скоринг.
+        """
+        seeded = 0
+        for states in itertools.product(("empty", "key", "full"), repeat=len(SLOTS)):
+            record = BantRecord(deal_id="seed")
+            for slot, state in zip(SLOTS, states):
+                fields = {"empty": {}, "key": _KEY_FIELDS[slot], "full": _FULL_FIELDS[slot]}[state]
+                setattr(record, slot, type(getattr(record, slot))(**fields))
+            score = flow._heuristic_score(record)
+            self._put(self.key(record), flow._heuristic_followups(score, record))
+            seeded += 1
+        return seeded
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,235 @@
+# app/core/json_repair.py
+"""
+Толерантный разбор "почти JSON" из ответов LLM.
+
+Однопроходный парсер рекурсивного спуска, который локально чинит типичные дефекты:
+  - комментарии // и /* */ (модель копирует их из SCHEMA_HINT)
+  - висячие и двойные запятые
+  - строки в одинарных кавычках, ключи без кавычек, True/False/None
+  - обрыв вывода по max_tokens: незакрытые строки, скобки, ключи без значения
+  - русская запись чисел: "1 500 000", "1,5 млн", "500 тыс", "50к"; запятые-разделители
+    разрядов по-английски ("1,000,000", "12,345") — тысячи, одна запятая и 1–2 цифры — дробь
+  - мусор вокруг объекта: markdown-ограждения, пояснения, "..." из примеров
+"""
+import json
+import re
+
+_LITERALS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None,
+}
+
+_JSON_NUMBER_RE = re.compile(r"^-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+
+_MULTIPLIERS = {
+    "к": 1_000, "k": 1_000, "тыс": 1_000, "тысяч": 1_000, "тысячи": 1_000, "тысяча": 1_000,
+    "м": 1_000_000, "m": 1_000_000, "млн": 1_000_000, "миллион": 1_000_000, "миллиона": 1_000_000,
+    "миллионов": 1_000_000, "kk": 1_000_000,
+    "млрд": 1_000_000_000, "миллиард": 1_000_000_000, "миллиарда": 1_000_000_000,
+    "миллиардов": 1_000_000_000,
+}
+
+_RU_NUMBER_RE = re.compile(
+    r"^(?P<sign>[+-])?"
+    r"(?P<int>\d{1,3}(?:[ \u00a0\u202f']\d{3})+|[1-9]\d{0,2}(?:,\d{3})+|\d+)"
+    r"(?:[.,](?P<frac>\d+))?"
+    r"\s*(?P<mult>[a-zа-яё]+)?\.?$",
+    re.IGNORECASE,
+)
+
+# Разделители "голых" токенов (значения без кавычек)
+_BARE_STOP = set(",:}]\n\r")
+
+
+def parse_ru_number(text: str) -> float | int | None:
+    """Разбирает число в русской записи; None если это не число"""
+    text = text.strip()
+    if _JSON_NUMBER_RE.match(text):
+        return json.loads(text)
+    m = _RU_NUMBER_RE.match(text)
+    if not m:
+        return None
+    mult = 1
+    if m.group("mult"):
+        mult = _MULTIPLIERS.get(m.group("mult").lower())
+        if mult is None:
+            return None
+    digits = re.sub(r"[ \u00a0\u202f',]", "", m.group("int"))
+    frac = m.group("frac")
+    value = float(f"{digits}.{frac}") if frac else int(digits)
+    value = value * mult
+    if m.group("sign") == "-":
+        value = -value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value
+
+
+class _TolerantParser:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.n = len(text)
+
+    # ---------- лексика ----------
+    def _skip(self) -> None:
+        """Пропускает пробелы и комментарии"""
+        text, n = self.text, self.n
+        while self.pos < n:
+            ch = text[self.pos]
+            if ch in " \t\r\n\ufeff":
+                self.pos += 1
+            elif text.startswith("//", self.pos) or ch == "#":
+                end = text.find("\n", self.pos)
+                self.pos = n if end == -1 else end + 1
+            elif text.startswith("/*", self.pos):
+                end = text.find("*/", self.pos + 2)
+                self.pos = n if end == -1 else end + 2
+            else:
+                break
+
+    def _peek(self) -> str:
+        return self.text[self.pos] if self.pos < self.n else ""
+
+    # ---------- значения ----------
+    def parse_value(self, in_object: bool = False):
+        self._skip()
+        ch = self._peek()
+        if ch == "{":
+            self.pos += 1
+            return self.parse_object()
+        if ch == "[":
+            self.pos += 1
+            return self.parse_array()
+        if ch in ("\"", "'"):
+            self.pos += 1
+            return self.parse_string(ch)
+        return self.parse_bare(in_object)
+
+    def parse_object(self) -> dict:
+        obj: dict = {}
+        while True:
+            self._skip()
+            ch = self._peek()
+            if not ch:
+                return obj  # обрыв вывода
+            if ch == "}":
+                self.pos += 1
+                return obj
+            if ch in ",;":
+                self.pos += 1
+                continue
+            if ch == "]":
+                # перепутанная скобка — закрываем объект
+                self.pos += 1
+                return obj
+            if ch in ("\"", "'"):
+                self.pos += 1
+                key = self.parse_string(ch)
+            else:
+                key = self.parse_bare(in_object=True, raw=True)
+            self._skip()
+            if self._peek() != ":":
+                # ключ без значения ("..." из примера, обрыв) — отбрасываем
+                if not self._peek():
+                    return obj
+                if self._peek() not in ",}":
+                    self.pos += 1
+                continue
+            self.pos += 1
+            self._skip()
+            if not self._peek():
+                return obj  # обрыв после двоеточия
+            if self._peek() in ",}":
+                obj[key] = None
+                continue
+            obj[key] = self.parse_value(in_object=True)
+
+    def parse_array(self) -> list:
+        arr: list = []
+        while True:
+            self._skip()
+            ch = self._peek()
+            if not ch:
+                return arr
+            if ch == "]":
+                self.pos += 1
+                return arr
+            if ch == ",":
+                self.pos += 1
+                continue
+            if ch == "}":
+                self.pos += 1
+                return arr
+            start = self.pos
+            value = self.parse_value()
+            if self.pos == start:
+                self.pos += 1  # защита от зацикливания на неожиданном символе
+                continue
+            if value != "...":
+                arr.append(value)
+
+    def parse_string(self, quote: str) -> str:
+        text, n = self.text, self.n
+        out = []
+        while self.pos < n:
+            ch = text[self.pos]
+            if ch == "\\":
+                if self.pos + 1 >= n:
+                    self.pos = n
+                    break
+                esc = text[self.pos + 1]
+                if esc == "u" and self.pos + 6 <= n:
+                    try:
+                        out.append(chr(int(text[self.pos + 2:self.pos + 6], 16)))
+                        self.pos += 6
+                        continue
+                    except ValueError:
+                        pass
+                out.append({"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}.get(esc, esc))
+                self.pos += 2
+                continue
+            if ch == quote:
+                self.pos += 1
+                return "".join(out)
+            out.append(ch)
+            self.pos += 1
+        return "".join(out)  # незакрытая строка
+
+    def parse_bare(self, in_object: bool = False, raw: bool = False):
+        text, n = self.text, self.n
+        start = self.pos
+        while self.pos < n:
+            ch = text[self.pos]
+            if ch == "," and in_object and not raw:
+                # десятичная запятая: "1,5 млн" внутри объекта, где после запятой не может идти ключ-число
+                if self.pos + 1 < n and text[self.pos + 1].isdigit() and text[start:self.pos].strip()[-1:].isdigit():
+                    self.pos += 1
+                    continue
+            if ch in _BARE_STOP or text.startswith("//", self.pos) or text.startswith("/*", self.pos):
+                break
+            if raw and ch in ("\"", "'", "{", "["):
+                break
+            self.pos += 1
+        token = text[start:self.pos].strip()
+        if raw:
+            return token
+        if token in _LITERALS:
+            return _LITERALS[token]
+        number = parse_ru_number(token)
+        if number is not None:
+            return number
+        return token
+
+
+def loads_tolerant(text: str):
+    """
+    Разбирает первый JSON-объект в тексте, исправляя типичные дефекты.
+    Поднимает ValueError, если в тексте нет объекта.
+    """
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON found")
+    parser = _TolerantParser(text)
+    parser.pos = start + 1
+    return parser.parse_object()
@@ -1,11 +1,16 @@
 # app/core/llm.py
 from __future__ import annotations
 import os
+import threading
 import time
 import uuid
 from typing import List, Dict, Any, Optional
 
 import requests
+import requests.adapters
+
+from app.core.cassette import Cassette
+from app.core.stats import STATS
 
 
 def _env_bool(name: str, default: bool = True) -> bool:
@@ -29,6 +34,9 @@ class GigaChatClient:
     Необязательные ENV (дефолты даны):
       GIGACHAT_AUTH_URL   — https://ngw.devices.sberbank.ru:9443/api/v2/oauth
       GIGACHAT_API_URL    — https://gigachat.devices.sberbank.ru/api/v1
+      GIGACHAT_CASSETTE   — путь к кассете (см. app/core/cassette.py); без него — обычный режим
+      GIGACHAT_CASSETTE_MODE    — record (писать ответы) | replay (отдавать из кассеты, без сети)
+      GIGACHAT_CASSETTE_LATENCY — zero | real (задержка при replay)
     """
 
     def __init__(
@@ -39,10 +47,11 @@ class GigaChatClient:
         auth_url: Optional[str] = None,
         api_url: Optional[str] = None,
         timeout_sec: int = 60,
+        pool_size: int = 16,
+        cassette: Optional[Cassette] = None,
     ) -> None:
-        self.auth_key = os.getenv("GIGACHAT_AUTH_KEY")  # base64(client:secret)
-        if not self.auth_key:
-            raise RuntimeError("GIGACHAT_AUTH_KEY is required")
+        # base64(client:secret); проверяется при первом запросе токена, а не при создании клиента
+        self.auth_key = os.getenv("GIGACHAT_AUTH_KEY")
 
         self.model = model or os.getenv("GIGACHAT_MODEL", "GigaChat-Pro")
         self.scope = scope or os.getenv("GIGACHAT_SCOPE", "GIGACHAT_API_PERS")
@@ -61,12 +70,27 @@ class GigaChatClient:
 
         self._token: Optional[str] = None
         self._exp_ts: float = 0.0  # unix time (seconds)
+        self._local = threading.local()  # usage последнего вызова в текущем потоке
+        self.cassette = cassette if cassette is not None else Cassette.from_env()
+
+        # Пул keep-alive соединений: без него каждый вызов платит TCP+TLS handshake
+        self._http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        """Поле usage последнего ответа chat() в текущем потоке (prompt/completion tokens)"""
+        return getattr(self._local, "usage", None)
 
     # ---------- OAuth ----------
     def _need_refresh(self) -> bool:
         return not self._token or time.time() >= (self._exp_ts - 30)
 
     def _fetch_token(self) -> str:
+        if not self.auth_key:
+            raise RuntimeError("GIGACHAT_AUTH_KEY is required")
         headers = {
             "Authorization": f"Basic {self.auth_key}",
             "Accept": "application/json",
@@ -74,7 +98,7 @@ class GigaChatClient:
             "RqUID": str(uuid.uuid4()),
         }
         data = {"scope": self.scope}
-        resp = requests.post(
+        resp = self._http.post(
             self.auth_url,
             headers=headers,
             data=data,
@@ -83,10 +107,14 @@ class GigaChatClient:
         )
         resp.raise_for_status()
         payload = resp.json()
+        STATS.incr("llm_token_refreshes")
         self._token = payload["access_token"]
-        # expires_in обычно в секундах, иначе держим безопасный дефолт
-        expires_in = int(payload.get("expires_in", 1800))
-        self._exp_ts = time.time() + expires_in
+        if "expires_at" in payload:
+            # GigaChat отдает момент истечения в миллисекундах unix time
+            self._exp_ts = int(payload["expires_at"]) / 1000
+        else:
+            # expires_in обычно в секундах, иначе держим безопасный дефолт
+            self._exp_ts = time.time() + int(payload.get("expires_in", 1800))
         return self._token
 
     def _ensure_token(self) -> str:
@@ -94,6 +122,25 @@ class GigaChatClient:
             return self._fetch_token()
         return self._token  # type: ignore[return-value]
 
+    def warmup(self) -> bool:
+        """
+        Прогрев: получает токен и открывает соединение с API, чтобы первый
+        chat() не платил за OAuth и handshake. Ошибки не пробрасываются.
+        """
+        if self.cassette is not None and self.cassette.replaying:
+            return True
+        try:
+            token = self._ensure_token()
+            self._http.get(
+                f"{self.api_url}/models",
+                headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
+                timeout=self.timeout_sec,
+                verify=self.verify_ssl,
+            )
+            return True
+        except Exception:
+            return False
+
     # ---------- Chat Completions ----------
     def chat(
         self,
@@ -107,7 +154,6 @@ class GigaChatClient:
         messages: [{"role":"system|user|assistant","content":"..."}]
         json_mode: если True — просит строгий JSON через response_format
         """
-        token = self._ensure_token()
         url = f"{self.api_url}/chat/completions"
         payload: Dict[str, Any] = {
             "model": model or self.model,
@@ -118,6 +164,12 @@ class GigaChatClient:
         if json_mode:
             payload["response_format"] = {"type": "json_object"}
 
+        if self.cassette is not None and self.cassette.replaying:
+            entry = self.cassette.play(payload)
+            self._local.usage = entry.get("usage")
+            return entry["content"]
+
+        token = self._ensure_token()
         headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/json",
@@ -126,7 +178,8 @@ class GigaChatClient:
 
         # один прозрачный ретрай при 401
         for attempt in range(2):
-            resp = requests.post(
+            started = time.perf_counter()
+            resp = self._http.post(
                 url,
                 headers=headers,
                 json=payload,
@@ -134,11 +187,16 @@ class GigaChatClient:
                 verify=self.verify_ssl,
             )
             if resp.status_code == 401 and attempt == 0:
+                STATS.incr("llm_auth_retries")
                 token = self._fetch_token()
                 headers["Authorization"] = f"Bearer {token}"
                 continue
             resp.raise_for_status()
             data = resp.json()
-            return data["choices"][0]["message"]["content"]
+            self._local.usage = data.get("usage")
+            content = data["choices"][0]["message"]["content"]
+            if self.cassette is not None and self.cassette.recording:
+                self.cassette.record(payload, content, self._local.usage, time.perf_counter() - started)
+            return content
 
         raise RuntimeError("GigaChat chat failed after retry")
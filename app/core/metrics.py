@@ -0,0 +1,158 @@
+# app/core/metrics.py
+"""
+Метрики в текстовом формате Prometheus: гистограммы длительности стадий process_answer,
+счетчики STATS, LLM-вызовы по типам из ACCOUNTING и произвольные gauge-коллекторы
+(активные сессии, кэши, очереди). На горячем пути — perf_counter и bisect под коротким локом.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Iterable
+
+from app.core import timing
+from app.core.accounting import ACCOUNTING
+from app.core.stats import STATS
+
+# Границы бакетов, сек: от разбора JSON до долгих LLM-вызовов
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Сэмпл gauge: (метки, значение)
+Sample = tuple[dict, float]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # последний — +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Кумулятивные счетчики по бакетам (включая +Inf) и сумма"""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, acc = [], 0
+        for c in counts:
+            acc += c
+            cumulative.append(acc)
+        return cumulative, total
+
+
+class _Timer:
+    """Пишет длительность в гистограмму стадии и в Server-Timing текущего запроса"""
+    __slots__ = ("_hist", "_name", "_started", "_request")
+
+    def __init__(self, hist: Histogram, name: str):
+        self._hist = hist
+        self._name = name
+
+    def __enter__(self):
+        self._request = timing.current()
+        if self._request is not None:
+            self._request.enter_thread()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._started
+        self._hist.observe(elapsed)
+        if self._request is not None:
+            self._request.add(self._name, elapsed)
+        return False
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._stages: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._collectors: list[tuple[str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def stage(self, name: str) -> Histogram:
+        hist = self._stages.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._stages.setdefault(name, Histogram(self.buckets))
+        return hist
+
+    def timed(self, stage: str) -> _Timer:
+        """with METRICS.timed("scoring"): ... — длительность попадает в гистограмму стадии"""
+        return _Timer(self.stage(stage), stage)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.stage(stage).observe(seconds)
+
+    def add_gauge(self, name: str, help_text: str, fn: Callable[[], Iterable[Sample]]) -> None:
+        """Gauge name; fn отдает сэмплы (метки, значение) на момент скрейпа"""
+        self._collectors.append((name, help_text, fn))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        lines += [
+            "# HELP bant_stage_seconds Длительность стадий process_answer",
+            "# TYPE bant_stage_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+        for stage, hist in stages:
+            cumulative, total = hist.snapshot()
+            for bound, count in zip(self.buckets, cumulative):
+                lines.append(f'bant_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'bant_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'bant_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'bant_stage_seconds_count{{stage="{stage}"}} {cumulative[-1]}')
+
+        lines += [
+            "# HELP bant_events_total События пайплайна (фоллбеки, ретраи, ошибки, обновления токена)",
+            "# TYPE bant_events_total counter",
+        ]
+        for event, count in sorted(STATS.snapshot().items()):
+            lines.append(f"bant_events_total{_labels({'event': event})} {count}")
+
+        accounting = sorted(ACCOUNTING.snapshot().items())
+        for metric, key, help_text in (
+            ("bant_llm_calls_total", "calls", "LLM-вызовы по типам промптов"),
+            ("bant_llm_errors_total", "errors", "Ошибки LLM-вызовов по типам промптов"),
+            ("bant_llm_prompt_tokens_total", "prompt_tokens", "Токены промптов по типам"),
+            ("bant_llm_completion_tokens_total", "completion_tokens", "Токены ответов по типам"),
+            ("bant_llm_seconds_total", "seconds", "Суммарное время LLM-вызовов по типам"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for kind, totals in accounting:
+                lines.append(f"{metric}{_labels({'kind': kind})} {totals.get(key, 0)}")
+
+        for name, help_text, fn in self._collectors:
+            try:
+                samples = list(fn())
+            except Exception:
+                continue  # сломанный коллектор не должен ронять весь скрейп
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {float(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Глобальный реестр процесса
+METRICS = MetricsRegistry()
@@ -70,6 +70,66 @@ SCHEMA_HINT = """
 Выход: {"budget": {"have_budget": true, "amount_min": 500000, "amount_max": 700000, "currency": "RUB", "comment": null}, "authority": {"decision_maker": "Гендиректор Иванов", "stakeholders": ["Финансовый директор"], "decision_process": "Требуется согласование с финансовым директором", "risks": null}, ...}
 """
 
+# ---------- Компактные промпты извлечения по одному слоту ----------
+# Отправляются, когда сессия спрашивает про конкретный current_slot и ответ не похож на
+# многотемный; содержат схему и правила только этой секции.
+
+SLOT_SCHEMAS = {
+    "budget": """{"budget": {
+  "have_budget": bool|null,
+  "amount_min": number|null,
+  "amount_max": number|null,
+  "currency": "RUB|USD|EUR|CNY|GBP"|null,
+  "comment": string|null
+}}""",
+    "authority": """{"authority": {
+  "decision_maker": string|null,
+  "stakeholders": [string]|null,
+  "decision_process": string|null,
+  "risks": [string]|null
+}}""",
+    "need": """{"need": {
+  "pain_points": [string]|null,
+  "current_solution": string|null,
+  "success_criteria": [string]|null,
+  "priority": "low|medium|high|critical"|null
+}}""",
+    "timing": """{"timing": {
+  "timeframe": "this_month|this_quarter|this_half|this_year|unknown"|null,
+  "deadline": "YYYY-MM-DD"|null,
+  "next_step": string|null
+}}""",
+}
+
+SLOT_RULES = {
+    "budget": """- Диапазон "50-100 тысяч" → amount_min=50000, amount_max=100000; одна сумма → amount_min=amount_max
+- "Есть бюджет" без суммы → have_budget=true, суммы null
+- "Бюджета нет" / "не заложено" / "не выделен" → have_budget=false
+- Конвертируй тысячи/миллионы в полные числа (50к → 50000)""",
+    "authority": """- decision_maker — ФИО или должность финального ЛПР
+- stakeholders — все упомянутые роли кроме главного ЛПР
+- decision_process — этапы согласования
+- "Не знаем" / "не определились" → decision_maker=null""",
+    "need": """- pain_points — конкретные проблемы, не общие фразы
+- "Проблем нет" / "все хорошо" → pain_points=[]
+- priority: critical (срочно, горит), high (важно), medium (рассматривают), low (интересуются)""",
+    "timing": """- this_month / this_quarter / this_half / this_year — до конца текущего месяца / квартала / полугодия / года
+- unknown — неопределенные сроки, "не знаем", следующий год и позже
+- deadline — жесткая дата в формате YYYY-MM-DD""",
+}
+
+SLOT_SCHEMA_HINTS = {
+    slot: (
+        f'Извлеки из ответа менеджера только секцию "{slot}" BANT. '
+        "Верни ТОЛЬКО валидный JSON без комментариев и дополнительного текста.\n\n"
+        f"**Схема ответа:**\n{SLOT_SCHEMAS[slot]}\n\n"
+        f"**Правила:**\n{SLOT_RULES[slot]}\n"
+        "- Если информация отсутствует или неясна → null, НЕ додумывай данные\n"
+        "- Отрицательные ответы — тоже валидные данные\n"
+    )
+    for slot in SLOT_SCHEMAS
+}
+
 FOLLOWUP_HINT = """
 Сгенерируй один конкретный уточняющий вопрос на русском языке для секции "{slot}" BANT-квалификации.
 
@@ -59,3 +59,4 @@ class SessionState(BaseModel):
     required_slots: List[str] = ["budget", "authority", "need", "timing"]
     current_slot: Optional[str] = None
     record: BantRecord
+    version: int = 0  # растет при каждом изменении сессии; основа ETag
@@ -0,0 +1,31 @@
+# app/core/stats.py
+import threading
+from collections import Counter
+
+
+class FlowStats:
+    """Потокобезопасные счетчики событий пайплайна извлечения"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters[name]
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+# Глобальные счетчики процесса
+STATS = FlowStats()
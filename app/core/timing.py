@@ -0,0 +1,67 @@
+# app/core/timing.py
+"""
+Сбор длительностей стадий в рамках одного запроса (для Server-Timing).
+Коллектор лежит в contextvar; METRICS.timed() пишет в него автоматически. Пулы потоков
+должны запускать задачи через submit_in_context(), иначе стадии из воркеров потеряются.
+Параллельные стадии суммируются, поэтому сумма может превышать время запроса.
+"""
+import contextvars
+import threading
+from concurrent.futures import Executor, Future
+
+
+class RequestTimings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: dict[str, float] = {}
+        self._order: list[str] = []
+        # Потоки, выполнявшие код запроса (для семплирующего профилировщика)
+        self._thread_ids: set[int] = set()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            if name not in self._totals:
+                self._order.append(name)
+                self._totals[name] = 0.0
+            self._totals[name] += seconds
+
+    def enter_thread(self) -> None:
+        with self._lock:
+            self._thread_ids.add(threading.get_ident())
+
+    def thread_ids(self) -> list[int]:
+        """Копия под замком: профилировщик обходит ее из своего потока, пока воркеры добавляют новые"""
+        with self._lock:
+            return list(self._thread_ids)
+
+    def items(self) -> list[tuple[str, float]]:
+        with self._lock:
+            return [(name, self._totals[name]) for name in self._order]
+
+
+_current: contextvars.ContextVar[RequestTimings | None] = contextvars.ContextVar("request_timings", default=None)
+
+
+def begin() -> tuple[RequestTimings, contextvars.Token]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current() -> RequestTimings | None:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def submit_in_context(pool: Executor, fn, *args, **kwargs) -> Future:
+    """pool.submit с копией текущего контекста: стадии воркера попадут в коллектор запроса"""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
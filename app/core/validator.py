@@ -1,33 +1,78 @@
 # app/core/validator.py
 import json
+import re
+from datetime import date, datetime
 from pydantic import ValidationError
 from app.core.schema import BantRecord
-from app.core.prompts import SCHEMA_HINT
+from app.core.prompts import SCHEMA_HINT, SLOT_SCHEMA_HINTS
+from app.core.accounting import accounted_chat
+from app.core.json_repair import loads_tolerant, parse_ru_number
+from app.core.stats import STATS
+from app.core.metrics import METRICS
 
-def build_parse_messages(answer_text: str):
+# Маркеры тем для эскалации компактного промпта на полную схему
+_TOPIC_MARKERS = {
+    "budget": re.compile(r"бюджет|руб|₽|\$|€|долл|евро|тыс|млн|млрд|сумм|стоимост|денег|деньг|\d+\s*к\b", re.I),
+    "authority": re.compile(r"лпр|решени|решает|директор|руководител|ceo|cfo|cto|владел|согласов|закупк|тендер", re.I),
+    "need": re.compile(r"проблем|бол[ьи]|болит|потребност|нужн|задач|excel|вручную|критери|используют", re.I),
+    "timing": re.compile(r"срок|квартал|месяц|недел|\bгод|дедлайн|запуск|до конца|январ|феврал|март|апрел|ма[йя]|июн|июл|август|сентябр|октябр|ноябр|декабр", re.I),
+}
+
+# Длинные ответы почти всегда затрагивают несколько секций
+MULTI_TOPIC_MIN_CHARS = 400
+
+def looks_multi_topic(answer_text: str, slot: str | None) -> bool:
+    """True, если ответ, вероятно, содержит данные не только по слоту slot"""
+    if slot not in _TOPIC_MARKERS or len(answer_text) >= MULTI_TOPIC_MIN_CHARS:
+        return True
+    return any(marker.search(answer_text) for other, marker in _TOPIC_MARKERS.items() if other != slot)
+
+def build_parse_messages(answer_text: str, slot: str | None = None, escalate: bool = True):
+    """
+    Сообщения для извлечения. С slot — компактная схема одной секции,
+    если ответ не выглядит многотемным (или escalate=False); иначе полная SCHEMA_HINT.
+    """
+    hint = SCHEMA_HINT
+    if slot is not None and not (escalate and looks_multi_topic(answer_text, slot)):
+        hint = SLOT_SCHEMA_HINTS[slot]
     return [
-        {"role": "system", "content": SCHEMA_HINT},
+        {"role": "system", "content": hint},
         {"role": "user", "content": answer_text.strip()}
     ]
 
-def parse_bant_with_llm(llm, answer_text: str) -> dict:
+def parse_bant_with_llm(llm, answer_text: str, slot: str | None = None, escalate: bool = True) -> dict:
     """Парсинг ответа через LLM с json_mode"""
-    messages = build_parse_messages(answer_text)
+    with METRICS.timed("pre_parse"):
+        messages = build_parse_messages(answer_text, slot, escalate)
+    kind = "extract" if messages[0]["content"] is SCHEMA_HINT else "extract_slot"
+    if kind == "extract_slot":
+        STATS.incr("compact_prompts")
     try:
         # Используем json_mode для строгого JSON
-        response = llm.chat(messages, json_mode=True)
+        response = accounted_chat(llm, kind, messages, json_mode=True)
         return parse_bant_json_text(response)
     except Exception as e:
         # Fallback на обычный режим
-        response = llm.chat(messages)
+        STATS.incr("parse_retry_calls")
+        response = accounted_chat(llm, f"{kind}_retry", messages)
         return parse_bant_json_text(response)
 
 def parse_bant_json_text(text: str) -> dict:
     # Вырезаем JSON-объект (на случай если модель добавила текст)
     start, end = text.find("{"), text.rfind("}")
-    if start == -1 or end == -1:
+    if start == -1:
         raise ValueError("No JSON found")
-    return json.loads(text[start:end+1])
+    if end > start:
+        try:
+            data = json.loads(text[start:end+1])
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+    # Локальный ремонт: комментарии, висячие запятые, обрыв по max_tokens и т.п.
+    data = loads_tolerant(text[start:])
+    STATS.incr("json_repaired")
+    return data
 
 def validate_record(record: BantRecord) -> str:
     filled_slots = 0
@@ -53,3 +98,148 @@ def refine_with_errors(messages, errors_text: str):
         "content": f"Исправь JSON строго под схему. Ошибки валидатора: {errors_text}. Верни только JSON."
     })
     return messages
+
+# ---------- Приведение значений к схеме ----------
+
+_TRUE_WORDS = {"true", "yes", "y", "да", "есть", "1"}
+_FALSE_WORDS = {"false", "no", "n", "нет", "0"}
+_NULL_WORDS = {"", "null", "none", "n/a", "-", "нет данных"}
+
+_CURRENCY_ALIASES = {
+    "RUB": ("rub", "rur", "руб", "рубль", "рубля", "рублей", "р", "₽"),
+    "USD": ("usd", "$", "доллар", "доллара", "долларов", "долл"),
+    "EUR": ("eur", "€", "евро"),
+    "CNY": ("cny", "rmb", "¥", "юань", "юаня", "юаней"),
+    "GBP": ("gbp", "£", "фунт", "фунта", "фунтов"),
+}
+_CURRENCY_MAP = {alias: code for code, aliases in _CURRENCY_ALIASES.items() for alias in aliases}
+
+_PRIORITY_MAP = {
+    "low": "low", "низкий": "low", "низкая": "low",
+    "medium": "medium", "средний": "medium", "средняя": "medium",
+    "high": "high", "высокий": "high", "высокая": "high", "важно": "high",
+    "critical": "critical", "критический": "critical", "критичная": "critical",
+    "urgent": "critical", "срочно": "critical",
+}
+
+# next_year в схеме нет: горизонт дальше текущего года считаем неопределенным сроком
+_TIMEFRAME_MAP = {
+    "this_month": "this_month", "month": "this_month", "месяц": "this_month",
+    "this_quarter": "this_quarter", "quarter": "this_quarter", "квартал": "this_quarter",
+    "this_half": "this_half", "half": "this_half", "half_year": "this_half",
+    "полугодие": "this_half", "полгода": "this_half",
+    "this_year": "this_year", "year": "this_year", "год": "this_year",
+    "next_year": "unknown", "следующий_год": "unknown",
+    "unknown": "unknown", "не_знаем": "unknown", "неизвестно": "unknown",
+}
+
+def _to_bool(v):
+    if isinstance(v, bool) or v is None:
+        return v
+    word = str(v).strip().lower()
+    if word in _TRUE_WORDS:
+        return True
+    if word in _FALSE_WORDS:
+        return False
+    raise ValueError(v)
+
+def _to_amount(v):
+    if isinstance(v, bool):
+        raise ValueError(v)
+    if isinstance(v, str):
+        v = parse_ru_number(v)
+    if not isinstance(v, (int, float)) or v < 0:
+        raise ValueError(v)
+    return v
+
+def _to_str(v):
+    if isinstance(v, list):
+        return "; ".join(str(x) for x in v if x not in (None, ""))
+    if isinstance(v, (dict, bool)):
+        raise ValueError(v)
+    return str(v).strip()
+
+def _to_str_list(v):
+    if isinstance(v, str):
+        v = [part for part in re.split(r"[;\n]", v)]
+    if not isinstance(v, list):
+        raise ValueError(v)
+    items = []
+    for x in v:
+        if x is None or isinstance(x, (dict, list)):
+            continue
+        x = str(x).strip()
+        if x:
+            items.append(x)
+    return items
+
+def _to_currency(v):
+    word = str(v).strip()
+    if word.upper() in _CURRENCY_ALIASES:
+        return word.upper()
+    return _CURRENCY_MAP[word.lower().rstrip(".")]
+
+def _to_priority(v):
+    return _PRIORITY_MAP[str(v).strip().lower()]
+
+def _to_timeframe(v):
+    key = re.sub(r"[\s-]+", "_", str(v).strip().lower())
+    return _TIMEFRAME_MAP[key]
+
+def _to_date(v):
+    if isinstance(v, date):
+        return v.isoformat()
+    text = str(v).strip()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y.%m.%d"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(v)
+
+_FIELD_COERCERS = {
+    "budget": {
+        "have_budget": _to_bool, "amount_min": _to_amount, "amount_max": _to_amount,
+        "currency": _to_currency, "comment": _to_str,
+    },
+    "authority": {
+        "decision_maker": _to_str, "stakeholders": _to_str_list,
+        "decision_process": _to_str, "risks": _to_str_list,
+    },
+    "need": {
+        "pain_points": _to_str_list, "current_solution": _to_str,
+        "success_criteria": _to_str_list, "priority": _to_priority,
+    },
+    "timing": {
+        "timeframe": _to_timeframe, "deadline": _to_date, "next_step": _to_str,
+    },
+}
+
+def coerce_bant_payload(data: dict) -> dict:
+    """
+    Приводит почти валидные значения к схеме BantRecord ("1,5 млн" -> 1500000,
+    "руб" -> "RUB", "next_year" -> "unknown", "31.12.2025" -> "2025-12-31").
+    Значения, которые привести нельзя, и неизвестные поля отбрасываются.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("BANT payload must be a JSON object")
+    result = {}
+    for slot, coercers in _FIELD_COERCERS.items():
+        block = data.get(slot)
+        if not isinstance(block, dict):
+            continue
+        clean = {}
+        for field, value in block.items():
+            coerce = coercers.get(field)
+            if coerce is None:
+                continue
+            if value is None or (isinstance(value, str) and value.strip().lower() in _NULL_WORDS):
+                clean[field] = None
+                continue
+            try:
+                clean[field] = coerce(value)
+            except (ValueError, KeyError, TypeError):
+                STATS.incr("payload_values_dropped")
+                continue
+        result[slot] = clean
+    return result
@@ -0,0 +1,172 @@
+# app/services/analytics.py
+"""
+Аналитика воронки, которая ведется инкрементально: при каждом изменении сессии вклад ее
+прошлого состояния вычитается, нового — прибавляется. Чтение (snapshot) — O(число корзин),
+а не O(число сессий).
+
+Счетчики текущего состояния (стадии, заполненность, средние и гистограммы оценок) при старте
+пересчитываются из загруженных сессий — они всегда согласованы с хранилищем. Тренды по дням
+(обновления, переходы в стадию/заполненность, средний total) восстановить из записей нельзя,
+поэтому они хранятся в sidecar-файле рядом с хранилищем (to_dict/load_trend).
+"""
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from app.core.schema import SessionState
+
+SLOTS = ("budget", "authority", "need", "timing")
+# Корзины гистограммы оценок: 0–9, 10–19, ..., 90–100
+BUCKETS = 10
+
+
+class Contribution(NamedTuple):
+    stage: str | None
+    filled: str
+    total: int | None
+    scores: tuple[int, ...] | None  # по SLOTS
+    slots_filled: tuple[bool, ...]
+
+
+def _bucket(value: int) -> int:
+    return min(BUCKETS - 1, max(0, value) // 10)
+
+
+def contribution(state: SessionState) -> Contribution:
+    record = state.record
+    score = record.score
+    slots_filled = tuple(
+        any(v is not None and v != "" and v != [] for k, v in getattr(record, slot).model_dump().items()
+            if k != "updated_at")
+        for slot in SLOTS
+    )
+    return Contribution(
+        stage=score.stage if score else None,
+        filled=record.filled,
+        total=score.total if score else None,
+        scores=tuple(getattr(score, slot).value for slot in SLOTS) if score else None,
+        slots_filled=slots_filled,
+    )
+
+
+class PipelineAnalytics:
+    def __init__(self, max_buckets: int = 400):
+        self.max_buckets = max(1, max_buckets)
+        self._lock = threading.Lock()
+        self._contrib: dict[str, Contribution] = {}
+        self._stages: Counter = Counter()
+        self._filled: Counter = Counter()
+        self._slots_filled = [0] * len(SLOTS)
+        self._score_sums = [0] * (len(SLOTS) + 1)  # SLOTS + total
+        self._scored = 0
+        self._hist = [[0] * BUCKETS for _ in range(len(SLOTS) + 1)]
+        # День (UTC, YYYY-MM-DD) -> агрегаты; старые дни вытесняются сверх max_buckets
+        self._trend: OrderedDict[str, dict] = OrderedDict()
+
+    def _apply(self, c: Contribution, sign: int) -> None:
+        self._stages[c.stage or "unscored"] += sign
+        self._filled[c.filled] += sign
+        for i, filled in enumerate(c.slots_filled):
+            self._slots_filled[i] += sign * filled
+        if c.scores is not None:
+            self._scored += sign
+            for i, value in enumerate((*c.scores, c.total)):
+                self._score_sums[i] += sign * value
+                self._hist[i][_bucket(value)] += sign
+
+    def _day(self, day: str) -> dict:
+        bucket = self._trend.get(day)
+        if bucket is None:
+            bucket = self._trend[day] = {"updates": 0, "stage_entered": {}, "filled_entered": {},
+                                         "total_sum": 0, "total_count": 0}
+            while len(self._trend) > self.max_buckets:
+                self._trend.popitem(last=False)
+        return bucket
+
+    def update(self, *states: SessionState, now: datetime | None = None) -> None:
+        day = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+        contribs = [(st.session_id, contribution(st)) for st in states]
+        with self._lock:
+            for session_id, new in contribs:
+                old = self._contrib.get(session_id)
+                bucket = self._day(day)
+                bucket["updates"] += 1
+                if new == old:
+                    continue
+                if old is not None:
+                    self._apply(old, -1)
+                self._apply(new, +1)
+                self._contrib[session_id] = new
+                if new.stage and (old is None or old.stage != new.stage):
+                    bucket["stage_entered"][new.stage] = bucket["stage_entered"].get(new.stage, 0) + 1
+                if old is None or old.filled != new.filled:
+                    bucket["filled_entered"][new.filled] = bucket["filled_entered"].get(new.filled, 0) + 1
+                if new.total is not None:
+                    bucket["total_sum"] += new.total
+                    bucket["total_count"] += 1
+
+    def rebuild(self, states) -> None:
+        """Счетчики текущего состояния из сессий (при старте); тренды не трогает"""
+        with self._lock:
+            self._contrib.clear()
+            self._stages.clear()
+            self._filled.clear()
+            self._slots_filled = [0] * len(SLOTS)
+            self._score_sums = [0] * (len(SLOTS) + 1)
+            self._scored = 0
+            self._hist = [[0] * BUCKETS for _ in range(len(SLOTS) + 1)]
+            for st in states:
+                c = contribution(st)
+                self._contrib[st.session_id] = c
+                self._apply(c, +1)
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            old = self._contrib.pop(session_id, None)
+            if old is not None:
+                self._apply(old, -1)
+
+    def snapshot(self, days: int | None = None) -> dict:
+        with self._lock:
+            sessions = len(self._contrib)
+            names = (*SLOTS, "total")
+            trend = list(self._trend.items())
+            if days is not None:
+                trend = trend[-days:] if days > 0 else []
+            return {
+                "sessions": sessions,
+                "scored": self._scored,
+                "stages": {k: v for k, v in self._stages.items() if v},
+                "filled": {k: v for k, v in self._filled.items() if v},
+                "fill_rate": {slot: (self._slots_filled[i] / sessions if sessions else 0.0)
+                              for i, slot in enumerate(SLOTS)},
+                "avg_score": {name: (self._score_sums[i] / self._scored if self._scored else None)
+                              for i, name in enumerate(names)},
+                "score_histogram": {name: list(self._hist[i]) for i, name in enumerate(names)},
+                "trend": [
+                    {
+                        "day": day,
+                        "updates": b["updates"],
+                        "stage_entered": dict(b["stage_entered"]),
+                        "filled_entered": dict(b["filled_entered"]),
+                        "avg_total": b["total_sum"] / b["total_count"] if b["total_count"] else None,
+                    }
+                    for day, b in trend
+                ],
+            }
+
+    def to_dict(self) -> dict:
+        """Персистентная часть — тренды по дням"""
+        with self._lock:
+            return {"version": 1, "trend": {day: {**b, "stage_entered": dict(b["stage_entered"]),
+                                                   "filled_entered": dict(b["filled_entered"])}
+                                             for day, b in self._trend.items()}}
+
+    def load_trend(self, data: dict | None) -> None:
+        if not data:
+            return
+        with self._lock:
+            self._trend = OrderedDict(sorted((data.get("trend") or {}).items()))
+            while len(self._trend) > self.max_buckets:
+                self._trend.popitem(last=False)
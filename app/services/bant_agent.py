@@ -1,34 +1,252 @@
 # app/services/bant_agent.py
+import threading
 import uuid
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterator
 from app.core.schema import SessionState, BantRecord
 from app.core.flow import BantFlow
+from app.core.followup_cache import FollowupCache
 from app.core.llm import GigaChatClient
+from app.core.prompts import QUESTIONS
+from app.core.config import settings
+from app.core.metrics import METRICS
+from app.core.timing import submit_in_context
+from app.services.storage import JSONStorage
+from app.services.idempotency import IdempotencyStore
+from app.services.jobs import JobManager
+from app.services.dashboard import DashboardIndex
+from app.services.analytics import PipelineAnalytics
+from app.services.deals import DealIndex
+
+def default_storage() -> JSONStorage | None:
+    if settings.storage_type == "json":
+        return JSONStorage(settings.storage_path, compact_bytes=settings.storage_compact_bytes)
+    return None
 
 class BantAgentService:
-    def __init__(self):
-        self.llm = GigaChatClient()
-        self.flow = BantFlow(self.llm)
+    def __init__(self, storage: JSONStorage | None = None, load: bool = True):
+        # process_answer идет одновременно из answer-запросов, batch-пула и воркеров задач
+        concurrent_requests = settings.api_answer_concurrency + settings.api_batch_concurrency + settings.jobs_workers
+        # Соединений — на все одновременные LLM-вызовы: каждый запрос может держать до max_concurrency
+        self.llm = GigaChatClient(pool_size=settings.llm_max_concurrency * concurrent_requests)
+        self.flow = BantFlow(
+            self.llm,
+            compact_prompts=settings.llm_compact_prompts,
+            fanout=settings.llm_fanout,
+            fanout_min_chars=settings.llm_fanout_min_chars,
+            max_concurrency=settings.llm_max_concurrency,
+            chunk_chars=settings.llm_chunk_chars,
+            concurrent_requests=concurrent_requests,
+        )
+        if settings.followup_cache_size > 0:
+            self.flow.followup_cache = FollowupCache(settings.followup_cache_size)
+            self.flow.followup_cache.seed_heuristic(self.flow)
         self.sessions: dict[str, SessionState] = {}
+        # Ответы в одну сессию обрабатываются последовательно
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._prewarm_lock = threading.Lock()
+        self._prewarm_thread: threading.Thread | None = None
+        self._batch_pool = ThreadPoolExecutor(
+            max_workers=settings.api_batch_concurrency, thread_name_prefix="bant-batch"
+        )
+        self.idempotency = IdempotencyStore(
+            ttl_sec=settings.idempotency_ttl_sec, max_size=settings.idempotency_max_keys
+        )
+        self.jobs = JobManager(
+            workers=settings.jobs_workers,
+            max_queued=settings.jobs_max_queued,
+            max_finished=settings.jobs_max_retained,
+            webhook_url=settings.jobs_webhook_url,
+            webhook_timeout=settings.jobs_webhook_timeout,
+        )
+        self.dashboard = DashboardIndex()
+        self.analytics = PipelineAnalytics(max_buckets=settings.analytics_max_days)
+        self.deals = DealIndex()
+        self.storage = storage
+        # Готовность: сессии загружены и индексы собраны. load=False — загрузку запускает
+        # вызывающий (load_in_background), API до ее окончания отвечает 503
+        self.ready = threading.Event()
+        self.load_error: str | None = None
+        # Тренды аналитики пишутся в sidecar по таймеру и при остановке, а не на каждое изменение
+        self._analytics_dirty = False
+        self._closed = threading.Event()
+        if self.storage is not None and settings.analytics_flush_sec > 0:
+            threading.Thread(target=self._flush_loop, name="bant-analytics-flush", daemon=True).start()
+        if load:
+            self.load()
 
-    def start(self, deal_id: str) -> SessionState:
-        sid = str(uuid.uuid4())
+    def load(self) -> None:
+        """Загружает сессии из хранилища и собирает индексы (дашборд, сделки, аналитика)"""
+        try:
+            if self.storage is not None:
+                # Потоковое чтение: в памяти не держатся одновременно сырой JSON и модели
+                for sid, data in self.storage.iter_sessions():
+                    self.sessions[sid] = SessionState(**data)
+                by_update = sorted(self.sessions.values(), key=lambda st: st.record.updated_at)
+                self.dashboard.update(*by_update)
+                self.deals.update(*by_update)
+                self.analytics.rebuild(self.sessions.values())
+                self.analytics.load_trend(self.storage.load_sidecar("analytics"))
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            raise
+        self.ready.set()
+
+    def load_in_background(self) -> threading.Thread:
+        """Загрузка в отдельном потоке: процесс принимает запросы (health, metrics) сразу"""
+        thread = threading.Thread(target=self.load, name="bant-load", daemon=True)
+        thread.start()
+        return thread
+
+    def _persist(self, *states: SessionState) -> None:
+        # Индексы (дашборд, аналитика, сделки) обновляются при каждом изменении сессии, даже без хранилища
+        self.dashboard.update(*states)
+        self.analytics.update(*states)
+        self.deals.update(*states)
+        if self.storage is not None:
+            self._analytics_dirty = True
+            with METRICS.timed("storage"):
+                self.storage.save_sessions(states)
+
+    def flush_analytics(self) -> bool:
+        """Записать тренды аналитики в sidecar, если они менялись; True — записано"""
+        if self.storage is None or not self._analytics_dirty:
+            return False
+        self._analytics_dirty = False
+        self.storage.save_sidecar("analytics", self.analytics.to_dict())
+        return True
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(settings.analytics_flush_sec):
+            try:
+                self.flush_analytics()
+            except OSError:
+                self._analytics_dirty = True  # повторим на следующем тике
+
+    def close(self) -> None:
+        """При остановке: последние тренды аналитики и слияние журнала хранилища в снимок"""
+        self._closed.set()
+        if self.storage is not None:
+            self.flush_analytics()
+            self.storage.compact()
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(session_id)
+            if lock is None:
+                lock = self._locks[session_id] = threading.Lock()
+            return lock
+
+    def _new_session(self, deal_id: str) -> SessionState:
         state = SessionState(
-            session_id=sid, 
+            session_id=str(uuid.uuid4()), 
             deal_id=deal_id, 
             record=BantRecord(deal_id=deal_id)
         )
         state.current_slot = self.flow.next_slot(state)
-        self.sessions[sid] = state
         return state
 
-    def answer(self, session_id: str, text: str) -> tuple[SessionState, str | None, list[str]]:
+    def start(self, deal_id: str) -> SessionState:
+        state = self._new_session(deal_id)
+        self.sessions[state.session_id] = state
+        self._persist(state)
+        return state
+
+    def start_many(self, deal_ids: list[str]) -> list[SessionState]:
+        """Создает сессии для многих сделок и сохраняет их одной записью"""
+        states = [self._new_session(deal_id) for deal_id in deal_ids]
+        for state in states:
+            self.sessions[state.session_id] = state
+        self._persist(*states)
+        return states
+
+    def first_question(self, state: SessionState) -> str:
+        if not state.current_slot:
+            return "Все поля заполнены!"
+        question_text = QUESTIONS.get(state.current_slot, f"Вопрос по {state.current_slot}")
+        return f"Начнём с {state.current_slot.upper()}: {question_text}"
+
+    def prewarm(self, background: bool = True) -> bool:
+        """
+        Прогревает токен и соединения GigaChat, чтобы первый ответ не платил за холодный старт.
+        Прогрев идет не больше одного одновременно: пока он в работе, повторные вызовы (каждый
+        start:bulk) новый не запускают. True — запущен новый прогрев.
+        """
+        with self._prewarm_lock:
+            thread = self._prewarm_thread
+            started = thread is None or not thread.is_alive()
+            if started:
+                thread = self._prewarm_thread = threading.Thread(
+                    target=self.llm.warmup, name="bant-prewarm", daemon=True
+                )
+                thread.start()
+        if not background:
+            thread.join()
+        return started
+
+    def answer(self, session_id: str, text: str) -> tuple[SessionState, str | None, list[str], dict]:
+        """
+        Обрабатывает ответ. Последний элемент — слоты, изменившиеся за этот ответ
+        (slot -> новое значение), чтобы клиенту не нужно было получать всю запись.
+        """
         if session_id not in self.sessions:
             raise ValueError("Session not found")
         
-        st = self.sessions[session_id]
-        st.history.append({"role": "user", "content": text})
-        st, next_q, followups = self.flow.process_answer(st, text)
-        return st, next_q, followups
+        with self._session_lock(session_id):
+            st = self.sessions[session_id]
+            before = {slot: getattr(st.record, slot).model_dump() for slot in BantFlow.SLOTS}
+            st.history.append({"role": "user", "content": text})
+            st, next_q, followups = self.flow.process_answer(st, text)
+            st.version += 1
+            # Мерж переносит updated_at из старой записи; фиксируем время изменения (фильтр updated_since)
+            st.record.updated_at = datetime.now(timezone.utc)
+            changed = {}
+            for slot, old in before.items():
+                new = getattr(st.record, slot).model_dump()
+                if new != old:
+                    changed[slot] = new
+            self._persist(st)
+            return st, next_q, followups, changed
+
+    def answer_many(self, items: list[tuple[str, str]]) -> Iterator[tuple[int, tuple | Exception]]:
+        """
+        Обрабатывает ответы для многих сессий параллельно (не больше api_batch_concurrency
+        на весь сервис). Отдает (индекс элемента, результат answer() или исключение)
+        по мере готовности.
+        """
+        futures = {
+            submit_in_context(self._batch_pool, self.answer, session_id, text): idx
+            for idx, (session_id, text) in enumerate(items)
+        }
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result()
+            except Exception as e:
+                yield futures[fut], e
+
+    def get_version(self, session_id: str) -> int:
+        """Версия сессии без обращения к записи (для ETag)"""
+        st = self.sessions.get(session_id)
+        if st is None:
+            raise ValueError("Session not found")
+        return st.version
+
+    def get_deal(self, deal_id: str) -> dict:
+        """Сводная запись сделки по всем ее сессиям (из индекса, без обхода всех сессий)"""
+        deal = self.deals.get(deal_id)
+        if deal is None:
+            raise ValueError("Deal not found")
+        return deal
+
+    def iter_session_data(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        """(session_id, данные) по всем сессиям: из файла хранилища потоково, иначе из памяти"""
+        if self.storage is not None:
+            yield from self.storage.iter_sessions()
+            return
+        for st in list(self.sessions.values()):
+            yield st.session_id, st.model_dump(mode="json")
 
     def get_session(self, session_id: str) -> SessionState:
         if session_id not in self.sessions:
@@ -0,0 +1,205 @@
+# app/services/batch.py
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Iterator, TextIO
+
+from app.core.flow import BantFlow
+from app.core.schema import SessionState, BantRecord
+
+
+class BatchCheckpoint:
+    """
+    Чекпоинт пакетной обработки.
+    Хранит "водяную отметку" — номер строки, до которой всё обработано, и байтовое
+    смещение этой строки во входном файле, плюс строки, завершённые за отметкой
+    (их не больше, чем задач в работе). Размер чекпоинта не зависит от размера входа.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.watermark = 0          # все строки с номером < watermark обработаны
+        self.offset = 0             # байтовое смещение строки watermark
+        self.done: dict[int, int] = {}  # номер строки -> смещение конца строки
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.watermark = int(data.get("watermark", 0))
+        self.offset = int(data.get("offset", 0))
+        self.done = {int(k): int(v) for k, v in data.get("done", {}).items()}
+
+    def is_done(self, line_no: int) -> bool:
+        return line_no < self.watermark or line_no in self.done
+
+    def mark(self, line_no: int, end_offset: int) -> None:
+        self.done[line_no] = end_offset
+        while self.watermark in self.done:
+            self.offset = self.done.pop(self.watermark)
+            self.watermark += 1
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"watermark": self.watermark, "offset": self.offset, "done": self.done}, f)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class BatchStats:
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def iter_jsonl(path: str, start_offset: int = 0, start_line: int = 0) -> Iterator[tuple[int, int, bytes]]:
+    """Построчно читает JSONL: (номер строки, смещение конца строки, сырые байты)"""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        line_no, offset = start_line, start_offset
+        while True:
+            raw = f.readline()
+            if not raw:
+                break
+            offset += len(raw)
+            yield line_no, offset, raw
+            line_no += 1
+
+
+def process_item(flow: BantFlow, item: dict, id_field: str = "deal_id", text_field: str = "text") -> dict:
+    """Прогоняет одну заметку через BantFlow как первый ответ новой сессии"""
+    deal_id = str(item[id_field])
+    text = item[text_field]
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError(f"Empty '{text_field}'")
+
+    state = SessionState(
+        session_id=str(uuid.uuid4()),
+        deal_id=deal_id,
+        record=BantRecord(deal_id=deal_id)
+    )
+    state.current_slot = flow.next_slot(state)
+    state.history.append({"role": "user", "content": text})
+    state, next_q, followups = flow.process_answer(state, text)
+    return {
+        "deal_id": deal_id,
+        "record": state.record.model_dump(mode="json"),
+        "filled": state.record.filled,
+        "next_question": next_q,
+        "followups": followups
+    }
+
+
+def _run_line(flow: BantFlow, line_no: int, raw: bytes, id_field: str, text_field: str) -> dict:
+    item = None
+    try:
+        item = json.loads(raw)
+        result = process_item(flow, item, id_field=id_field, text_field=text_field)
+        return {"line": line_no, "ok": True, **result}
+    except Exception as e:
+        deal_id = item.get(id_field) if isinstance(item, dict) else None
+        return {"line": line_no, "ok": False, "deal_id": deal_id, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_batch(
+    flow: BantFlow,
+    input_path: str,
+    output_path: str,
+    checkpoint_path: str | None = None,
+    workers: int = 4,
+    id_field: str = "deal_id",
+    text_field: str = "text",
+    checkpoint_every: int = 20,
+    progress_interval: float = 5.0,
+    log: TextIO | None = sys.stderr,
+) -> BatchStats:
+    """
+    Потоково обрабатывает JSONL {deal_id, text} и дописывает результаты в NDJSON.
+    В работе одновременно не больше 2 * workers строк, поэтому память не зависит
+    от размера входа. Результаты пишутся раньше чекпоинта: после падения часть строк
+    может быть обработана повторно (at-least-once), дубли различаются по полю "line".
+    """
+    checkpoint = BatchCheckpoint(checkpoint_path)
+    stats = BatchStats()
+    max_in_flight = max(1, workers) * 2
+    started = last_report = time.monotonic()
+    since_save = 0
+
+    def report(final: bool = False) -> None:
+        if log is None:
+            return
+        stats.elapsed = time.monotonic() - started
+        prefix = "done" if final else "progress"
+        log.write(
+            f"[batch] {prefix}: {stats.processed} processed, {stats.failed} failed, "
+            f"{stats.skipped} skipped, {stats.throughput:.2f} items/s\n"
+        )
+        log.flush()
+
+    lines = iter_jsonl(input_path, start_offset=checkpoint.offset, start_line=checkpoint.watermark)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, \
+            open(output_path, "a", encoding="utf-8") as out:
+        pending = {}
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                nxt = next(lines, None)
+                if nxt is None:
+                    exhausted = True
+                    break
+                line_no, end_offset, raw = nxt
+                if checkpoint.is_done(line_no):
+                    stats.skipped += 1
+                    continue
+                if not raw.strip():
+                    checkpoint.mark(line_no, end_offset)
+                    continue
+                fut = pool.submit(_run_line, flow, line_no, raw, id_field, text_field)
+                pending[fut] = (line_no, end_offset)
+
+            if not pending:
+                continue
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                line_no, end_offset = pending.pop(fut)
+                row = fut.result()
+                out.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                stats.processed += 1
+                if not row["ok"]:
+                    stats.failed += 1
+                checkpoint.mark(line_no, end_offset)
+                since_save += 1
+
+            if since_save >= checkpoint_every:
+                out.flush()
+                checkpoint.save()
+                since_save = 0
+
+            if time.monotonic() - last_report >= progress_interval:
+                report()
+                last_report = time.monotonic()
+
+        out.flush()
+        checkpoint.save()
+
+    stats.elapsed = time.monotonic() - started
+    report(final=True)
+    return stats
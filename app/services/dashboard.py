@@ -0,0 +1,104 @@
+# app/services/dashboard.py
+"""
+Индекс строк дашборда: компактная строка на сессию (deal_id, stage, total, filled, updated_at),
+обновляется при каждом сохранении сессии. Порядок — по последнему изменению (OrderedDict +
+move_to_end), так что страница «свежих» сессий — срез с конца без сортировки; счетчики по
+stage/filled ведутся инкрементально и не требуют прохода по всем сессиям.
+"""
+import threading
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from app.core.schema import SessionState
+
+
+def dashboard_row(state: SessionState) -> dict:
+    record = state.record
+    score = record.score
+    return {
+        "session_id": state.session_id,
+        "deal_id": state.deal_id,
+        "stage": score.stage if score else None,
+        "total": score.total if score else None,
+        "filled": record.filled,
+        "updated_at": record.updated_at.isoformat(),
+        "version": state.version,
+    }
+
+
+class DashboardIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: OrderedDict[str, dict] = OrderedDict()
+        self._stages: Counter = Counter()
+        self._filled: Counter = Counter()
+        # Растет при каждом изменении; основа ETag страницы
+        self.revision = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _count(self, row: dict, sign: int) -> None:
+        self._stages[row["stage"] or "unscored"] += sign
+        self._filled[row["filled"]] += sign
+
+    def update(self, *states: SessionState) -> None:
+        rows = [dashboard_row(st) for st in states]
+        with self._lock:
+            for row in rows:
+                old = self._rows.pop(row["session_id"], None)
+                if old is not None:
+                    self._count(old, -1)
+                self._rows[row["session_id"]] = row
+                self._count(row, +1)
+            self.revision += 1
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            old = self._rows.pop(session_id, None)
+            if old is not None:
+                self._count(old, -1)
+                self.revision += 1
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        stage: str | None = None,
+        filled: str | None = None,
+        deal: str | None = None,
+    ) -> dict:
+        """
+        Страница строк, новые изменения первыми. Без фильтров — срез с конца индекса;
+        с фильтрами — один проход по строкам (total — число подходящих строк).
+        """
+        deal = deal.lower() if deal else None
+
+        def match(row: dict) -> bool:
+            return ((stage is None or (row["stage"] or "unscored") == stage)
+                    and (filled is None or row["filled"] == filled)
+                    and (deal is None or deal in row["deal_id"].lower()))
+
+        with self._lock:
+            newest_first = reversed(self._rows.values())
+            if stage is None and filled is None and deal is None:
+                total = len(self._rows)
+                rows = list(islice(newest_first, offset, offset + limit))
+            else:
+                total, rows = 0, []
+                for row in newest_first:
+                    if match(row):
+                        if offset <= total < offset + limit:
+                            rows.append(row)
+                        total += 1
+            return {
+                "rows": [dict(r) for r in rows],
+                "total": total,
+                "offset": offset,
+                "limit": limit,
+                "revision": self.revision,
+                "counts": {
+                    "stage": {k: v for k, v in self._stages.items() if v},
+                    "filled": {k: v for k, v in self._filled.items() if v},
+                },
+            }
@@ -0,0 +1,133 @@
+# app/services/deals.py
+"""
+Индекс сессий по deal_id и сводная запись сделки.
+Сводная запись — свертка слотов всех сессий сделки в порядке их изменения по правилам
+мержа ответа (merge_slot_values): более свежие непустые значения перекрывают старые,
+пустые не затирают. Она обновляется инкрементально при каждом сохранении сессии:
+изменившаяся сессия становится самой свежей, поэтому ее слоты просто мержатся поверх
+(значения в сессии со временем не стираются). Полная свертка — только при удалении сессии,
+и то по сессиям одной сделки.
+
+В свертку идут только значения, которые сессия действительно задала: поля, равные значениям
+по умолчанию схемы (currency="RUB" у пустого Budget), и сессии без ответов (version == 0)
+пропускаются — иначе новая пустая сессия перекрыла бы собранные значения.
+"""
+import threading
+from collections import OrderedDict
+
+from app.core.flow import BantFlow, merge_slot_values
+from app.core.schema import Authority, BantRecord, Budget, Need, SessionState, Timing
+from app.core.validator import validate_record
+
+
+class _Deal:
+    def __init__(self):
+        # session_id -> снимок сессии; порядок — от давних изменений к свежим
+        self.sessions: OrderedDict[str, dict] = OrderedDict()
+        self.slots: dict[str, dict] = {slot: {} for slot in BantFlow.SLOTS}
+        # slot -> field -> session_id, из которой взято значение
+        self.sources: dict[str, dict[str, str]] = {slot: {} for slot in BantFlow.SLOTS}
+
+    def apply(self, session_id: str, slots: dict) -> None:
+        merge_slot_values(self.slots, slots, BantFlow.SLOTS)
+        # Непустые значения сессии перекрыли прежние — она и есть источник
+        for slot in BantFlow.SLOTS:
+            for field, value in (slots.get(slot) or {}).items():
+                if not _is_empty(value):
+                    self.sources[slot][field] = session_id
+
+    def refold(self) -> None:
+        self.slots = {slot: {} for slot in BantFlow.SLOTS}
+        self.sources = {slot: {} for slot in BantFlow.SLOTS}
+        for session_id, snap in self.sessions.items():
+            self.apply(session_id, snap["slots"])
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+_SLOT_MODELS = {"budget": Budget, "authority": Authority, "need": Need, "timing": Timing}
+
+
+def _set_values(state: SessionState, slot: str) -> dict:
+    """Поля слота, отличные от значений по умолчанию схемы; у сессии без ответов — ничего"""
+    if state.version == 0:
+        return {}
+    fields = _SLOT_MODELS[slot].model_fields
+    return {field: value for field, value in getattr(state.record, slot).model_dump().items()
+            if value != fields[field].default}
+
+
+def _snapshot(state: SessionState) -> dict:
+    record = state.record
+    score = record.score
+    return {
+        "session_id": state.session_id,
+        "version": state.version,
+        "filled": record.filled,
+        "stage": score.stage if score else None,
+        "total": score.total if score else None,
+        "updated_at": record.updated_at.isoformat(),
+        "slots": {slot: _set_values(state, slot) for slot in BantFlow.SLOTS},
+    }
+
+
+class DealIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deals: dict[str, _Deal] = {}
+        self._session_deal: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._deals)
+
+    def update(self, *states: SessionState) -> None:
+        snaps = [(st.deal_id, _snapshot(st)) for st in states]
+        with self._lock:
+            for deal_id, snap in snaps:
+                session_id = snap["session_id"]
+                deal = self._deals.setdefault(deal_id, _Deal())
+                deal.sessions.pop(session_id, None)
+                deal.sessions[session_id] = snap
+                self._session_deal[session_id] = deal_id
+                deal.apply(session_id, snap["slots"])
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            deal_id = self._session_deal.pop(session_id, None)
+            deal = self._deals.get(deal_id) if deal_id is not None else None
+            if deal is None:
+                return
+            deal.sessions.pop(session_id, None)
+            if deal.sessions:
+                deal.refold()
+            else:
+                del self._deals[deal_id]
+
+    def session_ids(self, deal_id: str) -> list[str]:
+        with self._lock:
+            deal = self._deals.get(deal_id)
+            return list(deal.sessions) if deal else []
+
+    def get(self, deal_id: str) -> dict | None:
+        """Сводная запись сделки и ее сессии (свежие первыми); None, если сессий нет"""
+        with self._lock:
+            deal = self._deals.get(deal_id)
+            if deal is None:
+                return None
+            slots = {slot: dict(values) for slot, values in deal.slots.items()}
+            sources = {slot: dict(values) for slot, values in deal.sources.items()}
+            sessions = [{k: v for k, v in snap.items() if k != "slots"} for snap in reversed(deal.sessions.values())]
+        # Незаданные ни одной сессией поля — None, а не значения по умолчанию схемы (у них нет источника)
+        record = BantRecord(deal_id=deal_id, **{
+            slot: {field: slots[slot].get(field) for field in _SLOT_MODELS[slot].model_fields}
+            for slot in BantFlow.SLOTS
+        })
+        return {
+            "deal_id": deal_id,
+            "record": {slot: getattr(record, slot).model_dump() for slot in BantFlow.SLOTS},
+            "filled": validate_record(record),
+            "sources": sources,
+            "sessions": sessions,
+        }
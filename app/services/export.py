@@ -0,0 +1,134 @@
+# app/services/export.py
+"""
+Потоковая выгрузка всех записей: плоские строки BantRecord (budget.amount_min, score.total, ...)
+в NDJSON, CSV или Parquet. Сессии берутся итератором (JSONStorage.iter_sessions), строки
+отдаются пачками по chunk_rows — память не зависит от размера хранилища.
+updated_since отбирает записи, измененные не раньше указанного момента (инкрементальная синхронизация).
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
+
+from app.core.schema import Authority, Budget, Need, Timing
+
+FORMATS = ("ndjson", "csv", "parquet")
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+_SLOT_MODELS = {"budget": Budget, "authority": Authority, "need": Need, "timing": Timing}
+SCORE_COLUMNS = [f"score.{slot}" for slot in _SLOT_MODELS] + ["score.total", "score.stage"]
+COLUMNS = (
+    ["session_id", "deal_id", "version", "filled", "updated_at"]
+    + [f"{slot}.{field}" for slot, model in _SLOT_MODELS.items() for field in model.model_fields]
+    + SCORE_COLUMNS
+)
+# Списки в CSV/Parquet склеиваются через LIST_SEPARATOR; в NDJSON остаются массивами
+LIST_SEPARATOR = "; "
+
+
+def parse_timestamp(value: str | datetime) -> datetime:
+    """ISO-время; без часового пояса считается UTC"""
+    ts = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).strip())
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def flatten_session(data: dict) -> dict[str, Any]:
+    """Плоская строка из сохраненной сессии (SessionState.model_dump)"""
+    record = data.get("record") or {}
+    row: dict[str, Any] = {
+        "session_id": data.get("session_id"),
+        "deal_id": data.get("deal_id"),
+        "version": data.get("version", 0),
+        "filled": record.get("filled"),
+        "updated_at": str(record.get("updated_at")) if record.get("updated_at") is not None else None,
+    }
+    for slot, model in _SLOT_MODELS.items():
+        block = record.get(slot) or {}
+        for field in model.model_fields:
+            value = block.get(field)
+            row[f"{slot}.{field}"] = value if value is None or isinstance(value, (bool, int, float, list)) else str(value)
+    score = record.get("score") or {}
+    for slot in _SLOT_MODELS:
+        row[f"score.{slot}"] = (score.get(slot) or {}).get("value")
+    row["score.total"] = score.get("total")
+    row["score.stage"] = score.get("stage")
+    return row
+
+
+def iter_rows(sessions: Iterable[tuple[str, dict]], updated_since: datetime | None = None) -> Iterator[dict]:
+    """Плоские строки по итератору (session_id, данные); фильтр по record.updated_at"""
+    for _, data in sessions:
+        if updated_since is not None:
+            updated_at = (data.get("record") or {}).get("updated_at")
+            if updated_at is None or parse_timestamp(updated_at) < updated_since:
+                continue
+        yield flatten_session(data)
+
+
+def _join_lists(row: dict) -> dict:
+    return {k: LIST_SEPARATOR.join(map(str, v)) if isinstance(v, list) else v for k, v in row.items()}
+
+
+def ndjson_chunks(rows: Iterable[dict], chunk_rows: int = 500) -> Iterator[bytes]:
+    buf: list[str] = []
+    for row in rows:
+        buf.append(json.dumps(row, ensure_ascii=False, default=str))
+        if len(buf) >= chunk_rows:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf.clear()
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+
+def csv_chunks(rows: Iterable[dict], chunk_rows: int = 500) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=COLUMNS)
+    writer.writeheader()
+    n = 0
+    for row in rows:
+        writer.writerow(_join_lists(row))
+        n += 1
+        if n % chunk_rows == 0:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+class ParquetUnavailable(RuntimeError):
+    """Для Parquet нужен pyarrow (requirements-parquet.txt), а он не установлен"""
+
+
+def _arrow_schema(pa):
+    types = {"version": pa.int64(), "budget.have_budget": pa.bool_(),
+             "budget.amount_min": pa.float64(), "budget.amount_max": pa.float64(),
+             "score.total": pa.int64(), **{f"score.{slot}": pa.int64() for slot in _SLOT_MODELS}}
+    return pa.schema([(name, types.get(name, pa.string())) for name in COLUMNS])
+
+
+def write_parquet(rows: Iterable[dict], sink, chunk_rows: int = 5000) -> int:
+    """Пишет строки в Parquet (путь или файловый объект) row group'ами по chunk_rows; нужен pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ParquetUnavailable(f"Parquet export requires pyarrow: {e}") from e
+    schema = _arrow_schema(pa)
+    total, buf = 0, []
+    with pq.ParquetWriter(sink, schema) as writer:
+        for row in rows:
+            buf.append(_join_lists(row))
+            if len(buf) >= chunk_rows:
+                writer.write_table(pa.Table.from_pylist(buf, schema=schema))
+                total += len(buf)
+                buf.clear()
+        if buf:
+            writer.write_table(pa.Table.from_pylist(buf, schema=schema))
+            total += len(buf)
+    return total
@@ -0,0 +1,91 @@
+# app/services/idempotency.py
+"""
+Idempotency-Key для ответов: повтор, пришедший пока оригинал еще считается, ждет тот же
+результат; повтор после завершения получает сохраненный ответ из TTL-хранилища.
+Повторы никогда не запускают LLM-пайплайн второй раз.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+
+class IdempotencyConflict(Exception):
+    """Ключ уже использован с другим телом запроса"""
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_sec: float = 3600, max_size: int = 10000):
+        self.ttl_sec = ttl_sec
+        self.max_size = max(1, max_size)
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, tuple[str, Future]] = {}
+        self._completed: OrderedDict[str, tuple[str, float, dict]] = OrderedDict()
+        self.replays = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def fingerprint(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _evict(self, now: float) -> None:
+        while self._completed:
+            key, (_, stored_at, _) = next(iter(self._completed.items()))
+            if now - stored_at < self.ttl_sec and len(self._completed) <= self.max_size:
+                break
+            self._completed.popitem(last=False)
+
+    def run(self, key: str, fingerprint: str, compute: Callable[[], dict]) -> tuple[dict, bool]:
+        """
+        Выполняет compute() не больше одного раза на ключ.
+        Возвращает (ответ, replayed); replayed=True для повторов.
+        Исключения compute() не кэшируются: повтор после ошибки выполнится заново.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            done = self._completed.get(key)
+            if done is not None:
+                if done[0] != fingerprint:
+                    raise IdempotencyConflict(key)
+                self.replays += 1
+                return done[2], True
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                if flight[0] != fingerprint:
+                    raise IdempotencyConflict(key)
+                self.coalesced += 1
+                owner = False
+                future = flight[1]
+            else:
+                owner = True
+                future = Future()
+                self._in_flight[key] = (fingerprint, future)
+
+        if not owner:
+            return future.result(), True
+
+        try:
+            response = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._completed[key] = (fingerprint, time.monotonic(), response)
+            self._evict(time.monotonic())
+        future.set_result(response)
+        return response, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "stored": len(self._completed),
+                "replays": self.replays,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,146 @@
+# app/services/jobs.py
+"""
+Асинхронные задачи для ответов: запрос сразу получает id задачи, пул воркеров выполняет
+пайплайн, клиент опрашивает задачу или получает результат POST'ом на настроенный webhook.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import requests
+
+
+class JobQueueFull(Exception):
+    """Очередь задач заполнена"""
+
+
+@dataclass
+class Job:
+    job_id: str
+    session_id: str
+    status: str = "queued"  # queued | running | succeeded | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: Any = None
+    error: str | None = None
+    error_status: int | None = None
+    webhook_status: str | None = None  # None | delivered | failed
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "error_status": self.error_status,
+            "webhook_status": self.webhook_status,
+        }
+
+
+class JobManager:
+    def __init__(
+        self,
+        workers: int = 8,
+        max_queued: int = 1000,
+        max_finished: int = 10000,
+        webhook_url: str = "",
+        webhook_timeout: float = 5.0,
+        webhook_retries: int = 3,
+    ):
+        self.max_queued = max_queued
+        self.max_finished = max(1, max_finished)
+        self.webhook_url = webhook_url
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self._lock = threading.Lock()
+        self._active: dict[str, Job] = {}
+        self._finished: OrderedDict[str, Job] = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bant-job")
+        # Доставка webhook'ов отдельно, чтобы медленный получатель не занимал воркеры пайплайна
+        self._webhooks = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bant-webhook")
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, session_id: str, fn: Callable[[], Any]) -> Job:
+        job = Job(job_id=str(uuid.uuid4()), session_id=session_id)
+        with self._lock:
+            queued = sum(1 for j in self._active.values() if j.status == "queued")
+            if queued >= self.max_queued:
+                raise JobQueueFull()
+            self._active[job.job_id] = job
+            self.submitted += 1
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._active.get(job_id) or self._finished.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[[], Any]) -> None:
+        job.started_at = time.time()
+        job.status = "running"
+        try:
+            job.result = fn()
+            job.status = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.error_status = 404 if isinstance(e, ValueError) else 500
+            job.status = "failed"
+        job.finished_at = time.time()
+        with self._lock:
+            self._active.pop(job.job_id, None)
+            self._finished[job.job_id] = job
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+            if job.status == "succeeded":
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        if self.webhook_url:
+            self._webhooks.submit(self._deliver, job)
+
+    def _deliver(self, job: Job) -> None:
+        # Любая ошибка (сериализация, сеть, неожиданное исключение) — доставка failed, а не молчаливый None
+        try:
+            # В result бывают date/datetime из записи — requests(json=...) их не сериализует
+            body = json.dumps(job.to_dict(), ensure_ascii=False, default=str).encode("utf-8")
+            for attempt in range(self.webhook_retries):
+                try:
+                    resp = requests.post(self.webhook_url, data=body, headers={"Content-Type": "application/json"},
+                                         timeout=self.webhook_timeout)
+                    if resp.status_code < 500:
+                        job.webhook_status = "delivered" if resp.ok else "failed"
+                        return
+                except requests.RequestException:
+                    pass
+                time.sleep(0.5 * 2 ** attempt)
+        except Exception:
+            pass
+        job.webhook_status = "failed"
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            queued = [j for j in self._active.values() if j.status == "queued"]
+            running = [j for j in self._active.values() if j.status == "running"]
+            return {
+                "queued": len(queued),
+                "running": len(running),
+                "oldest_queued_age_sec": max((now - j.created_at for j in queued), default=0.0),
+                "oldest_running_age_sec": max((now - j.started_at for j in running if j.started_at), default=0.0),
+                "submitted": self.submitted,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "retained": len(self._finished),
+            }
@@ -1,44 +1,309 @@
 # app/services/storage.py
+"""
+Хранилище сессий: снимок (sessions.json — JSON-объект session_id -> данные) плюс журнал
+изменений (sessions.journal.jsonl — строка на сохраненную или удаленную сессию).
+
+Сохранение только дописывает строки в журнал — O(размер сессии), а не перезапись всего файла.
+Когда журнал вырастает больше compact_bytes, он в фоне сливается в новый снимок: журнал
+переименовывается в замороженный (sessions.journal.compacting.jsonl), новые записи идут в
+свежий журнал, снимок переписывается потоково и атомарно подменяется. Чтение — снимок,
+поверх него замороженный журнал и журнал.
+
+read_only=True — для читателей в другом процессе (run_export.py при работающем сервере):
+такой экземпляр ничего не пишет — не чинит недописанный хвост журнала и не запускает слияние.
+"""
 import json
 import os
-from typing import Dict, Any
+import threading
+from typing import IO, BinaryIO, Dict, Any, Iterable, Iterator, TextIO
 from app.core.schema import SessionState
 
 class JSONStorage:
-    def __init__(self, file_path: str = "data/sessions.json"):
+    def __init__(self, file_path: str = "data/sessions.json", compact_bytes: int = 32 << 20,
+                 read_only: bool = False):
         self.file_path = file_path
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.journal_path = self.sidecar_path("journal", ext="jsonl")
+        self.frozen_path = self.sidecar_path("journal.compacting", ext="jsonl")
+        self.compact_bytes = compact_bytes
+        # Короткий замок на дозапись журнала и подмену файлов; слияние идет без него
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compactor: threading.Thread | None = None
+        self._journal_size = 0
+        journal = None if read_only else self._open(self.journal_path, 'rb')
+        if journal is not None:
+            with journal:
+                journal.seek(0, os.SEEK_END)
+                self._journal_size = journal.tell()
+                torn = self._journal_size > 0 and journal.seek(-1, os.SEEK_END) >= 0 and journal.read(1) != b"\n"
+            if torn:
+                # Аварийная остановка посреди строки: следующая запись не должна к ней прилипнуть
+                self._append("\n")
+
     def save_session(self, session: SessionState) -> None:
         """Сохранить сессию в JSON файл"""
-        sessions = self.load_all_sessions()
-        sessions[session.session_id] = session.model_dump()
-        
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(sessions, f, ensure_ascii=False, indent=2, default=str)
-    
+        self.save_sessions([session])
+
+    def save_sessions(self, sessions_to_save: Iterable[SessionState]) -> None:
+        """
+        Дописать сессии в журнал одной записью. Сериализация — вне замка; порядок записей
+        одной сессии задает вызывающий (ответы в сессию идут под ее замком).
+        """
+        lines = "".join(
+            json.dumps({"id": s.session_id, "data": s.model_dump()}, ensure_ascii=False, default=str) + "\n"
+            for s in sessions_to_save
+        )
+        if lines:
+            self._append(lines)
+
+    def _append(self, lines: str) -> None:
+        if self.read_only:
+            raise PermissionError(f"Storage {self.file_path} is opened read-only")
+        with self._lock:
+            with open(self.journal_path, 'ab') as f:
+                f.write(lines.encode('utf-8'))
+                self._journal_size = f.tell()
+            if self._journal_size >= self.compact_bytes:
+                self._start_compaction()
+
+    def _start_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="bant-storage-compact", daemon=True)
+        self._compactor.start()
+
+    def compact(self) -> bool:
+        """
+        Слить журнал в снимок. Вызывается в фоне по размеру журнала и синхронно при остановке
+        сервиса. Сохранения во время слияния идут в новый журнал и не ждут его. False — нечего сливать.
+        """
+        if self.read_only:
+            return False
+        with self._compact_lock:
+            with self._lock:
+                if os.path.exists(self.journal_path):
+                    if os.path.exists(self.frozen_path):
+                        # Прошлое слияние прервалось: дописываем журнал к замороженному
+                        with open(self.journal_path, 'rb') as src, open(self.frozen_path, 'ab') as dst:
+                            # Перевод строки отделяет возможно недописанную последнюю строку
+                            dst.write(b"\n" + src.read())
+                        os.remove(self.journal_path)
+                    else:
+                        os.replace(self.journal_path, self.frozen_path)
+                self._journal_size = 0
+                if not os.path.exists(self.frozen_path):
+                    return False
+                snapshot = self._open(self.file_path)
+            with open(self.frozen_path, 'rb') as f:
+                overrides = self._replay(f)
+            tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                self._write_snapshot(out, self._merge(snapshot, overrides))
+            with self._lock:
+                os.replace(tmp_path, self.file_path)
+                os.remove(self.frozen_path)
+            return True
+
+    @staticmethod
+    def _write_snapshot(out: TextIO, sessions: Iterable[tuple[str, Dict[str, Any]]]) -> None:
+        # Потоково, по строке на сессию: размер снимка не ограничен памятью
+        out.write("{")
+        sep = "\n"
+        for session_id, data in sessions:
+            out.write(f"{sep}{json.dumps(session_id, ensure_ascii=False)}: "
+                      f"{json.dumps(data, ensure_ascii=False, default=str)}")
+            sep = ",\n"
+        out.write("\n}\n")
+
+    @staticmethod
+    def _replay(f: BinaryIO, limit: int = -1) -> Dict[str, Any]:
+        """session_id -> данные (None — удалена) по строкам журнала; limit — сколько байт читать"""
+        overrides: Dict[str, Any] = {}
+        for line in f.read(limit).decode('utf-8', errors='replace').splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # недописанная строка при аварийной остановке
+            overrides[entry["id"]] = None if entry.get("deleted") else entry["data"]
+        return overrides
+
+    @staticmethod
+    def _open(path: str, mode: str = 'r') -> IO | None:
+        try:
+            return open(path, mode, encoding=None if 'b' in mode else 'utf-8')
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _file_id(path: str) -> tuple[int, int] | None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def _open_journals(self, attempts: int = 10) -> tuple[TextIO | None, Dict[str, Any]]:
+        """
+        Снимок (открытый файл) и изменения поверх него из журналов. Файлы открываются под
+        замком: слияние подменяет снимок и удаляет замороженный журнал тоже под ним, поэтому
+        набор всегда согласован, а открытые дескрипторы переживают подмену.
+
+        Замок не защищает от слияния в другом процессе (run_export.py при работающем сервере),
+        поэтому после открытия набор сверяется с путями: если какой-то файл за это время
+        подменили, переименовали или создали, набор открывается заново.
+        """
+        paths = (self.file_path, self.frozen_path, self.journal_path)
+        for _ in range(attempts):
+            with self._lock:
+                files = [self._open(path, mode) for path, mode in zip(paths, ('r', 'rb', 'rb'))]
+                stats = [os.fstat(f.fileno()) if f is not None else None for f in files]
+                journal_size = self._journal_size
+                if [self._file_id(path) for path in paths] == [st and (st.st_dev, st.st_ino) for st in stats]:
+                    break
+            for f in files:
+                if f is not None:
+                    f.close()
+        else:
+            raise RuntimeError(f"Storage {self.file_path} keeps changing while being opened")
+        snapshot, frozen, journal = files
+        if self.read_only and journal is not None:
+            # Читатель из другого процесса не знает размер журнала писателя — берет размер при открытии
+            journal_size = stats[2].st_size
+        overrides: Dict[str, Any] = {}
+        # Журнал — только до размера на момент открытия: дальше могут быть недописанные строки
+        for f, limit in ((frozen, -1), (journal, journal_size)):
+            if f is not None:
+                with f:
+                    overrides.update(self._replay(f, limit))
+        return snapshot, overrides
+
+    @classmethod
+    def _merge(cls, snapshot: TextIO | None, overrides: Dict[str, Any],
+               read_size: int = 1 << 16) -> Iterator[tuple[str, Dict[str, Any]]]:
+        """Сессии снимка с примененными изменениями, затем новые сессии из журналов"""
+        overrides = dict(overrides)
+        if snapshot is not None:
+            with snapshot:
+                for session_id, data in cls._iter_object(snapshot, read_size):
+                    if session_id in overrides:
+                        data = overrides.pop(session_id)
+                    if data is not None:
+                        yield session_id, data
+        for session_id, data in overrides.items():
+            if data is not None:
+                yield session_id, data
+
     def load_session(self, session_id: str) -> Dict[str, Any] | None:
         """Загрузить сессию по ID"""
         sessions = self.load_all_sessions()
         return sessions.get(session_id)
-    
+
     def load_all_sessions(self) -> Dict[str, Any]:
         """Загрузить все сессии"""
-        if not os.path.exists(self.file_path):
-            return {}
-        
+        snapshot, overrides = self._open_journals()
+        sessions: Dict[str, Any] = {}
+        if snapshot is not None:
+            try:
+                with snapshot:
+                    sessions = json.load(snapshot)
+            except json.JSONDecodeError:
+                sessions = {}
+        for session_id, data in overrides.items():
+            if data is None:
+                sessions.pop(session_id, None)
+            else:
+                sessions[session_id] = data
+        return sessions
+
+    def iter_sessions(self, read_size: int = 1 << 16) -> Iterator[tuple[str, Dict[str, Any]]]:
+        """
+        Потоково отдает (session_id, данные), не загружая снимок целиком (в памяти — только
+        изменения из журналов, их объем ограничен compact_bytes). Снимок подменяется атомарно
+        (os.replace), поэтому открытый дескриптор видит целостную версию, даже если во время
+        обхода идет слияние.
+        """
+        snapshot, overrides = self._open_journals()
+        yield from self._merge(snapshot, overrides, read_size)
+
+    @staticmethod
+    def _iter_object(f: TextIO, read_size: int) -> Iterator[tuple[str, Any]]:
+        """
+        Пары ключ-значение JSON-объекта верхнего уровня: файл читается кусками по read_size,
+        каждое значение разбирается json.JSONDecoder.raw_decode, как только оно целиком в буфере.
+        """
+        decoder = json.JSONDecoder()
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
+
+        def skip(chars: str) -> str:
+            """Пропускает пробелы и символы chars; возвращает следующий значимый символ"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and (buf[pos].isspace() or buf[pos] in chars):
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return buf[pos] if pos < len(buf) else ""
+
+        def value():
+            nonlocal pos
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    # Число на границе куска может быть разобрано не целиком
+                    if end < len(buf) or eof:
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        if skip("") != "{":
+            return
+        pos += 1
+        while True:
+            if skip(",") in ("}", ""):
+                return
+            session_id = value()
+            if skip(":") == "":
+                return
+            yield session_id, value()
+
+    def sidecar_path(self, name: str, ext: str = "json") -> str:
+        """Путь служебного файла рядом с хранилищем: data/sessions.json -> data/sessions.<name>.json"""
+        root, _ = os.path.splitext(self.file_path)
+        return f"{root}.{name}.{ext}"
+
+    def save_sidecar(self, name: str, data: Dict[str, Any]) -> None:
+        """Атомарно записать служебный файл (аналитика и т.п.)"""
+        path = self.sidecar_path(name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def load_sidecar(self, name: str) -> Dict[str, Any] | None:
+        """Прочитать служебный файл; None, если его нет или он поврежден"""
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
+            with open(self.sidecar_path(name), 'r', encoding='utf-8') as f:
                 return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-    
+        except (OSError, json.JSONDecodeError):
+            return None
+
     def delete_session(self, session_id: str) -> bool:
-        """Удалить сессию"""
-        sessions = self.load_all_sessions()
-        if session_id in sessions:
-            del sessions[session_id]
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(sessions, f, ensure_ascii=False, indent=2, default=str)
-            return True
-        return False
+        """Удалить сессию (запись-надгробие в журнале)"""
+        if self.load_session(session_id) is None:
+            return False
+        self._append(json.dumps({"id": session_id, "deleted": True}, ensure_ascii=False) + "\n")
+        return True
@@ -1,6 +1,7 @@
 # app/ui/streamlit_app.py
 import streamlit as st
 import requests
+import requests.adapters
 import json
 import os
 from datetime import datetime
@@ -9,6 +10,10 @@ from datetime import datetime
 API_BASE = os.getenv("API_BASE", "http://localhost:8000")
 print(f"DEBUG: API_BASE = {API_BASE}")
 print(f"DEBUG: os.getenv('API_BASE') = {os.getenv('API_BASE')}")
+# (connect, read): ответ на /answer ждет LLM, поэтому read заметно больше connect
+API_TIMEOUT = (float(os.getenv("UI_CONNECT_TIMEOUT", "3")), float(os.getenv("UI_READ_TIMEOUT", "90")))
+# Поля ответа /answer: изменившиеся слоты и скоринг — без отдельных запросов статуса
+ANSWER_FIELDS = "version,next_question,filled,changed,score"
 
 st.set_page_config(
     page_title="BANT Опрос",
@@ -16,6 +21,31 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_http() -> requests.Session:
+    """Общий на процесс UI пул keep-alive соединений к API (один на всех пользователей)"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=int(os.getenv("UI_POOL_SIZE", "64")))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def fetch_result_json(session_id: str, version: int) -> str | None:
+    """Полная запись для скачивания (со скорингом); кэш по версии сессии"""
+    response = get_http().get(f"{API_BASE}/results/{session_id}", params={"fields": "record"}, timeout=API_TIMEOUT)
+    if response.status_code != 200:
+        return None
+    return json.dumps(response.json()["record"], ensure_ascii=False, indent=2)
+
+@st.cache_data(ttl=5, max_entries=500, show_spinner=False)
+def fetch_dashboard(offset: int, limit: int, stage: str | None, filled: str | None, deal: str | None) -> dict:
+    """Одна страница дашборда; короткий TTL — листание назад не ходит в API"""
+    params = {"offset": offset, "limit": limit, "stage": stage, "filled": filled, "deal": deal or None}
+    response = get_http().get(f"{API_BASE}/dashboard", params=params, timeout=API_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
 def init_session_state():
     """Инициализация состояния сессии"""
     if "session_id" not in st.session_state:
@@ -30,12 +60,16 @@ def init_session_state():
         st.session_state.record = None
     if "filled" not in st.session_state:
         st.session_state.filled = "none"
+    if "version" not in st.session_state:
+        st.session_state.version = 0
+    if "score" not in st.session_state:
+        st.session_state.score = None
 
 def start_session(deal_id: str):
     """Начать новую сессию"""
     try:
         st.write(f"🔍 Отправляю запрос на: {API_BASE}/sessions/start")
-        response = requests.post(f"{API_BASE}/sessions/start", json={"deal_id": deal_id})
+        response = get_http().post(f"{API_BASE}/sessions/start", json={"deal_id": deal_id}, timeout=API_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             st.session_state.session_id = data["session_id"]
@@ -44,6 +78,8 @@ def start_session(deal_id: str):
             st.session_state.history = []
             st.session_state.record = None
             st.session_state.filled = "none"
+            st.session_state.version = 0
+            st.session_state.score = None
             return True
         else:
             st.error(f"Ошибка при создании сессии: {response.text}")
@@ -55,15 +91,22 @@ def start_session(deal_id: str):
 def send_answer(text: str):
     """Отправить ответ"""
     try:
-        response = requests.post(
+        response = get_http().post(
             f"{API_BASE}/sessions/{st.session_state.session_id}/answer",
-            json={"text": text}
+            params={"fields": ANSWER_FIELDS},
+            json={"text": text},
+            timeout=API_TIMEOUT,
         )
         if response.status_code == 200:
             data = response.json()
             st.session_state.current_question = data.get("next_question", "")
-            st.session_state.record = data.get("record")
+            # API отдает только изменившиеся слоты — мержим их в локальную копию записи
+            record = dict(st.session_state.record or {})
+            record.update(data.get("changed") or {})
+            st.session_state.record = record
             st.session_state.filled = data.get("filled", "none")
+            st.session_state.version = data.get("version", st.session_state.version)
+            st.session_state.score = data.get("score")
             st.session_state.history.append(("user", text))
             if data.get("next_question"):
                 st.session_state.history.append(("assistant", data["next_question"]))
@@ -71,20 +114,13 @@ def send_answer(text: str):
         else:
             st.error(f"Ошибка при отправке ответа: {response.text}")
             return False
+    except requests.Timeout:
+        st.error("API не ответил вовремя, попробуйте еще раз")
+        return False
     except Exception as e:
         st.error(f"Ошибка подключения к API: {str(e)}")
         return False
 
-def get_session_status():
-    """Получить статус сессии"""
-    try:
-        response = requests.get(f"{API_BASE}/sessions/{st.session_state.session_id}/status")
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except:
-        return None
-
 def display_bant_status(record):
     """Отобразить статус BANT полей"""
     if not record:
@@ -127,9 +163,58 @@ def display_bant_status(record):
         if timing_filled and timing.get("timeframe"):
             st.write(f"Срок: {timing.get('timeframe')}")
 
+def dashboard_view():
+    """Все сделки: страницы строк грузятся по одной по мере листания"""
+    st.title("📋 Дашборд сделок")
+    if "dash_page" not in st.session_state:
+        st.session_state.dash_page = 0
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    deal = col1.text_input("Поиск по ID сделки", value="")
+    stage = col2.selectbox("Стадия", [None, "ready", "qualified", "unqualified", "unscored"],
+                           format_func=lambda v: v or "все")
+    filled = col3.selectbox("Заполненность", [None, "full", "partial", "none"], format_func=lambda v: v or "все")
+    limit = col4.selectbox("На странице", [25, 50, 100, 200], index=1)
+    
+    # Новый фильтр — с первой страницы
+    filters = (deal, stage, filled, limit)
+    if st.session_state.get("dash_filters") != filters:
+        st.session_state.dash_filters = filters
+        st.session_state.dash_page = 0
+    
+    try:
+        data = fetch_dashboard(st.session_state.dash_page * limit, limit, stage, filled, deal.strip())
+    except requests.RequestException as e:
+        st.error(f"Ошибка подключения к API: {str(e)}")
+        return
+    
+    counts = data["counts"]
+    metrics = st.columns(4)
+    metrics[0].metric("Всего сессий", sum(counts["filled"].values()))
+    metrics[1].metric("Ready", counts["stage"].get("ready", 0))
+    metrics[2].metric("Qualified", counts["stage"].get("qualified", 0))
+    metrics[3].metric("Заполнено полностью", counts["filled"].get("full", 0))
+    
+    pages = max(1, -(-data["total"] // limit))
+    st.dataframe(data["rows"], use_container_width=True, hide_index=True,
+                 column_order=["deal_id", "stage", "total", "filled", "updated_at", "session_id"])
+    
+    nav1, nav2, nav3 = st.columns([1, 2, 1])
+    if nav1.button("← Назад", disabled=st.session_state.dash_page == 0):
+        st.session_state.dash_page -= 1
+        st.rerun()
+    nav2.write(f"Страница {st.session_state.dash_page + 1} из {pages} · найдено {data['total']}")
+    if nav3.button("Вперед →", disabled=st.session_state.dash_page + 1 >= pages):
+        st.session_state.dash_page += 1
+        st.rerun()
+
 def main():
     init_session_state()
     
+    if st.sidebar.radio("Раздел", ["Опрос", "Дашборд"]) == "Дашборд":
+        dashboard_view()
+        return
+    
     st.title("📊 BANT Опрос (Прототип)")
     st.markdown("---")
     
@@ -191,18 +276,19 @@ def main():
         if st.session_state.record:
             display_bant_status(st.session_state.record)
             
-            # JSON превью
-            st.subheader("📄 JSON данные")
-            st.json(st.session_state.record)
-            
-            # Кнопка экспорта
-            json_str = json.dumps(st.session_state.record, ensure_ascii=False, indent=2)
-            st.download_button(
-                label="📥 Скачать JSON",
-                data=json_str,
-                file_name=f"bant_{st.session_state.deal_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
-            )
+            # JSON превью и экспорт — только по запросу: не перерисовываем запись на каждом ответе
+            if st.toggle("📄 JSON данные"):
+                st.json(st.session_state.record)
+                try:
+                    json_str = fetch_result_json(st.session_state.session_id, st.session_state.version)
+                except requests.RequestException:
+                    json_str = None
+                st.download_button(
+                    label="📥 Скачать JSON",
+                    data=json_str or json.dumps(st.session_state.record, ensure_ascii=False, indent=2),
+                    file_name=f"bant_{st.session_state.deal_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    mime="application/json"
+                )
         
         # Статус заполнения
         if st.session_state.filled:
@@ -218,6 +304,8 @@ def main():
             }
             
             st.markdown(f"**Общий статус:** {status_colors.get(st.session_state.filled, '⚪')} {status_text.get(st.session_state.filled, 'Неизвестно')}")
+            if st.session_state.score:
+                st.markdown(f"**Скоринг:** {st.session_state.score['total']}/100 ({st.session_state.score['stage']})")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Сравнение полной схемы и компактных промптов слота: размер промпта, токены и латентность.
+
+    python -m benchmarks.bench_prompts                # офлайн: только размеры промптов
+    python -m benchmarks.bench_prompts --live -n 3    # реальные вызовы LLM (GIGACHAT_* из .env)
+    python -m benchmarks.bench_prompts --json out.json
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.core.accounting import ACCOUNTING, accounted_chat, estimate_tokens, messages_chars
+from app.core.validator import build_parse_messages, looks_multi_topic
+
+# Типичные ответы менеджеров на вопрос по текущему слоту
+SAMPLES = [
+    ("budget", "Бюджет есть, примерно 500-700 тысяч рублей"),
+    ("budget", "Бюджета пока нет, не заложено"),
+    ("authority", "Решает генеральный директор Иванов, согласует финдиректор"),
+    ("authority", "Не знаем, кто ЛПР"),
+    ("need", "Все ведут в Excel вручную, теряются заявки, нет отчетности"),
+    ("need", "Проблем нет, все устраивает"),
+    ("timing", "Хотят запуститься до конца квартала"),
+    ("timing", "Сроки не определены"),
+    ("budget", "Бюджет 2 млн, решает CEO, запуск в этом квартале"),  # многотемный — эскалация
+]
+
+
+def measure(mode: str, llm=None, repeats: int = 1) -> dict:
+    """Размеры промптов (и латентность при llm) по всем примерам для режима full|compact"""
+    prompt_chars, prompt_tokens, latencies = [], [], []
+    escalated = 0
+    for slot, text in SAMPLES:
+        messages = build_parse_messages(text, slot if mode == "compact" else None)
+        if mode == "compact" and looks_multi_topic(text, slot):
+            escalated += 1
+        prompt_chars.append(messages_chars(messages))
+        prompt_tokens.append(estimate_tokens("".join(m["content"] for m in messages)))
+        if llm is not None:
+            for _ in range(repeats):
+                started = time.perf_counter()
+                accounted_chat(llm, f"bench_{mode}", messages, json_mode=True)
+                latencies.append(time.perf_counter() - started)
+
+    result = {
+        "mode": mode,
+        "samples": len(SAMPLES),
+        "escalated": escalated,
+        "prompt_chars_avg": statistics.mean(prompt_chars),
+        "prompt_tokens_est_avg": statistics.mean(prompt_tokens),
+    }
+    if latencies:
+        totals = ACCOUNTING.snapshot().get(f"bench_{mode}", {})
+        calls = totals.get("calls") or 1
+        result.update({
+            "latency_p50_ms": statistics.median(latencies) * 1000,
+            "latency_max_ms": max(latencies) * 1000,
+            "prompt_tokens_avg": totals.get("prompt_tokens", 0) / calls,
+            "completion_tokens_avg": totals.get("completion_tokens", 0) / calls,
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк компактных промптов извлечения")
+    parser.add_argument("--live", action="store_true", help="Выполнять реальные вызовы LLM")
+    parser.add_argument("-n", "--repeats", type=int, default=1, help="Повторов на пример в режиме --live")
+    parser.add_argument("--json", help="Сохранить результаты в JSON файл")
+    args = parser.parse_args()
+
+    llm = None
+    if args.live:
+        from dotenv import load_dotenv
+        load_dotenv()
+        from app.core.llm import GigaChatClient
+        llm = GigaChatClient()
+
+    results = [measure(mode, llm, args.repeats) for mode in ("full", "compact")]
+    for r in results:
+        line = (f"{r['mode']:>8}: prompt {r['prompt_chars_avg']:.0f} chars / ~{r['prompt_tokens_est_avg']:.0f} tokens"
+                f", escalated {r['escalated']}/{r['samples']}")
+        if "latency_p50_ms" in r:
+            line += (f", p50 {r['latency_p50_ms']:.0f} ms, max {r['latency_max_ms']:.0f} ms"
+                     f", tokens {r['prompt_tokens_avg']:.0f}+{r['completion_tokens_avg']:.0f}")
+        print(line)
+    full, compact = results
+    print(f"compact/full prompt size: {compact['prompt_chars_avg'] / full['prompt_chars_avg']:.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
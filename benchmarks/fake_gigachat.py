@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Локальная замена GigaChat для нагрузочных и отказных тестов: те же контракты, что использует
+GigaChatClient (POST /api/v2/oauth, POST /api/v1/chat/completions, GET /api/v1/models).
+
+    python run_fake_gigachat.py --port 8090 --latency lognormal:800:0.5 --error-429 0.02
+
+    GIGACHAT_AUTH_KEY=fake
+    GIGACHAT_AUTH_URL=http://127.0.0.1:8090/api/v2/oauth
+    GIGACHAT_API_URL=http://127.0.0.1:8090/api/v1
+    GIGACHAT_VERIFY_SSL=false
+
+Тип промпта (extract, extract_<slot>, refine, scoring, followups, default) определяется по
+системному сообщению; ответ берется по кругу из фикстур этого типа (JSON-файл вида
+{"scoring": [<объект или строка>, ...], ...}; строки отдаются как есть — так можно
+проверить ремонт битого JSON). Задержка — распределение на все типы или на конкретный тип.
+Отказы: доли 401/429/5xx и время жизни токена; истекший токен дает 401.
+Управление на лету: GET /__stats, POST /__config, POST /__reset.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.prompts import FOLLOWUP_GEN_PROMPT, SCHEMA_HINT, SCORING_PROMPT, SLOT_SCHEMA_HINTS
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "gigachat_default.json")
+
+_REFINE_PREFIX = "Исправь JSON строго под схему"
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Распределение задержки в секундах из строки:
+      fixed:MS | uniform:MIN_MS:MAX_MS | normal:MEAN_MS:STD_MS | lognormal:MEDIAN_MS:SIGMA
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rnd: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rnd: rnd.uniform(values[0], values[1]) / 1000
+    if kind == "normal" and len(values) == 2:
+        return lambda rnd: max(0.0, rnd.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rnd: rnd.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+def classify_prompt(messages: list[dict]) -> str:
+    """Тип промпта по системному сообщению (и refine — по последнему пользовательскому)"""
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    if messages and (messages[-1].get("content") or "").startswith(_REFINE_PREFIX):
+        return "refine"
+    if system == SCHEMA_HINT:
+        return "extract"
+    for slot, hint in SLOT_SCHEMA_HINTS.items():
+        if system == hint:
+            return f"extract_{slot}"
+    if system == SCORING_PROMPT:
+        return "scoring"
+    if system == FOLLOWUP_GEN_PROMPT:
+        return "followups"
+    return "default"
+
+
+@dataclass
+class FakeConfig:
+    fixtures: dict = field(default_factory=dict)
+    latency: str = "fixed:0"
+    latency_by_kind: dict = field(default_factory=dict)  # kind -> spec
+    error_401: float = 0.0
+    error_429: float = 0.0
+    error_5xx: float = 0.0
+    token_ttl: float = 1800.0
+    oauth_latency: str = "fixed:0"
+    seed: int | None = None
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_FIXTURES, **overrides) -> "FakeConfig":
+        with open(path, encoding="utf-8") as f:
+            return cls(fixtures=json.load(f), **overrides)
+
+
+class FakeGigaChat:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.rnd = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._tokens: dict[str, float] = {}
+        self._cursor: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.tokens_issued = 0
+        self._apply_latency()
+
+    def _apply_latency(self) -> None:
+        self._latency = parse_latency(self.config.latency)
+        self._latency_by_kind = {k: parse_latency(v) for k, v in self.config.latency_by_kind.items()}
+        self._oauth_latency = parse_latency(self.config.oauth_latency)
+
+    def update(self, changes: dict) -> None:
+        for key, value in changes.items():
+            if not hasattr(self.config, key):
+                raise ValueError(f"Unknown config key: {key}")
+            setattr(self.config, key, value)
+        self._apply_latency()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._cursor.clear()
+            self.calls.clear()
+            self.statuses.clear()
+            self.tokens_issued = 0
+
+    def issue_token(self) -> tuple[str, float]:
+        token = uuid.uuid4().hex
+        expires_at = time.time() + self.config.token_ttl
+        with self._lock:
+            self._tokens[token] = expires_at
+            self.tokens_issued += 1
+        return token, expires_at
+
+    def token_valid(self, token: str) -> bool:
+        expires_at = self._tokens.get(token)
+        return expires_at is not None and time.time() < expires_at
+
+    def next_fixture(self, kind: str) -> str:
+        fixtures = self.config.fixtures
+        if kind not in fixtures:
+            kind = "extract" if kind.startswith("extract_") and "extract" in fixtures else "default"
+        options = fixtures.get(kind) or ["{}"]
+        with self._lock:
+            idx = self._cursor[kind] % len(options)
+            self._cursor[kind] += 1
+        value = options[idx]
+        return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+    def latency(self, kind: str) -> float:
+        dist = self._latency_by_kind.get(kind, self._latency)
+        return dist(self.rnd)
+
+    def injected_error(self) -> int | None:
+        roll = self.rnd.random()
+        cfg = self.config
+        if roll < cfg.error_401:
+            return 401
+        if roll < cfg.error_401 + cfg.error_429:
+            return 429
+        if roll < cfg.error_401 + cfg.error_429 + cfg.error_5xx:
+            return self.rnd.choice((500, 502, 503))
+        return None
+
+    def count(self, kind: str, status: int) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+            self.statuses[str(status)] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "statuses": dict(self.statuses),
+                "tokens_issued": self.tokens_issued,
+                "config": {k: v for k, v in vars(self.config).items() if k != "fixtures"},
+                "fixture_kinds": sorted(self.config.fixtures),
+            }
+
+
+def _error(status: int, message: str, headers: dict | None = None) -> JSONResponse:
+    return JSONResponse({"status": status, "message": message}, status_code=status, headers=headers)
+
+
+def create_app(config: FakeConfig | None = None) -> FastAPI:
+    fake = FakeGigaChat(config or FakeConfig.from_file())
+    app = FastAPI(title="Fake GigaChat")
+    app.state.fake = fake
+
+    @app.post("/api/v2/oauth")
+    async def oauth(request: Request):
+        await asyncio.sleep(fake._oauth_latency(fake.rnd))
+        if not request.headers.get("authorization", "").startswith("Basic "):
+            fake.count("oauth", 401)
+            return _error(401, "Authorization header is required")
+        token, expires_at = fake.issue_token()
+        fake.count("oauth", 200)
+        # Как в настоящем API: expires_at — unix time в миллисекундах
+        return {"access_token": token, "expires_at": int(expires_at * 1000)}
+
+    def _bearer(request: Request) -> str:
+        header = request.headers.get("authorization", "")
+        return header[len("Bearer "):] if header.startswith("Bearer ") else ""
+
+    @app.get("/api/v1/models")
+    async def models(request: Request):
+        if not fake.token_valid(_bearer(request)):
+            return _error(401, "Token has expired")
+        return {"object": "list", "data": [{"id": "GigaChat-Pro", "object": "model", "owned_by": "fake"}]}
+
+    @app.post("/api/v1/chat/completions")
+    async def chat(request: Request):
+        payload = await request.json()
+        messages = payload.get("messages") or []
+        kind = classify_prompt(messages)
+        if not fake.token_valid(_bearer(request)):
+            fake.count(kind, 401)
+            return _error(401, "Token has expired")
+        injected = fake.injected_error()
+        if injected is not None:
+            fake.count(kind, injected)
+            headers = {"Retry-After": "1"} if injected == 429 else None
+            return _error(injected, "Injected failure", headers)
+
+        await asyncio.sleep(fake.latency(kind))
+        content = fake.next_fixture(kind)
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        usage = {
+            "prompt_tokens": prompt_chars // 3,
+            "completion_tokens": len(content) // 3,
+            "total_tokens": prompt_chars // 3 + len(content) // 3,
+        }
+        fake.count(kind, 200)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": content}, "index": 0, "finish_reason": "stop"}],
+            "created": int(time.time()),
+            "model": payload.get("model", "GigaChat-Pro"),
+            "object": "chat.completion",
+            "usage": usage,
+        }
+
+    @app.get("/__stats")
+    def stats():
+        return fake.stats()
+
+    @app.post("/__config")
+    async def update_config(request: Request):
+        try:
+            fake.update(await request.json())
+        except ValueError as e:
+            return _error(400, str(e))
+        return fake.stats()["config"]
+
+    @app.post("/__reset")
+    def reset():
+        fake.reset()
+        return {"status": "ok"}
+
+    return app
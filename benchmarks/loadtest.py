@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест HTTP API: многоходовые BANT-диалоги (start → 4–6 answer → results).
+
+    # поднять API и фейковый GigaChat локально и прогнать 200 диалогов по 16 параллельно
+    python -m benchmarks.loadtest --spawn --sessions 200 --concurrency 16 --json run.json
+
+    # открытая модель нагрузки: 5 новых диалогов в секунду (пуассоновский поток)
+    python -m benchmarks.loadtest --spawn --rate 5 --duration 60 --llm-latency lognormal:300:0.4
+
+    # против уже запущенного API; RSS процесса — по --pid
+    python -m benchmarks.loadtest --url http://localhost:8000 --pid 12345
+
+    # сравнить с прошлым прогоном
+    python -m benchmarks.loadtest --spawn --json new.json --compare old.json
+
+Отчет: диалоги/с, p50/p95/p99 и доля ошибок по эндпоинтам, рост RSS процессов во времени.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ANSWERS = {
+    "budget": [
+        "Бюджет есть, примерно 500-700 тысяч рублей",
+        "Бюджета пока нет, не заложено",
+        "Около 1,5 млн руб., точнее скажут после согласования",
+    ],
+    "authority": [
+        "Решает генеральный директор, согласует финансовый директор",
+        "Не знаем, кто ЛПР",
+        "Закупкой занимается ИТ-директор, подписывает собственник",
+    ],
+    "need": [
+        "Все ведут в Excel вручную, теряются заявки, нет отчетности",
+        "Проблем нет, все устраивает",
+        "Нужна единая база клиентов и воронка продаж",
+    ],
+    "timing": [
+        "Хотят запуститься до конца квартала",
+        "Сроки не определены",
+        "Планируют в следующем году",
+    ],
+    "other": [
+        "Бюджет 2 млн, решает CEO, запуск в этом квартале",
+        "Уточню у клиента и вернусь",
+    ],
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def rss_mb(pid: int) -> float | None:
+    """RSS процесса по /proc (Linux)"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.sessions_done = 0
+        self.sessions_failed = 0
+
+    def add(self, endpoint: str, seconds: float, status: int | str) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][str(status)] += 1
+            if not (isinstance(status, int) and 200 <= status < 300):
+                self.errors[endpoint] += 1
+
+    def session_finished(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.sessions_done += 1
+            else:
+                self.sessions_failed += 1
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, pids: dict[str, int], interval: float = 1.0):
+        super().__init__(name="loadtest-rss", daemon=True)
+        self.pids = pids
+        self.interval = interval
+        self.samples: list[dict] = []
+        self._done = threading.Event()
+        self._t0 = time.perf_counter()
+
+    def sample(self) -> None:
+        point = {"t": round(time.perf_counter() - self._t0, 2)}
+        for name, pid in self.pids.items():
+            point[name] = rss_mb(pid)
+        self.samples.append(point)
+
+    def run(self) -> None:
+        self.sample()
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+        self.sample()
+
+    def summary(self) -> dict:
+        result = {}
+        for name in self.pids:
+            values = [s[name] for s in self.samples if s.get(name) is not None]
+            if values:
+                result[name] = {"start_mb": values[0], "end_mb": values[-1], "peak_mb": max(values),
+                                "growth_mb": values[-1] - values[0]}
+        return result
+
+
+def run_conversation(base: str, http: requests.Session, rec: Recorder, rnd: random.Random, timeout: float) -> None:
+    def call(endpoint: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = http.request(method, base + path, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            rec.add(endpoint, time.perf_counter() - started, type(e).__name__)
+            return None
+        rec.add(endpoint, time.perf_counter() - started, resp.status_code)
+        return resp if resp.ok else None
+
+    resp = call("start", "POST", "/sessions/start", json={"deal_id": f"LOAD-{rnd.randrange(10**6)}"})
+    if resp is None:
+        rec.session_finished(False)
+        return
+    session_id = resp.json()["session_id"]
+    slot = resp.json().get("current_slot") or "other"
+    ok = True
+    for _ in range(rnd.randint(4, 6)):
+        text = rnd.choice(ANSWERS.get(slot) or ANSWERS["other"])
+        resp = call("answer", "POST", f"/sessions/{session_id}/answer", json={"text": text})
+        if resp is None:
+            ok = False
+            continue
+        slot = resp.json().get("current_slot") or "other"
+    ok = call("results", "GET", f"/results/{session_id}") is not None and ok
+    rec.session_finished(ok)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} is not ready after {timeout:.0f}s")
+
+
+def spawn_stack(llm_latency: str, storage: str, workdir: str) -> tuple[str, dict[str, subprocess.Popen]]:
+    """Поднимает фейковый GigaChat и API (uvicorn) как отдельные процессы"""
+    fake_port, api_port = _free_port(), _free_port()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procs = {
+        "fake_gigachat": subprocess.Popen(
+            [sys.executable, "run_fake_gigachat.py", "--port", str(fake_port), "--latency", llm_latency],
+            cwd=root, stdout=subprocess.DEVNULL,
+        ),
+    }
+    _wait_ready(f"http://127.0.0.1:{fake_port}/__stats")
+    env = {
+        **os.environ,
+        "GIGACHAT_AUTH_KEY": "fake",
+        "GIGACHAT_AUTH_URL": f"http://127.0.0.1:{fake_port}/api/v2/oauth",
+        "GIGACHAT_API_URL": f"http://127.0.0.1:{fake_port}/api/v1",
+        "GIGACHAT_VERIFY_SSL": "false",
+        "STORAGE_TYPE": storage,
+        "STORAGE_PATH": os.path.join(workdir, "sessions.json"),
+    }
+    procs["api"] = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api.main:app", "--port", str(api_port), "--log-level", "warning"],
+        cwd=root, env=env,
+    )
+    base = f"http://127.0.0.1:{api_port}"
+    _wait_ready(f"{base}/health")
+    return base, procs
+
+
+def run_load(base: str, sessions: int, concurrency: int, rate: float, duration: float | None,
+             timeout: float, seed: int | None, pids: dict[str, int]) -> dict:
+    rec = Recorder()
+    rnd = random.Random(seed)
+    local = threading.local()
+
+    def worker(conv_seed: int) -> None:
+        if not hasattr(local, "http"):
+            local.http = requests.Session()
+        run_conversation(base, local.http, rec, random.Random(conv_seed), timeout)
+
+    sampler = MemorySampler(pids)
+    sampler.start()
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = []
+        next_arrival = started
+        for _ in range(sessions):
+            now = time.perf_counter()
+            if deadline and now >= deadline:
+                break
+            if rate > 0:
+                # Открытая модель: пуассоновские прибытия, не зависят от скорости ответов
+                next_arrival += rnd.expovariate(rate)
+                if next_arrival > now:
+                    time.sleep(next_arrival - now)
+            else:
+                # Закрытая модель: не больше concurrency диалогов в работе
+                while sum(1 for f in futures if not f.done()) >= concurrency:
+                    time.sleep(0.005)
+            futures.append(pool.submit(worker, rnd.randrange(2**31)))
+        for fut in futures:
+            fut.result()
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+
+    endpoints = {}
+    for endpoint, values in sorted(rec.latencies.items()):
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": rec.errors.get(endpoint, 0),
+            "error_rate": rec.errors.get(endpoint, 0) / len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": max(values) * 1000,
+            "statuses": dict(rec.statuses[endpoint]),
+        }
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "summary": {
+            "elapsed_sec": elapsed,
+            "sessions_completed": rec.sessions_done,
+            "sessions_failed": rec.sessions_failed,
+            "sessions_per_sec": rec.sessions_done / elapsed if elapsed else 0.0,
+            "requests_per_sec": total_requests / elapsed if elapsed else 0.0,
+        },
+        "endpoints": endpoints,
+        "memory": {"summary": sampler.summary(), "timeline": sampler.samples},
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict, baseline: dict | None = None) -> None:
+    s = result["summary"]
+    print(f"sessions: {s['sessions_completed']} ok / {s['sessions_failed']} failed in {s['elapsed_sec']:.1f}s"
+          f" — {s['sessions_per_sec']:.2f} sessions/s, {s['requests_per_sec']:.1f} req/s")
+    for endpoint, e in result["endpoints"].items():
+        line = (f"{endpoint:>8}: n={e['requests']:<6} p50 {e['p50_ms']:7.1f}  p95 {e['p95_ms']:7.1f}"
+                f"  p99 {e['p99_ms']:7.1f} ms  errors {e['error_rate']:.2%}")
+        base = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if base and base.get("p95_ms"):
+            line += f"  (p95 {e['p95_ms'] / base['p95_ms'] - 1:+.0%} vs baseline)"
+        print(line)
+    for name, m in result["memory"]["summary"].items():
+        print(f"{name:>14} RSS: {m['start_mb']:.0f} → {m['end_mb']:.0f} MB (peak {m['peak_mb']:.0f}, "
+              f"growth {m['growth_mb']:+.1f})")
+    if baseline:
+        b = baseline["summary"]["sessions_per_sec"]
+        if b:
+            print(f"throughput vs baseline: {s['sessions_per_sec'] / b - 1:+.0%}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест BANT API")
+    parser.add_argument("--url", default="http://localhost:8000", help="адрес API (без --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="поднять API и фейковый GigaChat локально")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="PID для замера RSS (без --spawn)")
+    parser.add_argument("--sessions", type=int, default=200, help="сколько диалогов запустить")
+    parser.add_argument("--concurrency", type=int, default=16, help="максимум диалогов одновременно")
+    parser.add_argument("--rate", type=float, default=0.0, help="новых диалогов в секунду (0 — закрытая модель)")
+    parser.add_argument("--duration", type=float, default=None, help="ограничение по времени, сек")
+    parser.add_argument("--timeout", type=float, default=60.0, help="таймаут HTTP-запроса, сек")
+    parser.add_argument("--llm-latency", default="lognormal:300:0.4", help="задержка фейкового GigaChat (--spawn)")
+    parser.add_argument("--storage", default="json", help="STORAGE_TYPE для API (--spawn)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    procs: dict[str, subprocess.Popen] = {}
+    workdir = tempfile.mkdtemp(prefix="bant-loadtest-")
+    try:
+        if args.spawn:
+            base, procs = spawn_stack(args.llm_latency, args.storage, workdir)
+            pids = {name: p.pid for name, p in procs.items()}
+        else:
+            base = args.url.rstrip("/")
+            pids = {f"pid_{pid}": pid for pid in args.pid}
+        result = run_load(base, args.sessions, args.concurrency, args.rate, args.duration,
+                          args.timeout, args.seed, pids)
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            proc.wait(timeout=10)
+
+    result["config"] = {k: v for k, v in vars(args).items() if k not in ("json", "compare")}
+    result["revision"] = git_revision()
+    result["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if result["summary"]["sessions_completed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
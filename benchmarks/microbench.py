@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки CPU-путей app/core с базовой линией и порогом регрессии.
+
+    python -m benchmarks.microbench                   # сравнить с базовой линией, код 1 при регрессии
+    python -m benchmarks.microbench --save-baseline   # записать новую базовую линию
+    python -m benchmarks.microbench --only merge,heuristic_score --threshold 0.3 --json bench.json
+    python run_tests.py --bench                       # тесты, затем этот гейт
+
+Данные — синтетические записи с разной заполненностью (0–4 слота); LLM — MockLLM из
+tests/test_flow.py без задержки. Время нормируется на калибровочный цикл на чистом Python,
+поэтому базовая линия переносима между машинами (с точностью до порога).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+from datetime import date
+
+from app.core.flow import BantFlow
+from app.core.schema import BantRecord, BantScore, SessionState
+from app.core.validator import parse_bant_json_text, validate_record
+from tests.test_flow import MockLLM
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "microbench.json")
+DEFAULT_THRESHOLD = float(os.getenv("BENCH_THRESHOLD", "0.25"))
+
+_SLOT_VALUES = {
+    "budget": [
+        {"have_budget": True, "amount_min": 500000, "amount_max": 700000, "currency": "RUB"},
+        {"have_budget": False},
+        {"have_budget": True, "amount_max": 1500000, "currency": "RUB", "comment": "после согласования"},
+    ],
+    "authority": [
+        {"decision_maker": "CEO", "stakeholders": ["CFO", "ИТ-директор"], "decision_process": "тендер"},
+        {"decision_maker": "не знаем"},
+        {"decision_maker": "ИТ-директор", "risks": ["смена руководства"]},
+    ],
+    "need": [
+        {"pain_points": ["ручной учет", "потеря заявок"], "success_criteria": ["единая база", "отчеты"],
+         "current_solution": "Excel", "priority": "high"},
+        {"pain_points": []},
+        {"pain_points": ["нет воронки"], "priority": "medium"},
+    ],
+    "timing": [
+        {"timeframe": "this_quarter", "next_step": "демо"},
+        {"timeframe": "unknown"},
+        {"timeframe": "this_year", "deadline": date(2026, 12, 1)},
+    ],
+}
+
+_PAYLOAD = {
+    "budget": {"have_budget": True, "amount_min": "500 тыс", "currency": "руб"},
+    "need": {"pain_points": ["ручной учет"], "priority": "high"},
+}
+
+_SCORE = {
+    "budget": {"value": 20, "confidence": 0.8}, "authority": {"value": 15, "confidence": 0.7},
+    "need": {"value": 25, "confidence": 0.9}, "timing": {"value": 10, "confidence": 0.6},
+    "total": 70, "stage": "qualified",
+}
+
+_FOLLOWUPS = {"followups": {"authority": ["Кто подписывает договор?"], "timing": ["Когда нужен запуск?"]}}
+
+_JSON_TEXTS = [
+    json.dumps({"budget": _SLOT_VALUES["budget"][0], "need": _SLOT_VALUES["need"][0]}, ensure_ascii=False),
+    'Вот результат:\n```json\n{"authority": {"decision_maker": "CEO"}}\n```',
+    '{"timing": {"timeframe": "this_quarter",}, // сроки\n "need": {"pain_points": ["Excel"',
+]
+
+
+def synthetic_records(n: int = 20, seed: int = 42) -> list[BantRecord]:
+    """n записей: заполненность по кругу 0..4 слота, значения и порядок слотов — случайные"""
+    rnd = random.Random(seed)
+    records = []
+    for i in range(n):
+        slots = rnd.sample(BantFlow.SLOTS, i % 5)
+        data = {slot: dict(rnd.choice(_SLOT_VALUES[slot])) for slot in slots}
+        record = BantRecord(deal_id=f"BENCH-{i}", **data)
+        record.filled = validate_record(record)
+        records.append(record)
+    return records
+
+
+def build_cases(records: list[BantRecord]) -> dict:
+    """Имя → функция одного прохода по всем записям"""
+    flow = BantFlow(MockLLM([]))
+    states = [SessionState(session_id=f"s{i}", deal_id=r.deal_id, record=r) for i, r in enumerate(records)]
+    scores = [flow._heuristic_score(r) for r in records]
+    dumps = [r.model_dump() for r in records]
+    llm_responses = [json.dumps(_PAYLOAD, ensure_ascii=False), json.dumps(_SCORE), json.dumps(_FOLLOWUPS, ensure_ascii=False)]
+
+    def next_slot():
+        for st in states:
+            flow.next_slot(st)
+
+    def validate():
+        for r in records:
+            validate_record(r)
+
+    def merge():
+        for st, r in zip(states, records):
+            st.record = r
+            flow._merge_payload(st, _PAYLOAD)
+        for st, r in zip(states, records):
+            st.record = r
+
+    def heuristic_score():
+        for r in records:
+            flow._heuristic_score(r)
+
+    def heuristic_followups():
+        for s, r in zip(scores, records):
+            flow._heuristic_followups(s, r)
+
+    def parse_json():
+        for text in _JSON_TEXTS:
+            parse_bant_json_text(text)
+
+    def record_build():
+        for d in dumps:
+            BantRecord(**d)
+
+    def record_dump():
+        for r in records:
+            r.model_dump()
+            r.model_dump_json()
+
+    def process_answer():
+        for st, r in zip(states, records):
+            st.record, st.current_slot = r, "budget"
+            flow.llm = MockLLM(llm_responses)
+            flow.process_answer(st, "Бюджет 500 тыс руб, главная боль — ручной учет")
+        for st, r in zip(states, records):
+            st.record, st.current_slot = r, None
+
+    # Проверка, что MockLLM-ответы действительно проходят валидацию (иначе меряем fallback)
+    BantScore(**_SCORE)
+    return {
+        "next_slot": (next_slot, len(states)),
+        "validate_record": (validate, len(records)),
+        "merge": (merge, len(states)),
+        "heuristic_score": (heuristic_score, len(records)),
+        "heuristic_followups": (heuristic_followups, len(records)),
+        "parse_bant_json_text": (parse_json, len(_JSON_TEXTS)),
+        "record_build": (record_build, len(dumps)),
+        "record_dump": (record_dump, len(records)),
+        "process_answer": (process_answer, len(states)),
+    }
+
+
+def measure(fn, repeat: int = 5, min_time: float = 0.05) -> float:
+    """Лучшее время одного вызова fn в секундах (timeit, автоподбор числа повторов)"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Эталонная нагрузка на чистом Python (dict/str/list), секунды на проход"""
+    def work():
+        d = {}
+        for i in range(2000):
+            d[f"k{i % 97}"] = d.get(f"k{i % 89}", 0) + i
+        sorted(d.items())
+    return measure(work, repeat=repeat)
+
+
+def run(only: list[str] | None = None, repeat: int = 5, records: int = 20) -> dict:
+    recs = synthetic_records(records)
+    cases = build_cases(recs)
+    if only:
+        unknown = set(only) - set(cases)
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        cases = {name: cases[name] for name in only}
+    calibration = calibrate(repeat)
+    results = {}
+    for name, (fn, items) in cases.items():
+        seconds = measure(fn, repeat=repeat) / items
+        results[name] = {"us_per_item": seconds * 1e6, "normalized": seconds / calibration}
+    return {
+        "calibration_us": calibration * 1e6,
+        "benchmarks": results,
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Пути, замедлившиеся относительно базовой линии больше чем на threshold (по нормированному времени)"""
+    regressions = []
+    for name, cur in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or not base.get("normalized"):
+            continue
+        ratio = cur["normalized"] / base["normalized"]
+        if ratio > 1 + threshold:
+            regressions.append({"name": name, "ratio": ratio,
+                                "us_per_item": cur["us_per_item"], "baseline_us": base["us_per_item"]})
+    return regressions
+
+
+def print_report(current: dict, baseline: dict | None) -> None:
+    print(f"calibration: {current['calibration_us']:.1f} us")
+    for name, cur in current["benchmarks"].items():
+        line = f"{name:>22}: {cur['us_per_item']:9.2f} us/item"
+        base = (baseline or {}).get("benchmarks", {}).get(name)
+        if base and base.get("normalized"):
+            line += f"  ({cur['normalized'] / base['normalized'] - 1:+.0%} vs baseline)"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих путей app/core")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="файл базовой линии")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как базовую линию")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление (0.25 — на 25%%)")
+    parser.add_argument("--only", help="через запятую: какие бенчмарки запускать")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--records", type=int, default=20, help="число синтетических записей")
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    current = run(args.only.split(",") if args.only else None, args.repeat, args.records)
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(current, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved: {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --save-baseline", file=sys.stderr)
+        return 0
+
+    regressions = compare(current, baseline, args.threshold)
+    for r in regressions:
+        print(f"REGRESSION {r['name']}: x{r['ratio']:.2f} ({r['baseline_us']:.2f} → {r['us_per_item']:.2f} us/item)",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
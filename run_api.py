@@ -1,21 +1,74 @@
 #!/usr/bin/env python3
 """
 Скрипт для запуска API сервера
+
+  python run_api.py                  # разработка: один процесс с автоперезагрузкой
+  python run_api.py --prod           # production: API_WORKERS процессов, без reload
+  python run_api.py --prod --workers 4 --import-budget-ms 500 --strict
+
+В production-режиме приложение сначала импортируется в мастер-процессе: это прогревает
+байткод для воркеров и проверяет бюджет времени импорта (сервис и клиент GigaChat при
+импорте не создаются — только в lifespan воркера).
 """
+import argparse
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения
 load_dotenv()
 
 import uvicorn
-from app.api.main import app
 
-if __name__ == "__main__":
+
+def measure_import() -> float:
+    """Время импорта app.api.main в мс"""
+    started = time.perf_counter()
+    import app.api.main  # noqa: F401
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None) -> int:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Запуск BANT API")
+    parser.add_argument("--prod", action="store_true", default=os.getenv("API_MODE") == "prod",
+                        help="production-режим: несколько воркеров, без reload")
+    parser.add_argument("--host", default=settings.api_host)
+    parser.add_argument("--port", type=int, default=settings.api_port)
+    parser.add_argument("--workers", type=int, default=settings.api_workers,
+                        help="число процессов (0 — по числу ядер)")
+    parser.add_argument("--import-budget-ms", type=float, default=settings.api_import_budget_ms)
+    parser.add_argument("--strict", action="store_true", help="выйти с ошибкой при превышении бюджета импорта")
+    args = parser.parse_args(argv)
+
+    if not args.prod:
+        uvicorn.run("app.api.main:app", host=args.host, port=args.port, reload=True, log_level="info")
+        return 0
+
+    import_ms = measure_import()
+    over_budget = import_ms > args.import_budget_ms
+    print(
+        f"import app.api.main: {import_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)"
+        + (" — OVER BUDGET" if over_budget else ""),
+        file=sys.stderr,
+    )
+    if over_budget and args.strict:
+        return 1
+
+    workers = args.workers or os.cpu_count() or 1
     uvicorn.run(
         "app.api.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        log_level="info",
+        proxy_headers=True,
+        timeout_keep_alive=30,
     )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Скрипт для офлайн-обработки JSONL с заметками по сделкам
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+from app.core.flow import BantFlow
+from app.core.llm import GigaChatClient
+from app.services.batch import run_batch
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетное извлечение BANT из JSONL {deal_id, text}")
+    parser.add_argument("input", help="Входной JSONL файл")
+    parser.add_argument("output", help="Выходной NDJSON файл (дописывается)")
+    parser.add_argument("--checkpoint", help="Файл чекпоинта (по умолчанию <output>.ckpt)")
+    parser.add_argument("--workers", type=int, default=4, help="Число параллельных обработчиков")
+    parser.add_argument("--id-field", default="deal_id", help="Поле с ID сделки")
+    parser.add_argument("--text-field", default="text", help="Поле с текстом заметки")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Интервал вывода прогресса, сек")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or f"{args.output}.ckpt"
+    flow = BantFlow(GigaChatClient(), concurrent_requests=args.workers)
+    stats = run_batch(
+        flow,
+        args.input,
+        args.output,
+        checkpoint_path=checkpoint,
+        workers=args.workers,
+        id_field=args.id_field,
+        text_field=args.text_field,
+        progress_interval=args.progress_interval,
+    )
+    if stats.failed:
+        print(f"[run_batch] {stats.failed} строк с ошибками, см. поле \"error\" в {os.path.abspath(args.output)}")
+
+if __name__ == "__main__":
+    main()
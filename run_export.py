@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Выгрузка всех записей хранилища плоскими строками (для ночной синхронизации с CRM)
+
+  python run_export.py bant.ndjson
+  python run_export.py bant.csv --updated-since 2026-10-01T00:00:00Z
+  python run_export.py bant.parquet                 # нужен pyarrow
+  python run_export.py - --format ndjson | gzip > bant.ndjson.gz
+
+Хранилище читается потоково, память не зависит от его размера.
+"""
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+from app.core.config import settings
+from app.services.export import FORMATS, ParquetUnavailable, csv_chunks, iter_rows, ndjson_chunks, parse_timestamp, write_parquet
+from app.services.storage import JSONStorage
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Потоковая выгрузка BANT-записей в NDJSON/CSV/Parquet")
+    parser.add_argument("output", help="Выходной файл ('-' — stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="Формат (по умолчанию — по расширению файла)")
+    parser.add_argument("--storage-path", default=settings.storage_path, help="JSON-файл хранилища сессий")
+    parser.add_argument("--updated-since", help="ISO-время: только записи, измененные не раньше")
+    parser.add_argument("--chunk-rows", type=int, default=500, help="Строк в одной пачке записи")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower() or "ndjson"
+    if fmt not in FORMATS:
+        parser.error(f"unknown format {fmt!r}; use --format")
+    since = parse_timestamp(args.updated_since) if args.updated_since else None
+    
+    # Только чтение: сервер может писать в хранилище одновременно с выгрузкой
+    storage = JSONStorage(args.storage_path, read_only=True)
+    count = 0
+    
+    def counted():
+        nonlocal count
+        for row in iter_rows(storage.iter_sessions(), since):
+            count += 1
+            yield row
+    
+    if fmt == "parquet":
+        if args.output == "-":
+            parser.error("parquet cannot be written to stdout")
+        try:
+            write_parquet(counted(), args.output, chunk_rows=max(args.chunk_rows, 1000))
+        except ParquetUnavailable as e:
+            print(f"[run_export] {e}", file=sys.stderr)
+            return 1
+    else:
+        chunks = csv_chunks(counted(), args.chunk_rows) if fmt == "csv" else ndjson_chunks(counted(), args.chunk_rows)
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    print(f"[run_export] {count} записей → {args.output} ({fmt})", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
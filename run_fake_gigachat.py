@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Запуск локальной замены GigaChat (см. benchmarks/fake_gigachat.py)
+
+    python run_fake_gigachat.py --port 8090 --latency lognormal:800:0.5 \
+        --latency-kind scoring=fixed:300 --error-429 0.02 --token-ttl 60
+"""
+import argparse
+
+import uvicorn
+
+from benchmarks.fake_gigachat import DEFAULT_FIXTURES, FakeConfig, create_app, parse_latency
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Fake GigaChat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="JSON с ответами по типам промптов")
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:MIN:MAX | normal:MEAN:STD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--latency-kind", action="append", default=[], metavar="KIND=SPEC",
+                        help="задержка для отдельного типа промпта, можно несколько раз")
+    parser.add_argument("--oauth-latency", default="fixed:0")
+    parser.add_argument("--error-401", type=float, default=0.0, help="доля ответов 401")
+    parser.add_argument("--error-429", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="доля ответов 500/502/503")
+    parser.add_argument("--token-ttl", type=float, default=1800.0, help="время жизни токена, сек")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    latency_by_kind = dict(item.split("=", 1) for item in args.latency_kind)
+    for spec in [args.latency, args.oauth_latency, *latency_by_kind.values()]:
+        parse_latency(spec)  # ошибка в спецификации — до старта сервера
+
+    config = FakeConfig.from_file(
+        args.fixtures,
+        latency=args.latency,
+        latency_by_kind=latency_by_kind,
+        oauth_latency=args.oauth_latency,
+        error_401=args.error_401,
+        error_429=args.error_429,
+        error_5xx=args.error_5xx,
+        token_ttl=args.token_ttl,
+        seed=args.seed,
+    )
+    print(f"GIGACHAT_AUTH_URL=http://{args.host}:{args.port}/api/v2/oauth")
+    print(f"GIGACHAT_API_URL=http://{args.host}:{args.port}/api/v1")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """
 Скрипт для запуска тестов
+
+  python run_tests.py                # pytest
+  python run_tests.py --bench        # pytest, затем микробенчмарки с порогом регрессии
+  python run_tests.py --bench-only   # только микробенчмарки (аргументы после -- передаются им)
 """
 import subprocess
 import sys
@@ -11,13 +15,25 @@ def main():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     os.environ["PYTHONPATH"] = current_dir
     
-    # Запускаем pytest
-    subprocess.run([
-        sys.executable, "-m", "pytest", 
-        "tests/", 
-        "-v", 
-        "--tb=short"
-    ])
+    args = sys.argv[1:]
+    bench_args = args[args.index("--") + 1:] if "--" in args else []
+    bench_only = "--bench-only" in args
+    code = 0
+    
+    if not bench_only:
+        # Запускаем pytest
+        code = subprocess.run([
+            sys.executable, "-m", "pytest", 
+            "tests/", 
+            "-v", 
+            "--tb=short"
+        ]).returncode
+    
+    if bench_only or "--bench" in args:
+        # Гейт производительности: код 1, если путь замедлился сильнее порога
+        code = subprocess.run([sys.executable, "-m", "benchmarks.microbench", *bench_args]).returncode or code
+    
+    return code
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import asyncio
+from app.api.admission import AdmissionLimiter, AdmissionMiddleware, classify_request
+
+def test_classify_request():
+    """Тест классификации эндпоинтов"""
+    assert classify_request("POST", "/sessions/abc/answer") == "answer"
+    assert classify_request("GET", "/sessions/abc/status") == "read"
+    assert classify_request("GET", "/results/abc") == "read"
+    assert classify_request("POST", "/sessions/start") == "write"
+    assert classify_request("POST", "/sessions/start:bulk") == "write"
+    assert classify_request("GET", "/export") == "export"
+    assert classify_request("GET", "/results/abc/export") == "read"
+    assert classify_request("DELETE", "/sessions/abc") is None
+    assert classify_request("GET", "/health") is None
+
+def run_requests(limiters, paths, hold):
+    """Прогоняет запросы через middleware; приложение держит запрос hold секунд"""
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(hold)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    
+    middleware = AdmissionMiddleware(slow_app, limiters)
+    
+    async def one(method, path):
+        result = {}
+        async def send(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+                result["headers"] = dict(message["headers"])
+        await middleware({"type": "http", "method": method, "path": path}, None, send)
+        return result
+    
+    async def main():
+        return await asyncio.gather(*(one(method, path) for method, path in paths))
+    
+    return asyncio.run(main())
+
+def test_admission_rejects_over_queue():
+    """Тест: сверх лимита и очереди — быстрый 429 с Retry-After"""
+    limiters = {"answer": AdmissionLimiter("answer", limit=2, queue_size=1, queue_timeout=1.0, retry_after=7)}
+    results = run_requests(limiters, [("POST", "/sessions/s/answer")] * 5, hold=0.05)
+    
+    statuses = sorted(r["status"] for r in results)
+    assert statuses == [200, 200, 200, 429, 429]
+    rejected = next(r for r in results if r["status"] == 429)
+    assert rejected["headers"][b"retry-after"] == b"7"
+    assert limiters["answer"].stats()["rejected"] == 2
+    assert limiters["answer"].in_flight == 0
+
+def test_admission_queue_timeout():
+    """Тест: не дождавшиеся слота в очереди получают 503"""
+    limiters = {"answer": AdmissionLimiter("answer", limit=1, queue_size=5, queue_timeout=0.05, retry_after=1)}
+    results = run_requests(limiters, [("POST", "/sessions/s/answer")] * 3, hold=0.2)
+    
+    assert sorted(r["status"] for r in results) == [200, 503, 503]
+
+def test_reads_not_starved_by_answers():
+    """Тест: чтения идут по своему лимиту, пока answer-слоты заняты"""
+    limiters = {
+        "answer": AdmissionLimiter("answer", limit=1, queue_size=0, queue_timeout=1.0, retry_after=1),
+        "read": AdmissionLimiter("read", limit=4, queue_size=0, queue_timeout=1.0, retry_after=1),
+    }
+    paths = [("POST", "/sessions/s/answer")] * 2 + [("GET", "/sessions/s/status")] * 4
+    results = run_requests(limiters, paths, hold=0.05)
+    
+    assert [r["status"] for r in results[2:]] == [200] * 4
+    assert sorted(r["status"] for r in results[:2]) == [200, 429]
+
+def test_rejection_has_cors_headers(monkeypatch):
+    """Тест: отказ admission control проходит через CORS и несет его заголовки"""
+    from fastapi.testclient import TestClient
+    from app.api.main import app, limiters
+
+    async def reject():
+        return 429
+    monkeypatch.setattr(limiters["read"], "acquire", reject)
+    
+    resp = TestClient(app).get("/sessions/s/status", headers={"Origin": "http://ui.example"})
+    assert resp.status_code == 429
+    assert resp.headers["access-control-allow-origin"]
+    assert resp.headers["retry-after"] == "1"
+
+def test_queue_timeouts_do_not_leak_slots():
+    """Тест: таймауты ожидания на границе освобождения слота не уносят слоты семафора"""
+    limiter = AdmissionLimiter("answer", limit=2, queue_size=100, queue_timeout=0.01, retry_after=1)
+    results = run_requests({"answer": limiter}, [("POST", "/sessions/s/answer")] * 60, hold=0.01)
+    
+    assert {r["status"] for r in results} <= {200, 503}
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+    assert limiter._sem._value == 2
+
+def test_export_streams_do_not_take_read_slots():
+    """Тест: долгие выгрузки идут по своему лимиту и не вытесняют чтения"""
+    limiters = {
+        "read": AdmissionLimiter("read", limit=2, queue_size=0, queue_timeout=1.0, retry_after=1),
+        "export": AdmissionLimiter("export", limit=1, queue_size=0, queue_timeout=1.0, retry_after=1),
+    }
+    paths = [("GET", "/export")] * 3 + [("GET", "/results/abc")] * 2
+    results = run_requests(limiters, paths, hold=0.05)
+    
+    assert sorted(r["status"] for r in results[:3]) == [200, 429, 429]
+    assert [r["status"] for r in results[3:]] == [200, 200]
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from app.core.schema import BantRecord, BantScore, SessionState
+from app.services.analytics import PipelineAnalytics
+from app.services.storage import JSONStorage
+
+DAY1 = datetime(2026, 10, 1, tzinfo=timezone.utc)
+DAY2 = datetime(2026, 10, 2, tzinfo=timezone.utc)
+
+def _score(values, stage):
+    slots = dict(zip(("budget", "authority", "need", "timing"), values))
+    return BantScore(**{k: {"value": v, "confidence": 0.8} for k, v in slots.items()}, total=sum(values), stage=stage)
+
+def _state(i):
+    return SessionState(session_id=f"s{i}", deal_id=f"D{i}", record=BantRecord(deal_id=f"D{i}"))
+
+def test_incremental_matches_rebuild():
+    """Тест: инкрементальные счетчики совпадают с пересчетом по всем сессиям"""
+    analytics = PipelineAnalytics()
+    states = [_state(i) for i in range(3)]
+    analytics.update(*states, now=DAY1)
+    
+    states[0].record.budget.have_budget = True
+    states[0].record.filled = "partial"
+    states[0].record.score = _score([20, 10, 5, 0], "unqualified")
+    analytics.update(states[0], now=DAY1)
+    states[0].record.score = _score([22, 20, 20, 18], "ready")
+    states[0].record.filled = "full"
+    analytics.update(states[0], now=DAY2)
+    
+    snap = analytics.snapshot()
+    rebuilt = PipelineAnalytics()
+    rebuilt.rebuild(states)
+    for key in ("sessions", "scored", "stages", "filled", "fill_rate", "avg_score", "score_histogram"):
+        assert snap[key] == rebuilt.snapshot()[key]
+    
+    assert snap["stages"] == {"unscored": 2, "ready": 1}
+    assert snap["avg_score"]["total"] == 80
+    assert snap["score_histogram"]["budget"][2] == 1
+    assert snap["fill_rate"]["budget"] == 1.0  # currency=RUB по умолчанию — слот не пустой
+
+def test_trend_by_day_and_sidecar_roundtrip(tmp_path):
+    """Тест: тренды по дням переживают перезапуск через sidecar-файл хранилища"""
+    analytics = PipelineAnalytics()
+    st = _state(1)
+    analytics.update(st, now=DAY1)
+    st.record.score = _score([20, 20, 20, 20], "ready")
+    analytics.update(st, now=DAY2)
+    analytics.update(st, now=DAY2)  # без изменений — только счетчик обновлений
+    
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    storage.save_sidecar("analytics", analytics.to_dict())
+    assert storage.sidecar_path("analytics").endswith("sessions.analytics.json")
+    
+    restored = PipelineAnalytics()
+    restored.load_trend(storage.load_sidecar("analytics"))
+    trend = restored.snapshot()["trend"]
+    assert [t["day"] for t in trend] == ["2026-10-01", "2026-10-02"]
+    assert trend[1] == {"day": "2026-10-02", "updates": 2, "stage_entered": {"ready": 1},
+                        "filled_entered": {}, "avg_total": 80.0}
+    assert restored.snapshot(days=1)["trend"] == trend[1:]
+
+def test_trend_buckets_are_bounded():
+    """Тест: старые дни вытесняются сверх max_buckets"""
+    analytics = PipelineAnalytics(max_buckets=2)
+    for day in (1, 2, 3):
+        analytics.update(_state(day), now=datetime(2026, 10, day, tzinfo=timezone.utc))
+    assert [t["day"] for t in analytics.snapshot()["trend"]] == ["2026-10-02", "2026-10-03"]
+
+def test_service_writes_sidecar_on_flush_not_per_change(tmp_path, monkeypatch):
+    """Тест: sidecar трендов пишется по таймеру/при остановке, а не при каждом сохранении сессии"""
+    from app.core.config import settings
+    from app.services.bant_agent import BantAgentService
+    monkeypatch.setattr(settings, "analytics_flush_sec", 0)
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    svc = BantAgentService(storage=storage)
+    
+    svc.start_many(["D-1", "D-2"])
+    assert storage.load_sidecar("analytics") is None
+    
+    svc.close()
+    assert storage.load_sidecar("analytics")["trend"]
+    assert not (tmp_path / "sessions.journal.jsonl").exists()
+    restored = BantAgentService(storage=JSONStorage(str(tmp_path / "sessions.json")))
+    assert restored.analytics.snapshot()["sessions"] == 2
@@ -0,0 +1,82 @@
+import io
+import json
+import threading
+from app.core.flow import BantFlow
+from app.services.batch import BatchCheckpoint, run_batch
+
+class StubLLM:
+    """Потокобезопасная заглушка LLM: извлекает бюджет, остальное отдает пустым"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.call_count = 0
+
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        with self.lock:
+            self.call_count += 1
+        if "бюджет" in messages[-1]["content"].lower():
+            return '{"budget": {"have_budget": true, "amount_min": 100000, "currency": "RUB"}}'
+        return "{}"
+
+def write_jsonl(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write((item if isinstance(item, str) else json.dumps(item, ensure_ascii=False)) + "\n")
+
+def read_ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def test_run_batch_streams_results(tmp_path):
+    """Тест обработки всех строк и записи NDJSON"""
+    src = tmp_path / "in.jsonl"
+    out = tmp_path / "out.ndjson"
+    write_jsonl(src, [
+        {"deal_id": f"DEAL-{i}", "text": f"Есть бюджет {i}00 тысяч"} for i in range(10)
+    ] + ["не json", {"deal_id": "DEAL-X", "text": ""}])
+
+    stats = run_batch(BantFlow(StubLLM()), str(src), str(out), checkpoint_path=str(tmp_path / "ckpt"), workers=3, log=None)
+
+    rows = read_ndjson(out)
+    assert stats.processed == 12
+    assert stats.failed == 2
+    assert sorted(r["line"] for r in rows) == list(range(12))
+    ok_rows = [r for r in rows if r["ok"]]
+    assert all(r["record"]["budget"]["have_budget"] is True for r in ok_rows)
+    assert {r["deal_id"] for r in rows if not r["ok"]} == {None, "DEAL-X"}
+
+def test_run_batch_resumes_from_checkpoint(tmp_path):
+    """Тест продолжения прерванного запуска с чекпоинта"""
+    src = tmp_path / "in.jsonl"
+    out = tmp_path / "out.ndjson"
+    ckpt = tmp_path / "ckpt"
+    write_jsonl(src, [{"deal_id": f"DEAL-{i}", "text": "Бюджет есть"} for i in range(6)])
+
+    # Эмулируем прерванный запуск: первые 4 строки уже обработаны
+    checkpoint = BatchCheckpoint(str(ckpt))
+    with open(src, "rb") as f:
+        offsets = []
+        for line in f:
+            offsets.append((offsets[-1] if offsets else 0) + len(line))
+    for i in [0, 1, 3]:
+        checkpoint.mark(i, offsets[i])
+    checkpoint.save()
+    assert checkpoint.watermark == 2
+
+    llm = StubLLM()
+    stats = run_batch(BantFlow(llm), str(src), str(out), checkpoint_path=str(ckpt), workers=2, log=None)
+
+    assert sorted(r["line"] for r in read_ndjson(out)) == [2, 4, 5]
+    assert stats.processed == 3
+    assert stats.skipped == 1
+    assert BatchCheckpoint(str(ckpt)).watermark == 6
+
+def test_run_batch_reports_progress(tmp_path):
+    """Тест вывода прогресса и пропускной способности"""
+    src = tmp_path / "in.jsonl"
+    write_jsonl(src, [{"deal_id": "DEAL-1", "text": "Бюджет есть"}])
+    log = io.StringIO()
+
+    run_batch(BantFlow(StubLLM()), str(src), str(tmp_path / "out.ndjson"), log=log)
+
+    assert "1 processed" in log.getvalue()
+    assert "items/s" in log.getvalue()
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.deps import provide_service
+from app.api.routers import sessions
+from app.core.config import settings
+from app.services.bant_agent import BantAgentService
+
+class StubFlow:
+    """Заглушка BantFlow: задержка и ошибка задаются текстом ответа ("sleep:0.1", "boom")"""
+    def __init__(self, flow):
+        self.flow = flow
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def __getattr__(self, name):
+        return getattr(self.flow, name)
+
+    def process_answer(self, state, text):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if text.startswith("sleep:"):
+                time.sleep(float(text.split(":", 1)[1]))
+            if text == "boom":
+                raise RuntimeError("LLM failed")
+            return state, "Следующий вопрос", []
+        finally:
+            with self.lock:
+                self.active -= 1
+
+@pytest.fixture
+def svc(monkeypatch):
+    monkeypatch.setattr(settings, "api_batch_concurrency", 2)
+    service = BantAgentService()
+    service.flow = StubFlow(service.flow)
+    return service
+
+@pytest.fixture
+def client(svc):
+    app = FastAPI()
+    app.include_router(sessions.router)
+    app.dependency_overrides[provide_service] = lambda: svc
+    return TestClient(app)
+
+def test_answer_many_caps_concurrency(svc):
+    """Тест: одновременно обрабатывается не больше api_batch_concurrency ответов"""
+    ids = [svc.start(f"D-{i}").session_id for i in range(6)]
+
+    outcomes = dict(svc.answer_many([(sid, "sleep:0.05") for sid in ids]))
+
+    assert sorted(outcomes) == list(range(6))
+    assert svc.flow.max_active == 2
+    assert all(isinstance(outcome, tuple) for outcome in outcomes.values())
+
+def test_batch_item_errors_do_not_fail_batch(svc, client):
+    """Тест: 404/500 отдельных элементов — в их результатах, остальные обработаны"""
+    ok = svc.start("D-1").session_id
+    failing = svc.start("D-2").session_id
+    items = [{"session_id": ok, "text": "Бюджет есть"},
+             {"session_id": "missing", "text": "Бюджет есть"},
+             {"session_id": failing, "text": "boom"}]
+
+    resp = client.post("/sessions/answers:batch", json={"items": items})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["succeeded"], body["failed"]) == (1, 2)
+    assert [(r["ok"], r["status"]) for r in body["results"]] == [(True, 200), (False, 404), (False, 500)]
+    assert body["results"][0]["result"]["version"] == 1
+    assert "LLM failed" in body["results"][2]["error"]
+
+def test_batch_results_keep_request_order(svc, client):
+    """Тест: результаты — в порядке элементов запроса, хотя готовы в другом порядке"""
+    ids = [svc.start(f"D-{i}").session_id for i in range(4)]
+    delays = [0.15, 0.0, 0.1, 0.0]
+    items = [{"session_id": sid, "text": f"sleep:{d}"} for sid, d in zip(ids, delays)]
+
+    results = client.post("/sessions/answers:batch", json={"items": items}).json()["results"]
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["session_id"] for r in results] == ids
+
+def test_batch_stream_ndjson(svc, client):
+    """Тест: stream=true — NDJSON по мере готовности, индекс связывает строку с элементом"""
+    ids = [svc.start(f"D-{i}").session_id for i in range(3)]
+    items = [{"session_id": ids[0], "text": "sleep:0.2"},
+             {"session_id": ids[1], "text": "Бюджет есть"},
+             {"session_id": "missing", "text": "Бюджет есть"}]
+
+    resp = client.post("/sessions/answers:batch", params={"stream": "true", "fields": "session_id,version"},
+                       json={"items": items})
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert sorted(r["index"] for r in rows) == [0, 1, 2]
+    assert rows[-1]["index"] == 0  # самый медленный — последним
+    by_index = {r["index"]: r for r in rows}
+    assert by_index[0]["result"] == {"session_id": ids[0], "version": 1}
+    assert by_index[2]["status"] == 404 and by_index[2]["session_id"] == "missing"
@@ -0,0 +1,80 @@
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.deps import provide_service
+from app.api.routers import sessions
+from app.core.config import settings
+from app.services.bant_agent import BantAgentService
+from app.services.storage import JSONStorage
+
+class BlockingWarmup:
+    """Прогрев, который ждет release(); считает запуски"""
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(2)
+        return True
+
+@pytest.fixture
+def svc():
+    service = BantAgentService()
+    service.llm.warmup = BlockingWarmup()
+    yield service
+    service.llm.warmup.release.set()
+
+@pytest.fixture
+def client(svc):
+    app = FastAPI()
+    app.include_router(sessions.router)
+    app.dependency_overrides[provide_service] = lambda: svc
+    return TestClient(app)
+
+def test_start_many_saves_once(tmp_path, monkeypatch):
+    """Тест: start_many создает сессии по сделкам и сохраняет их одной записью в хранилище"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    saves = []
+    save = storage.save_sessions
+    monkeypatch.setattr(storage, "save_sessions", lambda states: saves.append(len(states)) or save(states))
+    service = BantAgentService(storage=storage)
+
+    states = service.start_many(["D-1", "D-2", "D-1"])
+
+    assert [st.deal_id for st in states] == ["D-1", "D-2", "D-1"]
+    assert len({st.session_id for st in states}) == 3
+    assert saves == [3]
+    assert set(storage.load_all_sessions()) == {st.session_id for st in states}
+    assert len(service.deals.session_ids("D-1")) == 2
+
+def test_bulk_start_endpoint(svc, client):
+    """Тест: start:bulk отдает сессии в порядке deal_ids с первым вопросом"""
+    resp = client.post("/sessions/start:bulk", json={"deal_ids": ["D-1", "D-2"], "prewarm": False})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [s["deal_id"] for s in body["sessions"]] == ["D-1", "D-2"]
+    assert all(s["current_slot"] == "budget" and s["question"] for s in body["sessions"])
+    assert body["sessions"][0]["session_id"] in svc.sessions
+    assert svc.llm.warmup.calls == 0
+
+def test_bulk_start_limits(client, monkeypatch):
+    """Тест: пустой список — 422, сверх api_bulk_start_max_items — 413"""
+    monkeypatch.setattr(settings, "api_bulk_start_max_items", 2)
+
+    assert client.post("/sessions/start:bulk", json={"deal_ids": []}).status_code == 422
+    assert client.post("/sessions/start:bulk", json={"deal_ids": ["a", "b", "c"]}).status_code == 413
+
+def test_bulk_start_single_inflight_prewarm(svc, client):
+    """Тест: повторные start:bulk во время прогрева не запускают новые; после завершения — снова можно"""
+    for _ in range(5):
+        assert client.post("/sessions/start:bulk", json={"deal_ids": ["D-1"]}).status_code == 200
+    assert svc.llm.warmup.calls == 1
+    assert svc.prewarm() is False
+
+    svc.llm.warmup.release.set()
+    svc._prewarm_thread.join(2)
+    assert svc.prewarm(background=False) is True
+    assert svc.llm.warmup.calls == 2
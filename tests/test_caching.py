@@ -0,0 +1,50 @@
+from starlette.requests import Request
+from app.api.caching import session_etag, etag_matches, not_modified
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_etag_matches():
+    """Тест сравнения If-None-Match с ETag версии"""
+    etag = session_etag("s1", 3)
+    assert etag_matches(make_request(etag), etag)
+    assert etag_matches(make_request(f'"s1.2", W/{etag}'), etag)
+    assert etag_matches(make_request("*"), etag)
+    assert not etag_matches(make_request('"s1.2"'), etag)
+    assert not etag_matches(make_request(), etag)
+
+def test_not_modified_response():
+    """Тест 304 с заголовками кэширования"""
+    etag = session_etag("s1", 0)
+    response = not_modified(make_request(etag), etag)
+    
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert "must-revalidate" in response.headers["cache-control"]
+    assert response.headers["cache-control"].startswith("private")
+    assert not_modified(make_request('"s1.1"'), etag) is None
+
+def test_etag_differs_by_projection():
+    """Тест: разные ?fields= одной версии — разные ETag, 304 только для той же выборки"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.deps import provide_service
+    from app.api.routers import results
+    from app.services.bant_agent import BantAgentService
+    
+    app = FastAPI()
+    app.include_router(results.router)
+    svc = BantAgentService()
+    app.dependency_overrides[provide_service] = lambda: svc
+    session_id = svc.start("D-1").session_id
+    client = TestClient(app)
+    
+    budget = client.get(f"/results/{session_id}", params={"fields": "record.budget"})
+    filled = client.get(f"/results/{session_id}", params={"fields": "filled"})
+    assert budget.headers["etag"] != filled.headers["etag"]
+    assert budget.headers["etag"] != client.get(f"/results/{session_id}").headers["etag"]
+    
+    revalidate = {"If-None-Match": budget.headers["etag"]}
+    assert client.get(f"/results/{session_id}", params={"fields": "record.budget"}, headers=revalidate).status_code == 304
+    assert client.get(f"/results/{session_id}", params={"fields": "filled"}, headers=revalidate).status_code == 200
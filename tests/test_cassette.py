@@ -0,0 +1,99 @@
+import json
+import time
+import pytest
+from app.core.cassette import Cassette, CassetteMiss, fingerprint
+from app.core.llm import GigaChatClient
+
+class _Resp:
+    status_code = 200
+    
+    def __init__(self, content):
+        self._content = content
+    
+    def raise_for_status(self):
+        pass
+    
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}], "usage": {"prompt_tokens": 7, "completion_tokens": 3}}
+
+def _recording_client(path, contents):
+    client = GigaChatClient(cassette=Cassette(path, mode="record"))
+    client._token, client._exp_ts = "t", 1e12  # без OAuth
+    replies = iter(contents)
+    client._http.post = lambda *a, **kw: _Resp(next(replies))
+    return client
+
+MSGS = [{"role": "system", "content": "схема"}, {"role": "user", "content": "Бюджет есть"}]
+
+def test_record_then_replay_offline(tmp_path, monkeypatch):
+    """Тест: записанные ответы воспроизводятся без сети и ключа, по порядку для одинаковых запросов"""
+    path = str(tmp_path / "llm.jsonl.gz")
+    rec = _recording_client(path, ['{"a": 1}', '{"a": 2}', '{"b": 1}'])
+    rec.chat(MSGS, json_mode=True)
+    rec.chat(MSGS, json_mode=True)
+    rec.chat(MSGS)
+    
+    monkeypatch.delenv("GIGACHAT_AUTH_KEY", raising=False)
+    client = GigaChatClient(cassette=Cassette(path, mode="replay"))
+    client._http.post = lambda *a, **kw: pytest.fail("network call in replay")
+    assert client.chat(MSGS) == '{"b": 1}'
+    assert client.chat(MSGS, json_mode=True) == '{"a": 1}'
+    assert client.chat(MSGS, json_mode=True) == '{"a": 2}'
+    assert client.chat(MSGS, json_mode=True) == '{"a": 2}'  # после последнего — последний
+    assert client.last_usage == {"prompt_tokens": 7, "completion_tokens": 3}
+    assert client.warmup() is True
+    
+    with pytest.raises(CassetteMiss):
+        client.chat([{"role": "user", "content": "другой запрос"}])
+
+def test_fingerprint_ignores_only_irrelevant_fields():
+    """Тест: отпечаток зависит от сообщений и параметров генерации"""
+    base = {"model": "m", "messages": MSGS, "temperature": 0.2, "max_tokens": 1024}
+    assert fingerprint(base) == fingerprint({**base, "stream": False})
+    assert fingerprint(base) != fingerprint({**base, "temperature": 0.5})
+    assert fingerprint(base) != fingerprint({**base, "response_format": {"type": "json_object"}})
+
+def test_replay_reproduces_latency(tmp_path):
+    """Тест: latency=real выдерживает записанную задержку, zero — нет"""
+    path = str(tmp_path / "llm.jsonl")
+    payload = {"model": "m", "messages": MSGS}
+    Cassette(path, mode="record").record(payload, "{}", None, 0.05)
+    
+    for latency, expected in (("zero", 0.0), ("real", 0.05)):
+        cassette = Cassette(path, latency=latency)
+        started = time.perf_counter()
+        cassette.play(payload)
+        assert expected <= time.perf_counter() - started < expected + 0.04
+
+def test_process_answer_replays_for_new_session(tmp_path, monkeypatch):
+    """Тест: прогон process_answer, записанный в кассету, воспроизводится на новой сессии (другие время и сделка)"""
+    from app.core.flow import BantFlow
+    from app.core.prompts import FOLLOWUP_GEN_PROMPT, SCORING_PROMPT
+    from app.core.schema import BantRecord, SessionState
+    
+    slot = {"value": 60, "confidence": 0.7}
+    replies = {
+        SCORING_PROMPT: '{"budget": %s, "authority": %s, "need": %s, "timing": %s, "total": 60, "stage": "qualified"}'
+                        % ((json.dumps(slot),) * 4),
+        FOLLOWUP_GEN_PROMPT: '{"followups": {"authority": ["Кто принимает решение?"]}}',
+    }
+    extract = '{"budget": {"have_budget": true, "amount_min": 500000, "currency": "RUB"}}'
+    path = str(tmp_path / "flow.jsonl")
+    rec = GigaChatClient(cassette=Cassette(path, mode="record"))
+    rec._token, rec._exp_ts = "t", 1e12
+    rec._http.post = lambda *a, **kw: _Resp(replies.get(kw["json"]["messages"][0]["content"], extract))
+    
+    def run(client, deal_id):
+        state = SessionState(session_id=f"s-{deal_id}", deal_id=deal_id, record=BantRecord(deal_id=deal_id),
+                             current_slot="budget")
+        st, next_q, followups = BantFlow(client).process_answer(state, "Бюджет есть, около 500 тысяч рублей")
+        return st.record.model_dump(exclude={"updated_at", "deal_id"}), next_q, followups
+    
+    recorded = run(rec, "D-1")
+    time.sleep(0.01)  # у новой записи другой updated_at
+    
+    monkeypatch.delenv("GIGACHAT_AUTH_KEY", raising=False)
+    client = GigaChatClient(cassette=Cassette(path, mode="replay"))
+    client._http.post = lambda *a, **kw: pytest.fail("network call in replay")
+    assert run(client, "D-2") == recorded
+    assert recorded[1] == "Кто принимает решение?"
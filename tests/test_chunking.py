@@ -0,0 +1,39 @@
+from app.core.chunking import split_transcript, reduce_payloads
+
+def test_split_transcript_speaker_boundaries():
+    """Тест нарезки по репликам спикеров"""
+    text = "\n".join(f"Спикер {i % 2}: реплика номер {i}. Еще предложение." for i in range(50))
+    chunks = list(split_transcript(text, max_chars=200))
+    
+    assert len(chunks) > 1
+    assert all(len(c) <= 200 for c in chunks)
+    # Реплики не режутся посередине
+    assert all(c.startswith("Спикер") for c in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+def test_split_transcript_long_sentence():
+    """Тест нарезки единицы длиннее лимита по предложениям и пробелам"""
+    text = "Первое предложение. " + "слово " * 100
+    chunks = list(split_transcript(text, max_chars=120))
+    
+    assert all(len(c) <= 120 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_split_transcript_short():
+    """Тест короткого текста — один кусок"""
+    assert list(split_transcript("Бюджет 100 тысяч", max_chars=100)) == ["Бюджет 100 тысяч"]
+
+def test_reduce_payloads_rules():
+    """Тест детерминированной свертки: последнее значение, объединение списков"""
+    result = reduce_payloads([
+        {"budget": {"have_budget": True, "amount_min": 100000}, "need": {"pain_points": []}},
+        {"budget": {"amount_min": 200000, "comment": None}, "need": {"pain_points": ["Excel", "Ошибки"]}},
+        {"budget": {"amount_min": None}, "need": {"pain_points": ["excel", "Нет отчетов"]}},
+    ])
+    
+    assert result["budget"] == {"have_budget": True, "amount_min": 200000}
+    assert result["need"]["pain_points"] == ["Excel", "Ошибки", "Нет отчетов"]
+
+def test_reduce_payloads_keeps_explicit_empty_list():
+    """Тест: явный пустой список сохраняется, если других значений нет"""
+    assert reduce_payloads([{"need": {"pain_points": []}}, {"need": {}}]) == {"need": {"pain_points": []}}
@@ -0,0 +1,50 @@
+import time
+from app.core.schema import BantRecord, BantScore, SessionState
+from app.services.dashboard import DashboardIndex
+
+def _state(i, filled="partial", stage=None):
+    st = SessionState(session_id=f"s{i}", deal_id=f"DEAL-{i:05d}", record=BantRecord(deal_id=f"DEAL-{i:05d}", filled=filled))
+    if stage:
+        st.record.score = BantScore(**{"budget": {"value": 20, "confidence": 0.8}, "authority": {"value": 20, "confidence": 0.8},
+                           "need": {"value": 20, "confidence": 0.8}, "timing": {"value": 20, "confidence": 0.8},
+                           "total": 80, "stage": stage})
+    return st
+
+def test_page_newest_first_and_move_on_update():
+    """Тест: страницы идут от последних изменений, обновленная сессия поднимается наверх"""
+    index = DashboardIndex()
+    states = [_state(i) for i in range(5)]
+    index.update(*states)
+    assert [r["session_id"] for r in index.page(limit=2)["rows"]] == ["s4", "s3"]
+    assert [r["session_id"] for r in index.page(offset=4, limit=2)["rows"]] == ["s0"]
+    
+    states[1].record.filled = "full"
+    index.update(states[1])
+    page = index.page(limit=1)
+    assert page["rows"][0]["session_id"] == "s1" and page["rows"][0]["filled"] == "full"
+    assert page["total"] == 5
+    assert page["counts"]["filled"] == {"partial": 4, "full": 1}
+
+def test_filters_and_incremental_counts():
+    """Тест: фильтры по stage/filled/deal, счетчики без пересчета"""
+    index = DashboardIndex()
+    index.update(_state(1, "full", "ready"), _state(2, "partial", "qualified"), _state(3), _state(12, "full", "ready"))
+    
+    page = index.page(stage="ready", limit=1)
+    assert page["total"] == 2 and [r["deal_id"] for r in page["rows"]] == ["DEAL-00012"]
+    assert index.page(stage="unscored")["total"] == 1
+    assert index.page(filled="full", deal="0001")["total"] == 2
+    assert index.page()["counts"]["stage"] == {"ready": 2, "qualified": 1, "unscored": 1}
+    
+    index.remove("s1")
+    assert index.page()["counts"]["stage"] == {"ready": 1, "qualified": 1, "unscored": 1}
+
+def test_page_fast_on_many_sessions():
+    """Тест: страница по 20 000 сессий без фильтра — срез, с фильтром — один проход"""
+    index = DashboardIndex()
+    index.update(*[_state(i, "full" if i % 10 == 0 else "partial") for i in range(20_000)])
+    
+    started = time.perf_counter()
+    assert index.page(offset=100, limit=50)["rows"][0]["session_id"] == "s19899"
+    assert index.page(filled="full", limit=50)["total"] == 2_000
+    assert time.perf_counter() - started < 0.5
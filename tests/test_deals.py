@@ -0,0 +1,79 @@
+from app.core.schema import BantRecord, SessionState
+from app.services.deals import DealIndex
+
+def _state(sid, deal="DEAL-1", version=1):
+    return SessionState(session_id=sid, deal_id=deal, record=BantRecord(deal_id=deal), version=version)
+
+def test_deal_merges_latest_values_across_sessions():
+    """Тест: свежие непустые значения перекрывают старые, пустые не затирают"""
+    index = DealIndex()
+    a, b, other = _state("a"), _state("b"), _state("c", deal="DEAL-2")
+    a.record.budget.have_budget = True
+    a.record.budget.amount_max = 1_000_000
+    a.record.authority.decision_maker = "CFO"
+    index.update(a, other)
+    b.record.budget.amount_max = 2_000_000
+    b.record.need.pain_points = ["ручной учет"]
+    index.update(b)
+    
+    deal = index.get("DEAL-1")
+    assert deal["record"]["budget"]["have_budget"] is True
+    assert deal["record"]["budget"]["amount_max"] == 2_000_000
+    assert deal["record"]["authority"]["decision_maker"] == "CFO"
+    assert deal["record"]["need"]["pain_points"] == ["ручной учет"]
+    assert deal["sources"]["authority"]["decision_maker"] == "a"
+    assert deal["sources"]["budget"]["amount_max"] == "b"
+    assert [s["session_id"] for s in deal["sessions"]] == ["b", "a"]
+    assert index.session_ids("DEAL-2") == ["c"]
+    assert index.get("DEAL-404") is None
+
+def test_incremental_update_matches_refold():
+    """Тест: повторное изменение старой сессии делает ее значения свежими, как при полной свертке"""
+    index = DealIndex()
+    a, b = _state("a"), _state("b")
+    a.record.authority.decision_maker = "CFO"
+    index.update(a)
+    b.record.authority.decision_maker = "CEO"
+    index.update(b)
+    assert index.get("DEAL-1")["record"]["authority"]["decision_maker"] == "CEO"
+    
+    a.record.timing.timeframe = "this_quarter"
+    index.update(a)
+    deal = index.get("DEAL-1")
+    assert deal["record"]["authority"]["decision_maker"] == "CFO"
+    assert deal["record"]["timing"]["timeframe"] == "this_quarter"
+    
+    index._deals["DEAL-1"].refold()
+    assert index.get("DEAL-1") == deal
+    
+    index.remove("a")
+    assert index.get("DEAL-1")["record"]["authority"]["decision_maker"] == "CEO"
+    assert index.get("DEAL-1")["record"]["timing"]["timeframe"] is None
+    index.remove("b")
+    assert index.get("DEAL-1") is None
+
+def test_new_empty_session_does_not_override_deal():
+    """Тест: новая сессия сделки (значения по умолчанию, version 0) не перекрывает собранные значения"""
+    from app.services.bant_agent import BantAgentService
+    svc = BantAgentService()
+    first = svc.start("DEAL-1")
+    first.record.budget.currency = "USD"
+    first.record.budget.amount_min = 100.0
+    first.version = 1
+    svc.deals.update(first)
+    
+    second = svc.start("DEAL-1")
+    deal = svc.get_deal("DEAL-1")
+    
+    assert deal["record"]["budget"]["currency"] == "USD"
+    assert deal["sources"]["budget"] == {"currency": first.session_id, "amount_min": first.session_id}
+    assert deal["record"]["authority"]["decision_maker"] is None
+    assert [s["session_id"] for s in deal["sessions"]] == [second.session_id, first.session_id]
+    
+    # Ответ без валюты не возвращает RUB по умолчанию поверх USD
+    second.record.need.pain_points = ["Excel"]
+    second.version = 1
+    svc.deals.update(second)
+    deal = svc.get_deal("DEAL-1")
+    assert deal["record"]["budget"]["currency"] == "USD"
+    assert deal["sources"]["need"]["pain_points"] == second.session_id
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.core.schema import BantRecord, BantScore, SessionState
+from app.services.export import COLUMNS, ParquetUnavailable, csv_chunks, iter_rows, ndjson_chunks, parse_timestamp, write_parquet
+from app.services.storage import JSONStorage
+
+T0 = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+def _storage(tmp_path, n=30):
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    sessions = []
+    for i in range(n):
+        record = BantRecord(deal_id=f"D-{i}", updated_at=T0 + timedelta(days=i),
+                            need={"pain_points": ["учет", f"боль {i}"]}, budget={"have_budget": True, "amount_max": 1000.0 * i})
+        if i % 2:
+            record.score = BantScore(**{s: {"value": 10, "confidence": 0.5} for s in ("budget", "authority", "need", "timing")},
+                                     total=40, stage="unqualified")
+        sessions.append(SessionState(session_id=f"s{i}", deal_id=f"D-{i}", record=record, version=i))
+    storage.save_sessions(sessions)
+    return storage
+
+def test_iter_sessions_matches_full_load(tmp_path):
+    """Тест: потоковый обход хранилища совпадает с полной загрузкой при любом размере чтения"""
+    storage = _storage(tmp_path)
+    full = storage.load_all_sessions()
+    for read_size in (1, 13, 4096):
+        assert dict(storage.iter_sessions(read_size=read_size)) == full
+    assert list(JSONStorage(str(tmp_path / "missing.json")).iter_sessions()) == []
+
+def test_flat_rows_and_updated_since(tmp_path):
+    """Тест: плоские строки со скорингом, фильтр updated_since"""
+    storage = _storage(tmp_path)
+    rows = list(iter_rows(storage.iter_sessions(), parse_timestamp("2026-10-26T00:00:00")))
+    
+    assert [r["session_id"] for r in rows] == ["s25", "s26", "s27", "s28", "s29"]
+    assert list(rows[0]) == COLUMNS
+    assert rows[0]["need.pain_points"] == ["учет", "боль 25"]
+    assert rows[0]["score.total"] == 40 and rows[1]["score.total"] is None
+    assert rows[0]["budget.amount_max"] == 25000.0
+
+def test_ndjson_and_csv_chunks(tmp_path):
+    """Тест: NDJSON и CSV пачками, заголовок CSV один раз, списки склеены"""
+    storage = _storage(tmp_path)
+    chunks = list(ndjson_chunks(iter_rows(storage.iter_sessions()), chunk_rows=7))
+    assert len(chunks) == 5
+    lines = b"".join(chunks).decode().splitlines()
+    assert len(lines) == 30 and json.loads(lines[3])["deal_id"] == "D-3"
+    
+    text = b"".join(csv_chunks(iter_rows(storage.iter_sessions()), chunk_rows=7)).decode()
+    parsed = list(csv.DictReader(io.StringIO(text)))
+    assert len(parsed) == 30
+    assert parsed[2]["need.pain_points"] == "учет; боль 2"
+
+def test_parquet_export(tmp_path):
+    """Тест: Parquet с типизированной схемой (если установлен pyarrow)"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    storage = _storage(tmp_path)
+    path = str(tmp_path / "out.parquet")
+    
+    assert write_parquet(iter_rows(storage.iter_sessions()), path, chunk_rows=10) == 30
+    table = pq.read_table(path)
+    assert table.num_rows == 30 and table.column_names == COLUMNS
+
+@pytest.mark.parametrize("error, status", [
+    (ValueError("bad row"), 500),
+    (RuntimeError("disk full"), 500),
+    (ParquetUnavailable("Parquet export requires pyarrow"), 501),
+])
+def test_parquet_endpoint_removes_temp_file_on_error(tmp_path, monkeypatch, error, status):
+    """Тест: при любой ошибке записи Parquet временный файл удаляется; 501 — только без pyarrow"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.deps import provide_service
+    from app.api.routers import export as export_router
+    from app.services.bant_agent import BantAgentService
+    
+    app = FastAPI()
+    app.include_router(export_router.router)
+    svc = BantAgentService(storage=_storage(tmp_path, n=3))
+    app.dependency_overrides[provide_service] = lambda: svc
+    monkeypatch.setattr(export_router.tempfile, "tempdir", str(tmp_path))
+    
+    def broken(rows, sink, chunk_rows):
+        raise error
+    monkeypatch.setattr(export_router, "write_parquet", broken)
+    
+    resp = TestClient(app, raise_server_exceptions=False).get("/export", params={"format": "parquet"})
+    assert resp.status_code == status
+    assert not list(tmp_path.glob("*.parquet"))
@@ -0,0 +1,84 @@
+import socket
+import threading
+import time
+import pytest
+import requests
+import uvicorn
+from fastapi.testclient import TestClient
+from benchmarks.fake_gigachat import FakeConfig, classify_prompt, create_app, parse_latency
+from app.core.llm import GigaChatClient
+from app.core.prompts import SCORING_PROMPT, SLOT_SCHEMA_HINTS
+
+def _token(client: TestClient) -> str:
+    return client.post("/api/v2/oauth", headers={"Authorization": "Basic fake"}).json()["access_token"]
+
+def test_classify_prompt_by_system_message():
+    """Тест: тип промпта определяется по системному сообщению"""
+    assert classify_prompt([{"role": "system", "content": SCORING_PROMPT}]) == "scoring"
+    assert classify_prompt([{"role": "system", "content": SLOT_SCHEMA_HINTS["need"]}]) == "extract_need"
+    assert classify_prompt([{"role": "user", "content": "привет"}]) == "default"
+
+def test_fixtures_round_robin_and_raw_strings():
+    """Тест: фикстуры по кругу, строки отдаются как есть"""
+    client = TestClient(create_app(FakeConfig(fixtures={"scoring": [{"total": 1}, "{broken"]})))
+    headers = {"Authorization": f"Bearer {_token(client)}"}
+    body = {"messages": [{"role": "system", "content": SCORING_PROMPT}]}
+    
+    contents = [
+        client.post("/api/v1/chat/completions", json=body, headers=headers).json()["choices"][0]["message"]["content"]
+        for _ in range(3)
+    ]
+    assert contents == ['{"total": 1}', "{broken", '{"total": 1}']
+    assert client.get("/__stats").json()["calls"]["scoring"] == 3
+
+def test_error_injection_and_expiry():
+    """Тест: инъекция 429 и 401 на истекшем токене"""
+    client = TestClient(create_app(FakeConfig(error_429=1.0, token_ttl=0.05)))
+    token = _token(client)
+    body = {"messages": [{"role": "user", "content": "x"}]}
+    
+    resp = client.post("/api/v1/chat/completions", json=body, headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+    time.sleep(0.06)
+    resp = client.post("/api/v1/chat/completions", json=body, headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 401
+
+def test_parse_latency_specs():
+    """Тест: спецификации распределений задержки"""
+    import random
+    rnd = random.Random(1)
+    assert parse_latency("fixed:250")(rnd) == 0.25
+    assert 0.1 <= parse_latency("uniform:100:200")(rnd) <= 0.2
+    with pytest.raises(ValueError):
+        parse_latency("poisson:3")
+
+def test_gigachat_client_against_fake_server(monkeypatch):
+    """Тест: GigaChatClient работает с фейком и переполучает токен после истечения"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(FakeConfig.from_file(token_ttl=30)), port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        deadline = time.time() + 5
+        while not server.started and time.time() < deadline:
+            time.sleep(0.01)
+        monkeypatch.setenv("GIGACHAT_AUTH_KEY", "fake")
+        client = GigaChatClient(
+            auth_url=f"http://127.0.0.1:{port}/api/v2/oauth",
+            api_url=f"http://127.0.0.1:{port}/api/v1",
+            verify_ssl=False,
+        )
+        
+        content = client.chat([{"role": "system", "content": SCORING_PROMPT}, {"role": "user", "content": "{}"}], json_mode=True)
+        assert '"stage"' in content
+        assert client.last_usage["prompt_tokens"] > 0
+        # токен живет 30 с, а клиент обновляет его за 30 с до истечения — т.е. перед каждым вызовом
+        client.chat([{"role": "user", "content": "x"}])
+        stats = requests.get(f"http://127.0.0.1:{port}/__stats").json()
+        assert stats["tokens_issued"] == 2
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
@@ -185,7 +185,7 @@ def test_heuristic_score_budget():
     # Явно указано, что бюджета нет
     record.budget.have_budget = False
     score = flow._heuristic_score(record)
-    assert score.budget.value == 2  # have_budget is False - есть информация, но бюджета нет
+    assert score.budget.value == 8  # have_budget is False - явный ответ "бюджета нет" тоже валиден
     
     # Бюджет без суммы
     record.budget.have_budget = True
@@ -213,7 +213,7 @@ def test_heuristic_score_authority():
     # Только ЛПР
     record.authority.decision_maker = "Иван Иванов"
     score = flow._heuristic_score(record)
-    assert score.authority.value == 5
+    assert score.authority.value == 12
     
     # ЛПР + стейкхолдеры
     record.authority.stakeholders = ["Петр Петров"]
@@ -239,7 +239,7 @@ def test_heuristic_score_need():
     # Частично заполненная потребность
     record.need.pain_points = ["Проблема"]
     score = flow._heuristic_score(record)
-    assert score.need.value == 8
+    assert score.need.value == 12
     
     # Полностью заполненная потребность
     record.need.pain_points = ["Проблема 1", "Проблема 2"]
@@ -294,7 +294,8 @@ def test_heuristic_followups():
         stage="unqualified"
     )
     
-    followups = flow._heuristic_followups(score)
+    # Пустая запись: вопросы задаются только по незаполненным полям
+    followups = flow._heuristic_followups(score, BantRecord(deal_id="DEAL-001"))
     
     # Должны быть followup для слотов с низким score (максимум 2)
     assert len(followups) == 2
@@ -335,3 +336,141 @@ def test_process_answer_with_scoring(mock_validate, mock_parse):
     # Проверяем, что данные были обновлены
     assert new_state.record.budget.have_budget is True
     assert new_state.record.budget.amount_min == 100000
+
+def test_process_answer_repairs_json_without_refine():
+    """Тест: дефектный JSON чинится локально, без повторных вызовов LLM"""
+    from app.core.stats import STATS
+    llm = MockLLM([
+        '{"budget": {"have_budget": true, // есть\n "amount_min": "500 тыс", "currency": "руб",},',
+    ])
+    flow = BantFlow(llm)
+    state = SessionState(session_id="session-123", deal_id="DEAL-001", record=BantRecord(deal_id="DEAL-001"))
+    refines_before = STATS.get("refine_calls")
+    
+    new_state, _, _ = flow.process_answer(state, "Бюджет 500 тысяч рублей")
+    
+    assert new_state.record.budget.have_budget is True
+    assert new_state.record.budget.amount_min == 500000
+    assert STATS.get("refine_calls") == refines_before
+    assert llm.call_count == 1  # только извлечение; скоринг и followups ушли в fallback
+
+class SlotLLM:
+    """Отвечает по слоту из компактного промпта с задержкой; потокобезопасна"""
+    def __init__(self, delay=0.1):
+        import threading
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+    
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        import time
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            system = messages[0]["content"]
+            if 'секцию "budget"' in system:
+                return '{"budget": {"have_budget": true, "amount_min": 500000}, "timing": {"timeframe": "this_year"}}'
+            if 'секцию "authority"' in system:
+                return '{"authority": {"decision_maker": "CEO"}}'
+            if 'секцию "need"' in system:
+                return 'не JSON'
+            if 'секцию "timing"' in system:
+                return '{"timing": {"timeframe": "this_quarter"}}'
+            return "{}"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def test_process_answer_fanout():
+    """Тест параллельного извлечения по слотам для длинного ответа"""
+    import time
+    llm = SlotLLM(delay=0.1)
+    flow = BantFlow(llm, fanout=True, fanout_min_chars=10, max_concurrency=4)
+    state = SessionState(session_id="session-123", deal_id="DEAL-001", record=BantRecord(deal_id="DEAL-001"))
+    
+    started = time.perf_counter()
+    data = flow._extract_fanout("Длинное саммари встречи по всем темам")
+    elapsed = time.perf_counter() - started
+    
+    # Слоты берутся только из своих вызовов; сломанный слот не мешает остальным
+    assert data == {
+        "budget": {"have_budget": True, "amount_min": 500000},
+        "authority": {"decision_maker": "CEO"},
+        "timing": {"timeframe": "this_quarter"},
+    }
+    assert llm.max_active == 4
+    assert elapsed < 0.3
+    
+    new_state, _, _ = flow.process_answer(state, "Длинное саммари встречи по всем темам")
+    assert new_state.record.budget.amount_min == 500000
+    assert new_state.record.authority.decision_maker == "CEO"
+    assert new_state.record.timing.timeframe == "this_quarter"
+
+def test_fanout_respects_concurrency_bound():
+    """Тест ограничения числа одновременных вызовов"""
+    llm = SlotLLM(delay=0.05)
+    flow = BantFlow(llm, fanout=True, fanout_min_chars=10, max_concurrency=2)
+    
+    flow._extract_fanout("Длинное саммари встречи по всем темам")
+    
+    assert llm.max_active == 2
+
+def test_fanout_of_concurrent_requests_does_not_queue():
+    """Тест: fan-out параллельных запросов идет одновременно, каждый в пределах своего лимита"""
+    import threading
+    import time
+    llm = SlotLLM(delay=0.1)
+    flow = BantFlow(llm, fanout=True, fanout_min_chars=10, max_concurrency=2, concurrent_requests=3)
+    
+    threads = [threading.Thread(target=flow._extract_fanout, args=("Длинное саммари встречи по всем темам",))
+               for _ in range(3)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    # 3 запроса × 2 вызова одновременно; на пуле из max_concurrency потоков было бы 2 и втрое дольше
+    assert llm.max_active == 6
+    assert time.perf_counter() - started < 0.35
+
+def test_process_answer_chunked_transcript():
+    """Тест map-reduce извлечения для длинного транскрипта"""
+    import threading
+    
+    class ChunkLLM:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.extract_calls = 0
+        
+        def chat(self, messages, temperature=0.2, json_mode=False):
+            text = messages[-1]["content"]
+            if messages[0]["content"] != SCHEMA_HINT:
+                return "{}"
+            with self.lock:
+                self.extract_calls += 1
+            if "бюджет" in text:
+                return '{"budget": {"have_budget": true, "amount_min": 300000}, "need": {"pain_points": ["Excel"]}}'
+            if "решает" in text:
+                return '{"authority": {"decision_maker": "CFO"}, "need": {"pain_points": ["excel", "Ошибки"]}}'
+            return "{}"
+    
+    from app.core.prompts import SCHEMA_HINT
+    transcript = "\n".join(
+        ["Менеджер: у клиента есть бюджет 300 тысяч."] +
+        [f"Клиент: обсуждаем детали {i}." for i in range(40)] +
+        ["Менеджер: решает финансовый директор."]
+    )
+    llm = ChunkLLM()
+    flow = BantFlow(llm, chunk_chars=200, max_concurrency=2)
+    state = SessionState(session_id="session-123", deal_id="DEAL-001", record=BantRecord(deal_id="DEAL-001"))
+    
+    new_state, _, _ = flow.process_answer(state, transcript)
+    
+    assert llm.extract_calls > 2
+    assert new_state.record.budget.amount_min == 300000
+    assert new_state.record.authority.decision_maker == "CFO"
+    assert new_state.record.need.pain_points == ["Excel", "Ошибки"]
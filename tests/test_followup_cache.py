@@ -0,0 +1,81 @@
+from unittest.mock import patch
+from app.core.flow import BantFlow
+from app.core.followup_cache import FollowupCache, missing_signature
+from app.core.schema import BantRecord, Budget, Authority, SessionState, SlotScore, BantScore
+
+class CountingLLM:
+    def __init__(self, response):
+        self.response = response
+        self.call_count = 0
+    
+    def chat(self, messages, temperature=0.2, json_mode=False):
+        self.call_count += 1
+        return self.response
+
+def make_score(total=20, stage="unqualified"):
+    slot = SlotScore(value=5, confidence=0.5)
+    return BantScore(budget=slot, authority=slot, need=slot, timing=slot, total=total, stage=stage)
+
+def test_missing_signature():
+    """Тест сигнатуры незаполненных полей по слотам"""
+    record = BantRecord(deal_id="DEAL-001")
+    record.authority = Authority(decision_maker="CEO", stakeholders=[])
+    
+    signature = missing_signature(record)
+    
+    assert signature[0] == ("have_budget", "amount_min", "amount_max", "comment")
+    assert signature[1] == ("stakeholders", "decision_process", "risks")
+
+def test_llm_followups_not_cached():
+    """Тест: вопросы LLM привязаны к сделке и не переиспользуются для другой с тем же шаблоном пробелов"""
+    llm = CountingLLM('{"followups": {"authority": ["Кто еще участвует в согласовании, кроме CEO?"]}}')
+    flow = BantFlow(llm, followup_cache=FollowupCache())
+    record = BantRecord(deal_id="DEAL-001")
+    record.authority = Authority(decision_maker="CEO")
+    other = BantRecord(deal_id="DEAL-002")
+    other.authority = Authority(decision_maker="Финдиректор")
+    
+    flow.generate_followups(record, make_score())
+    flow.generate_followups(other, make_score())
+    
+    assert llm.call_count == 2
+    assert flow.followup_cache.stats()["size"] == 0
+
+def test_cache_eviction():
+    """Тест LRU-вытеснения"""
+    cache = FollowupCache(max_size=2)
+    budgets = [Budget(), Budget(have_budget=True), Budget(have_budget=True, amount_min=1)]
+    records = [BantRecord(deal_id="D", budget=budget) for budget in budgets]
+    for i, record in enumerate(records):
+        cache.put(record, [f"Q{i}"])
+    
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert cache.get(records[0]) is None
+
+def test_seed_heuristic():
+    """Тест предзаполнения кэша эвристическими вопросами"""
+    flow = BantFlow(CountingLLM("{}"))
+    cache = FollowupCache()
+    
+    assert cache.seed_heuristic(flow) == 81
+    # Пустая запись попадает в предзаполненный шаблон
+    record = BantRecord(deal_id="DEAL-001")
+    score = flow._heuristic_score(record)
+    assert cache.get(record) == flow._heuristic_followups(score, record)
+
+def test_seeded_followups_hit_on_answer():
+    """Тест: при ответе с LLM-скорингом шаблон пробелов попадает в предзаполненный кэш, LLM для вопросов не зовется"""
+    llm = CountingLLM(make_score(total=60, stage="qualified").model_dump_json())
+    flow = BantFlow(llm, followup_cache=FollowupCache())
+    flow.followup_cache.seed_heuristic(flow)
+    state = SessionState(session_id="s-1", deal_id="DEAL-001", record=BantRecord(deal_id="DEAL-001"))
+    
+    with patch("app.core.flow.parse_bant_with_llm", return_value={"budget": {"have_budget": True}}):
+        _, question, followups = flow.process_answer(state, "Бюджет есть")
+    
+    assert llm.call_count == 1  # только скоринг
+    assert followups == ["Кто у клиента принимает финальное решение?", "Какие основные проблемы у заказчика?"]
+    assert question == followups[0]
+    assert flow.followup_cache.stats()["hits"] == 1
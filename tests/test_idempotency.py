@@ -0,0 +1,65 @@
+import threading
+import time
+import pytest
+from app.services.idempotency import IdempotencyStore, IdempotencyConflict
+
+def test_idempotency_replays_completed():
+    """Тест: повтор после завершения получает сохраненный ответ без пересчета"""
+    store = IdempotencyStore()
+    calls = []
+    compute = lambda: calls.append(1) or {"n": len(calls)}
+    
+    first = store.run("s1:k", "fp", compute)
+    second = store.run("s1:k", "fp", compute)
+    
+    assert first == ({"n": 1}, False)
+    assert second == ({"n": 1}, True)
+    assert len(calls) == 1
+
+def test_idempotency_coalesces_in_flight():
+    """Тест: повторы во время выполнения ждут тот же результат"""
+    store = IdempotencyStore()
+    calls = []
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"ok": True}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.run("s1:k", "fp", compute))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True]
+    assert store.stats()["coalesced"] == 3
+
+def test_idempotency_conflict():
+    """Тест: тот же ключ с другим телом запроса"""
+    store = IdempotencyStore()
+    store.run("s1:k", "fp-1", lambda: {})
+    
+    with pytest.raises(IdempotencyConflict):
+        store.run("s1:k", "fp-2", lambda: {})
+
+def test_idempotency_errors_not_cached():
+    """Тест: ошибка не сохраняется, повтор выполняется заново"""
+    store = IdempotencyStore()
+    def fail():
+        raise ValueError("Session not found")
+    
+    with pytest.raises(ValueError):
+        store.run("s1:k", "fp", fail)
+    assert store.run("s1:k", "fp", lambda: {"ok": True}) == ({"ok": True}, False)
+
+def test_idempotency_ttl_and_size_bound():
+    """Тест вытеснения по TTL и размеру"""
+    store = IdempotencyStore(ttl_sec=0.05, max_size=2)
+    for i in range(3):
+        store.run(f"k{i}", "fp", lambda: {})
+    assert store.stats()["stored"] == 2
+    
+    time.sleep(0.06)
+    store.run("k3", "fp", lambda: {})
+    assert store.stats()["stored"] == 1
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from app.services.jobs import JobManager, JobQueueFull
+
+def _wait(manager, job_id, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.status in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+def test_job_succeeds_and_is_pollable():
+    """Тест: задача выполняется в фоне, результат доступен по id"""
+    manager = JobManager(workers=2)
+    job = manager.submit("s1", lambda: {"ok": True})
+    
+    done = _wait(manager, job.job_id)
+    assert done.result == {"ok": True}
+    assert done.finished_at >= done.started_at >= done.created_at
+    assert manager.stats()["succeeded"] == 1
+
+def test_job_failure_maps_status():
+    """Тест: ValueError (нет сессии) — error_status 404, прочие ошибки — 500"""
+    manager = JobManager(workers=1)
+    def missing():
+        raise ValueError("Session not found")
+    def broken():
+        raise RuntimeError("boom")
+    
+    assert _wait(manager, manager.submit("s1", missing).job_id).error_status == 404
+    assert _wait(manager, manager.submit("s1", broken).job_id).error_status == 500
+    assert manager.stats()["failed"] == 2
+
+def test_job_queue_depth_and_limit():
+    """Тест: очередь видна в stats и ограничена max_queued"""
+    manager = JobManager(workers=1, max_queued=2)
+    gate = threading.Event()
+    manager.submit("s1", gate.wait)
+    time.sleep(0.05)
+    manager.submit("s1", lambda: 1)
+    manager.submit("s1", lambda: 2)
+    
+    stats = manager.stats()
+    assert stats["running"] == 1
+    assert stats["queued"] == 2
+    assert stats["oldest_queued_age_sec"] >= 0
+    with pytest.raises(JobQueueFull):
+        manager.submit("s1", lambda: 3)
+    gate.set()
+
+def test_job_retention_is_bounded():
+    """Тест: хранится не больше max_finished завершенных задач"""
+    manager = JobManager(workers=1, max_finished=2)
+    jobs = [manager.submit("s1", lambda: 1) for _ in range(4)]
+    _wait(manager, jobs[-1].job_id)
+    
+    assert manager.get(jobs[0].job_id) is None
+    assert manager.stats()["retained"] == 2
+
+def _webhook_server(received):
+    """Локальный получатель webhook'ов: складывает тела POST'ов в received"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+        def log_message(self, *args):
+            pass
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _wait_webhook(job, timeout=2.0):
+    deadline = time.time() + timeout
+    while job.webhook_status is None and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_job_webhook_delivery():
+    """Тест: завершенная задача POST'ится на настроенный webhook"""
+    received = []
+    server = _webhook_server(received)
+    try:
+        manager = JobManager(workers=1, webhook_url=f"http://127.0.0.1:{server.server_port}/hook")
+        job = manager.submit("s1", lambda: {"ok": True})
+        _wait_webhook(job)
+        
+        assert job.webhook_status == "delivered"
+        assert received[0]["job_id"] == job.job_id
+        assert received[0]["result"] == {"ok": True}
+    finally:
+        server.shutdown()
+
+def test_job_webhook_serializes_dates():
+    """Тест: date/datetime в результате не роняют доставку webhook'а"""
+    received = []
+    server = _webhook_server(received)
+    try:
+        manager = JobManager(workers=1, webhook_url=f"http://127.0.0.1:{server.server_port}/hook")
+        result = {"timing": {"deadline": date(2026, 12, 31)}, "updated_at": datetime(2026, 10, 1, 12, 0)}
+        job = manager.submit("s1", lambda: result)
+        _wait_webhook(job)
+        
+        assert job.webhook_status == "delivered"
+        assert received[0]["result"]["timing"]["deadline"] == "2026-12-31"
+    finally:
+        server.shutdown()
+
+def test_job_webhook_failure_is_recorded():
+    """Тест: недоступный получатель — webhook_status failed, а не None"""
+    manager = JobManager(workers=1, webhook_url="http://127.0.0.1:9/hook", webhook_timeout=0.2, webhook_retries=1)
+    job = manager.submit("s1", lambda: {"ok": True})
+    _wait_webhook(job, timeout=3.0)
+    
+    assert job.webhook_status == "failed"
@@ -0,0 +1,55 @@
+import pytest
+from app.core.json_repair import loads_tolerant, parse_ru_number
+
+def test_loads_tolerant_comments_and_quotes():
+    """Тест удаления комментариев и одинарных кавычек"""
+    text = """```json
+{
+  'budget': {
+    "have_budget": True,   // есть бюджет
+    "currency": 'RUB' /* ISO */
+  },
+}
+```"""
+    assert loads_tolerant(text) == {"budget": {"have_budget": True, "currency": "RUB"}}
+
+def test_loads_tolerant_unclosed_brackets():
+    """Тест закрытия скобок при обрыве вывода"""
+    assert loads_tolerant('{"timing": {"timeframe": "this_month", "next_step":') == {
+        "timing": {"timeframe": "this_month"}
+    }
+
+def test_loads_tolerant_example_ellipsis():
+    """Тест отбрасывания "..." из примера в промпте"""
+    assert loads_tolerant('{"budget": {"have_budget": false}, ...}') == {"budget": {"have_budget": False}}
+
+def test_loads_tolerant_russian_numbers():
+    """Тест русской записи чисел без кавычек"""
+    result = loads_tolerant('{"budget": {"amount_min": 1 500 000, "amount_max": 2,5 млн}}')
+    assert result == {"budget": {"amount_min": 1500000, "amount_max": 2500000}}
+
+def test_loads_tolerant_comma_thousands():
+    """Тест: запятые-разделители тысяч без кавычек не превращают сумму в дробь"""
+    result = loads_tolerant('{"budget": {"amount_min": 1,000,000, "amount_max": 12,345, "rate": 2,5}}')
+    assert result == {"budget": {"amount_min": 1000000, "amount_max": 12345, "rate": 2.5}}
+
+def test_loads_tolerant_no_object():
+    """Тест текста без объекта"""
+    with pytest.raises(ValueError, match="No JSON found"):
+        loads_tolerant("ответа нет")
+
+@pytest.mark.parametrize("text,expected", [
+    ("50к", 50000),
+    ("500 тыс", 500000),
+    ("1 200,50", 1200.5),
+    ("1,000,000", 1000000),
+    ("12,345", 12345),
+    ("12,5", 12.5),
+    ("12,50", 12.5),
+    ("1,5 млн", 1500000),
+    ("1.5e3", 1500.0),
+    ("около ста", None),
+])
+def test_parse_ru_number(text, expected):
+    """Тест разбора русской записи чисел"""
+    assert parse_ru_number(text) == expected
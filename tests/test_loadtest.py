@@ -0,0 +1,34 @@
+import os
+from benchmarks.loadtest import MemorySampler, Recorder, percentile, rss_mb
+
+def test_percentile_nearest_rank():
+    """Тест: перцентили по ближайшему рангу"""
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 95) == 0.095
+    assert percentile(values, 99) == 0.099
+    assert percentile([0.2], 99) == 0.2
+    assert percentile([], 50) == 0.0
+
+def test_recorder_counts_errors_by_endpoint():
+    """Тест: не-2xx ответы и исключения считаются ошибками своего эндпоинта"""
+    rec = Recorder()
+    rec.add("answer", 0.1, 200)
+    rec.add("answer", 0.2, 429)
+    rec.add("answer", 0.3, "ConnectionError")
+    rec.add("start", 0.01, 200)
+    
+    assert rec.errors == {"answer": 2}
+    assert rec.statuses["answer"] == {"200": 1, "429": 1, "ConnectionError": 1}
+
+def test_memory_sampler_tracks_own_process():
+    """Тест: RSS процесса снимается из /proc и сводится в рост за прогон"""
+    if rss_mb(os.getpid()) is None:
+        return  # не Linux
+    sampler = MemorySampler({"self": os.getpid()}, interval=0.01)
+    sampler.start()
+    sampler.stop()
+    
+    summary = sampler.summary()["self"]
+    assert summary["peak_mb"] >= summary["start_mb"] > 0
+    assert len(sampler.samples) >= 2
@@ -0,0 +1,44 @@
+from app.core.metrics import Histogram, MetricsRegistry
+from app.core.flow import BantFlow
+from app.core.schema import SessionState, BantRecord
+from app.core.metrics import METRICS
+
+def test_histogram_buckets_are_cumulative():
+    """Тест: значение на границе попадает в ее бакет, счетчики кумулятивные"""
+    hist = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        hist.observe(value)
+    
+    cumulative, total = hist.snapshot()
+    assert cumulative == [2, 3, 4]
+    assert total == 5.65
+
+def test_registry_renders_prometheus_text():
+    """Тест: стадии и gauge-метрики в текстовом формате Prometheus"""
+    registry = MetricsRegistry(buckets=(1.0,))
+    with registry.timed("scoring"):
+        pass
+    registry.add_gauge("bant_active_sessions", "Сессии", lambda: [({}, 3)])
+    registry.add_gauge("bant_broken", "Сломанный", lambda: 1 / 0)
+    
+    text = registry.render()
+    assert '# TYPE bant_stage_seconds histogram' in text
+    assert 'bant_stage_seconds_bucket{stage="scoring",le="+Inf"} 1' in text
+    assert 'bant_stage_seconds_count{stage="scoring"} 1' in text
+    assert "bant_active_sessions 3.0" in text
+    assert "bant_broken" not in text
+
+def test_process_answer_records_stages():
+    """Тест: process_answer пишет длительности стадий"""
+    class MockLLM:
+        def chat(self, messages, temperature=0.2, json_mode=False):
+            return '{"budget": {"have_budget": true}}'
+    
+    METRICS.reset()
+    flow = BantFlow(MockLLM())
+    state = SessionState(session_id="s1", deal_id="d1", record=BantRecord(deal_id="d1"))
+    flow.process_answer(state, "Бюджет есть")
+    
+    text = METRICS.render()
+    for stage in ("total", "pre_parse", "llm_parse", "merge", "scoring", "followups"):
+        assert f'bant_stage_seconds_count{{stage="{stage}"}} 1' in text
@@ -0,0 +1,24 @@
+from benchmarks.microbench import compare, run, synthetic_records
+
+def test_synthetic_records_cover_fill_levels():
+    """Тест: синтетические записи покрывают все уровни заполненности"""
+    records = synthetic_records(10)
+    assert {r.filled for r in records} == {"partial", "full"}  # пустая запись — partial из-за currency=RUB
+    assert records[4].filled == records[9].filled == "full"
+
+def test_compare_flags_only_slowdowns_past_threshold():
+    """Тест: регрессией считается только замедление сильнее порога"""
+    baseline = {"benchmarks": {"merge": {"normalized": 1.0, "us_per_item": 10}, "next_slot": {"normalized": 1.0, "us_per_item": 1}}}
+    current = {"benchmarks": {"merge": {"normalized": 1.4, "us_per_item": 14}, "next_slot": {"normalized": 1.1, "us_per_item": 1.1},
+                              "new_case": {"normalized": 9.0, "us_per_item": 90}}}
+    
+    regressions = compare(current, baseline, threshold=0.25)
+    assert [r["name"] for r in regressions] == ["merge"]
+    assert abs(regressions[0]["ratio"] - 1.4) < 1e-9
+
+def test_run_selected_benchmark():
+    """Тест: запуск выбранного бенчмарка дает нормированное время"""
+    result = run(only=["heuristic_followups"], repeat=1, records=5)
+    bench = result["benchmarks"]["heuristic_followups"]
+    assert bench["us_per_item"] > 0 and bench["normalized"] > 0
+    assert result["calibration_us"] > 0
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import HTTPException
+from app.api.projection import parse_fields, project
+
+ALLOWED = ("session_id", "filled", "record")
+
+def test_parse_fields_defaults_and_all():
+    """Тест: пустой fields — набор по умолчанию, "*" — все поля"""
+    assert parse_fields(None, ("filled",), ALLOWED) == ("filled",)
+    assert parse_fields("*", ("filled",), ALLOWED) == ALLOWED
+    assert parse_fields(" filled , record.budget ", ("filled",), ALLOWED) == ("filled", "record.budget")
+
+def test_parse_fields_rejects_unknown():
+    """Тест: неизвестное поле — 400"""
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("filled,recrod", (), ALLOWED)
+    assert exc.value.status_code == 400
+
+def test_project_builds_only_requested():
+    """Тест: незапрошенные поля не строятся"""
+    calls = []
+    builders = {
+        "session_id": lambda: "s1",
+        "filled": lambda: "partial",
+        "record": lambda: calls.append("record") or {"budget": {"have_budget": True}, "need": {}},
+    }
+    
+    assert project(builders, ("session_id", "filled")) == {"session_id": "s1", "filled": "partial"}
+    assert calls == []
+
+def test_project_subkeys():
+    """Тест: record.budget — только подключ, builder вызывается один раз"""
+    calls = []
+    builders = {"record": lambda: calls.append(1) or {"budget": 1, "need": 2, "timing": 3}}
+    
+    assert project(builders, ("record.budget", "record.need")) == {"record": {"budget": 1, "need": 2}}
+    assert calls == [1]
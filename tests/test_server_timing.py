@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core import timing
+from app.core.metrics import METRICS
+from app.api.profiling import SamplingProfiler, session_from_path
+from app.api.server_timing import format_server_timing
+
+def test_timings_propagate_into_executor():
+    """Тест: стадии из воркеров пула попадают в коллектор запроса"""
+    def work():
+        with METRICS.timed("llm_parse"):
+            time.sleep(0.01)
+    
+    timings, token = timing.begin()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [timing.submit_in_context(pool, work) for _ in range(2)]
+            for fut in futures:
+                fut.result()
+            pool.submit(work).result()  # без контекста — не учитывается
+    finally:
+        timing.end(token)
+    
+    items = dict(timings.items())
+    assert 0.02 <= items["llm_parse"] < 0.03
+    assert timing.current() is None
+
+def test_thread_ids_snapshot_while_threads_enter():
+    """Тест: профилировщик берет копию потоков запроса, пока воркеры добавляют новые"""
+    timings = timing.RequestTimings()
+    
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        futures = [pool.submit(timings.enter_thread) for _ in range(200)]
+        while not all(fut.done() for fut in futures):
+            for tid in timings.thread_ids():
+                assert isinstance(tid, int)
+        for fut in futures:
+            fut.result()
+    
+    assert 1 <= len(timings.thread_ids()) <= 16
+
+def test_format_server_timing():
+    """Тест: формат заголовка Server-Timing в миллисекундах"""
+    assert format_server_timing([("scoring", 0.0123), ("request", 0.5)]) == "scoring;dur=12.3, request;dur=500.0"
+
+def test_profiler_writes_named_profile(tmp_path):
+    """Тест: профиль по заголовку пишется с id сессии и латентностью в имени"""
+    profiler = SamplingProfiler(str(tmp_path), allow_header=True, interval_ms=1)
+    timings, token = timing.begin()
+    try:
+        session = profiler.start(timings, header_requested=True)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            def slow():
+                with METRICS.timed("scoring"):
+                    time.sleep(0.05)
+            timing.submit_in_context(pool, slow).result()
+        session.finish(session_from_path("/sessions/abc-1/answer"), 0.123)
+        session.join(timeout=2)
+    finally:
+        timing.end(token)
+    
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+    assert files[0].endswith("_abc-1_123ms.folded")
+    assert "slow" in (tmp_path / files[0]).read_text()
+
+def test_profiler_off_by_default(tmp_path):
+    """Тест: без sample_rate и разрешения заголовка профилировщик не запускается"""
+    profiler = SamplingProfiler(str(tmp_path))
+    timings, token = timing.begin()
+    timing.end(token)
+    
+    assert not profiler.enabled
+    assert profiler.start(timings, header_requested=True) is None
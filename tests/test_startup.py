@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import pytest
+from app.core.llm import GigaChatClient
+
+def test_import_does_not_build_service():
+    """Тест: импорт app.api.main не создает сервис и не требует GIGACHAT_AUTH_KEY"""
+    env = {k: v for k, v in os.environ.items() if k != "GIGACHAT_AUTH_KEY"}
+    code = "import app.api.main; from app.api import deps; print(deps.peek_service() is None)"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "True"
+
+def test_client_without_key_fails_on_first_use(monkeypatch):
+    """Тест: клиент без ключа создается, ошибка — только при запросе токена"""
+    monkeypatch.delenv("GIGACHAT_AUTH_KEY", raising=False)
+    client = GigaChatClient()
+    
+    assert client.warmup() is False
+    with pytest.raises(RuntimeError):
+        client.chat([{"role": "user", "content": "hi"}])
+
+def test_endpoints_wait_for_background_load(tmp_path, monkeypatch):
+    """Тест: пока сессии грузятся в фоне, /health и эндпоинты с сервисом — 503, потом — данные"""
+    import threading
+    from fastapi.testclient import TestClient
+    from app.api import deps
+    from app.api.main import app
+    from app.services.bant_agent import BantAgentService
+    from app.services.storage import JSONStorage
+    
+    path = str(tmp_path / "sessions.json")
+    session_id = BantAgentService(storage=JSONStorage(path)).start("D-1").session_id
+    storage = JSONStorage(path)
+    gate = threading.Event()
+    iter_sessions = storage.iter_sessions
+    monkeypatch.setattr(storage, "iter_sessions", lambda: gate.wait(5) and iter_sessions())
+    svc = BantAgentService(storage=storage, load=False)
+    monkeypatch.setattr(deps, "_service", svc)
+    loader = svc.load_in_background()
+    client = TestClient(app)
+    
+    health = client.get("/health")
+    assert health.status_code == 503 and health.json()["status"] == "loading"
+    busy = client.get(f"/sessions/{session_id}/status")
+    assert busy.status_code == 503 and busy.headers["retry-after"]
+    
+    gate.set()
+    loader.join(5)
+    assert client.get("/health").json()["status"] == "healthy"
+    assert client.get(f"/sessions/{session_id}/status").json()["deal_id"] == "D-1"
+    assert client.get("/dashboard").json()["total"] == 1
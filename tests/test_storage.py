@@ -0,0 +1,110 @@
+from app.core.schema import SessionState, BantRecord
+from app.services.storage import JSONStorage
+
+def make_session(i):
+    return SessionState(session_id=f"s-{i}", deal_id=f"DEAL-{i}", record=BantRecord(deal_id=f"DEAL-{i}"))
+
+def test_save_sessions_batch(tmp_path):
+    """Тест пакетного сохранения сессий одной записью"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    storage.save_session(make_session(0))
+    
+    storage.save_sessions([make_session(i) for i in range(1, 4)])
+    
+    sessions = storage.load_all_sessions()
+    assert sorted(sessions) == ["s-0", "s-1", "s-2", "s-3"]
+    assert SessionState(**sessions["s-2"]).deal_id == "DEAL-2"
+
+def test_delete_session(tmp_path):
+    """Тест удаления сессии"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    storage.save_sessions([make_session(1), make_session(2)])
+    
+    assert storage.delete_session("s-1") is True
+    assert storage.delete_session("s-1") is False
+    assert list(storage.load_all_sessions()) == ["s-2"]
+
+def test_save_appends_without_rewriting_snapshot(tmp_path):
+    """Тест: сохранение дописывает журнал, снимок не переписывается; чтение видит оба"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    storage.save_sessions([make_session(i) for i in range(3)])
+    assert storage.compact() is True
+    snapshot = (tmp_path / "sessions.json").read_bytes()
+    
+    changed = make_session(1)
+    changed.version = 5
+    storage.save_session(changed)
+    storage.save_session(make_session(3))
+    
+    assert (tmp_path / "sessions.json").read_bytes() == snapshot
+    assert (tmp_path / "sessions.journal.jsonl").read_text(encoding="utf-8").count("\n") == 2
+    sessions = storage.load_all_sessions()
+    assert sorted(sessions) == ["s-0", "s-1", "s-2", "s-3"]
+    assert sessions["s-1"]["version"] == 5
+    assert dict(storage.iter_sessions(read_size=64)) == sessions
+
+def test_compaction_merges_journal(tmp_path):
+    """Тест: журнал сверх compact_bytes сливается в снимок в фоне; удаления и новые записи не теряются"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"), compact_bytes=4096)
+    for i in range(40):
+        storage.save_session(make_session(i))
+    storage.delete_session("s-7")
+    if storage._compactor is not None:
+        storage._compactor.join(5)
+    storage.save_session(make_session(40))
+    storage.compact()
+    
+    assert not (tmp_path / "sessions.journal.jsonl").exists()
+    assert not (tmp_path / "sessions.journal.compacting.jsonl").exists()
+    expected = {f"s-{i}" for i in range(41)} - {"s-7"}
+    assert set(storage.load_all_sessions()) == expected
+    assert set(JSONStorage(str(tmp_path / "sessions.json")).load_all_sessions()) == expected
+
+def test_torn_journal_line_is_skipped(tmp_path):
+    """Тест: недописанная строка журнала (аварийная остановка) пропускается, следующие записи читаются"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    storage.save_session(make_session(1))
+    with open(tmp_path / "sessions.journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "s-2", "data": {"sess')
+    
+    reopened = JSONStorage(str(tmp_path / "sessions.json"))
+    reopened.save_session(make_session(3))
+    
+    assert sorted(reopened.load_all_sessions()) == ["s-1", "s-3"]
+
+def test_read_only_storage_does_not_write(tmp_path):
+    """Тест: read_only не чинит недописанный хвост журнала и не сливает его, но читает записи"""
+    storage = JSONStorage(str(tmp_path / "sessions.json"))
+    storage.save_sessions([make_session(1), make_session(2)])
+    with open(tmp_path / "sessions.journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "s-3", "data": {"sess')
+    journal = (tmp_path / "sessions.journal.jsonl").read_bytes()
+    
+    reader = JSONStorage(str(tmp_path / "sessions.json"), compact_bytes=1, read_only=True)
+    
+    assert sorted(dict(reader.iter_sessions())) == ["s-1", "s-2"]
+    assert reader.compact() is False
+    assert (tmp_path / "sessions.journal.jsonl").read_bytes() == journal
+    assert not (tmp_path / "sessions.json").exists()
+
+def test_read_only_reopens_after_foreign_compaction(tmp_path, monkeypatch):
+    """Тест: слияние другим процессом посреди открытия файлов — читатель открывает набор заново и ничего не теряет"""
+    writer = JSONStorage(str(tmp_path / "sessions.json"))
+    writer.save_sessions([make_session(i) for i in range(3)])
+    writer.compact()
+    writer.save_sessions([make_session(i) for i in range(3, 6)])
+    reader = JSONStorage(str(tmp_path / "sessions.json"), read_only=True)
+    opens = []
+    open_file = JSONStorage._open
+    
+    def racing_open(path, mode='r'):
+        f = open_file(path, mode)
+        opens.append(path)
+        if len(opens) == 1:
+            writer.compact()  # снимок уже открыт, журнал слит в новый снимок и удален
+        return f
+    
+    monkeypatch.setattr(reader, "_open", racing_open)
+    
+    assert sorted(dict(reader.iter_sessions())) == [f"s-{i}" for i in range(6)]
+    assert len(opens) == 6
@@ -5,8 +5,13 @@ from app.core.validator import (
     build_parse_messages, 
     parse_bant_json_text, 
     validate_record, 
-    refine_with_errors
+    refine_with_errors,
+    coerce_bant_payload,
+    parse_bant_with_llm
 )
+from unittest.mock import Mock
+from app.core.accounting import ACCOUNTING
+from app.core.prompts import SCHEMA_HINT, SLOT_SCHEMA_HINTS
 from app.core.schema import BantRecord, Budget, Authority, Need, Timing
 
 def test_build_parse_messages():
@@ -19,6 +24,35 @@ def test_build_parse_messages():
     assert messages[1]["role"] == "user"
     assert messages[1]["content"] == answer_text.strip()
 
+def test_build_parse_messages_compact_slot():
+    """Тест компактного промпта текущего слота"""
+    messages = build_parse_messages("Решает генеральный директор", slot="authority")
+    
+    assert messages[0]["content"] == SLOT_SCHEMA_HINTS["authority"]
+    assert len(messages[0]["content"]) < len(SCHEMA_HINT) / 2
+
+def test_build_parse_messages_escalates_multi_topic():
+    """Тест эскалации на полную схему для многотемного ответа"""
+    messages = build_parse_messages("Решает директор, бюджет 2 млн рублей", slot="authority")
+    
+    assert messages[0]["content"] == SCHEMA_HINT
+
+def test_parse_bant_with_llm_accounting():
+    """Тест учета размеров промпта и ответа по типу вызова"""
+    ACCOUNTING.reset()
+    llm = Mock()
+    llm.chat.return_value = '{"budget": {"have_budget": true}}'
+    llm.last_usage = {"prompt_tokens": 120, "completion_tokens": 9}
+    
+    result = parse_bant_with_llm(llm, "Бюджет есть", slot="budget")
+    
+    assert result == {"budget": {"have_budget": True}}
+    totals = ACCOUNTING.snapshot()["extract_slot"]
+    assert totals["calls"] == 1
+    assert totals["prompt_tokens"] == 120
+    assert totals["completion_tokens"] == 9
+    assert totals["prompt_chars"] == len(SLOT_SCHEMA_HINTS["budget"]) + len("Бюджет есть")
+
 def test_parse_bant_json_text_valid():
     """Тест парсинга валидного JSON"""
     json_text = '{"budget": {"have_budget": true, "amount_min": 100000}}'
@@ -40,9 +74,34 @@ def test_parse_bant_json_text_no_json():
         parse_bant_json_text("Просто текст без JSON")
 
 def test_parse_bant_json_text_invalid_json():
-    """Тест парсинга невалидного JSON"""
-    with pytest.raises(json.JSONDecodeError):
-        parse_bant_json_text('{"budget": {"have_budget": true,}}')  # Лишняя запятая
+    """Тест локального ремонта невалидного JSON"""
+    result = parse_bant_json_text('{"budget": {"have_budget": true,}}')  # Лишняя запятая
+    assert result == {"budget": {"have_budget": True}}
+
+def test_parse_bant_json_text_truncated():
+    """Тест разбора ответа, оборванного по max_tokens"""
+    text = '{"budget": {"have_budget": true, "amount_min": 500000}, "need": {"pain_points": ["Ручной учет", "Ошиб'
+    result = parse_bant_json_text(text)
+    assert result["budget"]["amount_min"] == 500000
+    assert result["need"]["pain_points"] == ["Ручной учет", "Ошиб"]
+
+def test_coerce_bant_payload():
+    """Тест приведения почти валидных значений к схеме"""
+    data = coerce_bant_payload({
+        "budget": {"have_budget": "да", "amount_min": "1,5 млн", "amount_max": -5, "currency": "руб"},
+        "authority": {"decision_maker": "CEO", "stakeholders": "CFO; CTO", "unknown_field": 1},
+        "need": {"priority": "Высокий"},
+        "timing": {"timeframe": "next_year", "deadline": "31.12.2025"},
+    })
+    assert data["budget"] == {"have_budget": True, "amount_min": 1500000, "currency": "RUB"}
+    assert data["authority"] == {"decision_maker": "CEO", "stakeholders": ["CFO", "CTO"]}
+    assert data["need"]["priority"] == "high"
+    assert data["timing"] == {"timeframe": "unknown", "deadline": "2025-12-31"}
+
+def test_coerce_bant_payload_not_object():
+    """Тест отказа для не-объекта"""
+    with pytest.raises(ValueError):
+        coerce_bant_payload(["budget"])
 
 def test_validate_record_none():
     """Тест валидации пустой записи"""